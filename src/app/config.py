@@ -7,6 +7,8 @@ import os
 
 from dotenv import load_dotenv
 
+from .utils.cache_policy import CACHE_POLICIES
+
 
 @dataclass(frozen=True)
 class AppConfig:
@@ -14,6 +16,24 @@ class AppConfig:
     db_path: Path
     thumbs_dir: Path
     default_workspace: Path | None
+    # 缩略图存储后端："files" 或 "pack"
+    thumb_store: str = "files"
+    # 缩略图磁盘缓存预算（MB，0 表示不限制）与淘汰策略（"lru" / "lfu"）
+    thumb_cache_mb: float = 2048.0
+    thumb_eviction: str = "lru"
+    # 缩略图编码字节内存缓存（MB，0 表示关闭）
+    thumb_encoded_cache_mb: float = 64.0
+    # 缩略图内存缓存淘汰策略（"lru" / "2q" / "tinylfu"）；轨迹文件记录内存缓存访问（基准回放用）
+    thumb_memory_policy: str = "lru"
+    thumb_trace: Path | None = None
+    # 缩略图生成进程数（0 表示在线程中生成）
+    thumb_workers: int = 0
+    # 视频联系表帧数（0 表示关闭；详情面板悬停预览）
+    video_sheet_frames: int = 0
+    # 扫描后预生成缩略图；CPU 预算为生成耗时占比，I/O 预算为每秒读取的源文件 MB（0 不限制）
+    thumb_precompute: bool = False
+    thumb_precompute_cpu: float = 0.5
+    thumb_precompute_io_mb: float = 0.0
 
 
 def _env_path(name: str) -> Path | None:
@@ -69,9 +89,62 @@ def load_config() -> AppConfig:
     if thumbs_dir is None:
         thumbs_dir = base_dir / "thumbs"
 
+    thumb_store = (os.getenv("MYTAGS_THUMB_STORE") or "files").strip().lower()
+    if thumb_store not in {"files", "pack"}:
+        thumb_store = "files"
+
+    try:
+        thumb_cache_mb = max(0.0, float(os.getenv("MYTAGS_THUMB_CACHE_MB") or 2048))
+    except ValueError:
+        thumb_cache_mb = 2048.0
+
+    thumb_eviction = (os.getenv("MYTAGS_THUMB_EVICTION") or "lru").strip().lower()
+    if thumb_eviction not in {"lru", "lfu"}:
+        thumb_eviction = "lru"
+
+    try:
+        thumb_encoded_cache_mb = max(0.0, float(os.getenv("MYTAGS_THUMB_ENCODED_CACHE_MB") or 64))
+    except ValueError:
+        thumb_encoded_cache_mb = 64.0
+
+    thumb_memory_policy = (os.getenv("MYTAGS_THUMB_MEMORY_POLICY") or "lru").strip().lower()
+    if thumb_memory_policy not in CACHE_POLICIES:
+        thumb_memory_policy = "lru"
+
+    try:
+        thumb_workers = max(0, int(os.getenv("MYTAGS_THUMB_WORKERS") or 0))
+    except ValueError:
+        thumb_workers = 0
+
+    try:
+        video_sheet_frames = min(32, max(0, int(os.getenv("MYTAGS_VIDEO_SHEET_FRAMES") or 0)))
+    except ValueError:
+        video_sheet_frames = 0
+
+    thumb_precompute = (os.getenv("MYTAGS_THUMB_PRECOMPUTE") or "").strip().lower() in {"1", "true", "yes", "on"}
+    try:
+        thumb_precompute_cpu = min(1.0, max(0.05, float(os.getenv("MYTAGS_THUMB_PRECOMPUTE_CPU") or 0.5)))
+    except ValueError:
+        thumb_precompute_cpu = 0.5
+    try:
+        thumb_precompute_io_mb = max(0.0, float(os.getenv("MYTAGS_THUMB_PRECOMPUTE_IO_MB") or 0))
+    except ValueError:
+        thumb_precompute_io_mb = 0.0
+
     return AppConfig(
         data_dir=base_dir,
         db_path=db_path,
         thumbs_dir=thumbs_dir,
         default_workspace=default_workspace,
+        thumb_store=thumb_store,
+        thumb_cache_mb=thumb_cache_mb,
+        thumb_eviction=thumb_eviction,
+        thumb_encoded_cache_mb=thumb_encoded_cache_mb,
+        thumb_memory_policy=thumb_memory_policy,
+        thumb_trace=_env_path("MYTAGS_THUMB_TRACE"),
+        thumb_workers=thumb_workers,
+        video_sheet_frames=video_sheet_frames,
+        thumb_precompute=thumb_precompute,
+        thumb_precompute_cpu=thumb_precompute_cpu,
+        thumb_precompute_io_mb=thumb_precompute_io_mb,
     )
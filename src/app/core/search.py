@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterable
 
+from .tag_expr import TagExpr
+
 
 @dataclass(frozen=True)
 class SearchQuery:
@@ -11,30 +13,52 @@ class SearchQuery:
     Attributes:
         text: 搜索文本，支持通配符和 FTS5 语法
         root: 限制搜索路径前缀
+        folder: 只返回该目录下的直接子文件（不含子目录中的文件）
         types: 文件类型元组，如 ('image', 'video')
         tags: 标签名称元组
         match_all_tags: 是否要求匹配所有标签（默认 OR）
+        tag_expr: 标签布尔表达式（见 `parse_tag_expression`），与 tags 同时存在时取交集
         sort_by: 排序字段 ('name', 'size', 'type', 'created_at', 'updated_at', 'modified_at')
         sort_desc: 是否降序
         use_fts: 是否使用 FTS5 全文搜索（优先级高于 LIKE）
+        use_tag_index: 是否使用标签位图索引求值标签条件（否则编译为 EXISTS 子查询）
     """
     text: str | None = None
     root: str | None = None
+    folder: str | None = None
     types: tuple[str, ...] = ()
     tags: tuple[str, ...] = ()
     match_all_tags: bool = False
+    tag_expr: TagExpr | None = None
     sort_by: str | None = None
     sort_desc: bool = False
     use_fts: bool = True  # 默认启用 FTS5
+    use_tag_index: bool = True
 
 
 @dataclass(frozen=True)
 class SearchResult:
-    """搜索结果对象"""
+    """搜索结果对象
+
+    size/modified_at 来自索引，供缩略图缓存键使用，避免访问文件系统。
+    """
     file_id: int
     path: str
     name: str
     type: str
+    size: int | None = None
+    modified_at: float | None = None
+
+
+@dataclass(frozen=True)
+class FolderResult:
+    """目录查询结果 - 包含匹配文件的子目录
+
+    has_children 表示其下还有包含匹配文件的子目录，供目录树决定是否显示展开箭头。
+    """
+    path: str
+    name: str
+    has_children: bool = False
 
 
 def empty_results() -> Iterable[SearchResult]:
@@ -0,0 +1,268 @@
+"""
+标签布尔表达式 - 解析、规划与集合运算
+
+语法（关键字不区分大小写，含空格或关键字的标签名用双引号包裹）：
+    expr    := or
+    or      := and ("OR" and)*
+    and     := unary (["AND"] unary)*      相邻项默认按 AND 组合
+    unary   := "NOT" unary | "-" unary | primary
+    primary := "(" expr ")" | TAG | "\"" TAG "\""
+
+示例：
+    (travel OR work) AND NOT draft
+    "my photos" -archived
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Iterable, Mapping, Union
+
+
+class TagExpressionError(ValueError):
+    """标签表达式语法错误"""
+
+
+@dataclass(frozen=True)
+class TagTerm:
+    """单个标签"""
+    name: str
+
+
+@dataclass(frozen=True)
+class TagNot:
+    """取反"""
+    operand: "TagExpr"
+
+
+@dataclass(frozen=True)
+class TagAnd:
+    """交集"""
+    operands: tuple["TagExpr", ...]
+
+
+@dataclass(frozen=True)
+class TagOr:
+    """并集"""
+    operands: tuple["TagExpr", ...]
+
+
+TagExpr = Union[TagTerm, TagNot, TagAnd, TagOr]
+
+_KEYWORDS = {"AND", "OR", "NOT"}
+
+
+# ========== 解析 ==========
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    """词法分析，返回 (类型, 值) 列表，类型为 op/tag/lparen/rparen"""
+    tokens: list[tuple[str, str]] = []
+    index = 0
+    length = len(text)
+    while index < length:
+        char = text[index]
+        if char.isspace():
+            index += 1
+        elif char == "(":
+            tokens.append(("lparen", char))
+            index += 1
+        elif char == ")":
+            tokens.append(("rparen", char))
+            index += 1
+        elif char == "-":
+            tokens.append(("op", "NOT"))
+            index += 1
+        elif char == '"':
+            end = text.find('"', index + 1)
+            if end < 0:
+                raise TagExpressionError("Unterminated quote")
+            name = text[index + 1:end].strip()
+            if not name:
+                raise TagExpressionError("Empty quoted tag")
+            tokens.append(("tag", name))
+            index = end + 1
+        else:
+            start = index
+            while index < length and not text[index].isspace() and text[index] not in '()"':
+                index += 1
+            word = text[start:index]
+            if word.upper() in _KEYWORDS:
+                tokens.append(("op", word.upper()))
+            else:
+                tokens.append(("tag", word))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str]]) -> None:
+        self._tokens = tokens
+        self._pos = 0
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise TagExpressionError("Unexpected end of expression")
+        self._pos += 1
+        return token
+
+    def parse(self) -> TagExpr:
+        expr = self._parse_or()
+        token = self._peek()
+        if token is not None:
+            raise TagExpressionError(f"Unexpected token: {token[1]}")
+        return expr
+
+    def _parse_or(self) -> TagExpr:
+        operands = [self._parse_and()]
+        while self._peek() == ("op", "OR"):
+            self._next()
+            operands.append(self._parse_and())
+        return operands[0] if len(operands) == 1 else TagOr(tuple(operands))
+
+    def _parse_and(self) -> TagExpr:
+        operands = [self._parse_unary()]
+        while True:
+            token = self._peek()
+            if token == ("op", "AND"):
+                self._next()
+            elif token is None or token[0] == "rparen" or token == ("op", "OR"):
+                break
+            operands.append(self._parse_unary())
+        return operands[0] if len(operands) == 1 else TagAnd(tuple(operands))
+
+    def _parse_unary(self) -> TagExpr:
+        kind, value = self._next()
+        if (kind, value) == ("op", "NOT"):
+            return TagNot(self._parse_unary())
+        if kind == "lparen":
+            expr = self._parse_or()
+            if self._next()[0] != "rparen":
+                raise TagExpressionError("Missing closing parenthesis")
+            return expr
+        if kind == "tag":
+            return TagTerm(value)
+        raise TagExpressionError(f"Unexpected token: {value}")
+
+
+def parse_tag_expression(text: str) -> TagExpr:
+    """解析标签表达式
+
+    Raises:
+        TagExpressionError: 语法错误或表达式为空
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        raise TagExpressionError("Empty expression")
+    return _Parser(tokens).parse()
+
+
+def tags_to_expression(tags: Iterable[str], match_all: bool) -> TagExpr | None:
+    """将扁平标签列表转换为表达式（兼容 `SearchQuery.tags`）"""
+    terms = tuple(TagTerm(name) for name in dict.fromkeys(tags))
+    if not terms:
+        return None
+    if len(terms) == 1:
+        return terms[0]
+    return TagAnd(terms) if match_all else TagOr(terms)
+
+
+def expression_tag_names(expr: TagExpr) -> set[str]:
+    """收集表达式中引用的所有标签名"""
+    if isinstance(expr, TagTerm):
+        return {expr.name}
+    if isinstance(expr, TagNot):
+        return expression_tag_names(expr.operand)
+    names: set[str] = set()
+    for operand in expr.operands:
+        names |= expression_tag_names(operand)
+    return names
+
+
+# ========== 规划 ==========
+
+def estimate_cardinality(expr: TagExpr, counts: Mapping[str, int]) -> float:
+    """估算表达式匹配的文件数量，用于选择最有选择性的子表达式先执行
+
+    取反子表达式无法廉价估算，返回无穷大使其排在最后（作为排除条件）。
+    """
+    if isinstance(expr, TagTerm):
+        return counts.get(expr.name, 0)
+    if isinstance(expr, TagNot):
+        return math.inf
+    estimates = [estimate_cardinality(operand, counts) for operand in expr.operands]
+    if isinstance(expr, TagAnd):
+        return min(estimates)
+    return sum(estimates)
+
+
+def plan_operands(expr: TagAnd | TagOr, counts: Mapping[str, int]) -> list[TagExpr]:
+    """按估算基数升序排列子表达式"""
+    return sorted(expr.operands, key=lambda operand: estimate_cardinality(operand, counts))
+
+
+# ========== 集合运算 ==========
+
+def evaluate_tag_expression(
+    expr: TagExpr,
+    bitmaps: Mapping[str, int],
+    counts: Mapping[str, int] | None = None,
+) -> tuple[int, bool]:
+    """在标签位图上求值表达式
+
+    为避免构造全集位图，结果以 (位图, 是否取反) 表示：
+    取反为 True 时，匹配的文件是“不在位图中的所有文件”。
+
+    Args:
+        expr: 标签表达式
+        bitmaps: 标签名 → 文件 ID 位图，缺失的标签视为空集
+        counts: 标签名 → 使用数量，用于规划执行顺序；省略时由位图计算
+
+    Returns:
+        (bitmap, negated)
+    """
+    if counts is None:
+        counts = {name: bitmap.bit_count() for name, bitmap in bitmaps.items()}
+    return _evaluate(expr, bitmaps, counts)
+
+
+def _evaluate(
+    expr: TagExpr, bitmaps: Mapping[str, int], counts: Mapping[str, int]
+) -> tuple[int, bool]:
+    if isinstance(expr, TagTerm):
+        return bitmaps.get(expr.name, 0), False
+
+    if isinstance(expr, TagNot):
+        bitmap, negated = _evaluate(expr.operand, bitmaps, counts)
+        return bitmap, not negated
+
+    if isinstance(expr, TagAnd):
+        # A ∧ B ∧ ¬C ∧ ¬D = (A ∧ B) \ (C ∨ D)，从最稀疏的子表达式开始，空集时提前结束
+        positive: int | None = None
+        negative = 0
+        for operand in plan_operands(expr, counts):
+            bitmap, negated = _evaluate(operand, bitmaps, counts)
+            if negated:
+                negative |= bitmap
+            else:
+                positive = bitmap if positive is None else positive & bitmap
+                if not positive:
+                    return 0, False
+        if positive is None:
+            return negative, True
+        return positive & ~negative, False
+
+    # A ∨ B ∨ ¬C ∨ ¬D = ¬((C ∧ D) \ (A ∨ B))
+    positive = 0
+    negative_all: int | None = None
+    for operand in expr.operands:
+        bitmap, negated = _evaluate(operand, bitmaps, counts)
+        if negated:
+            negative_all = bitmap if negative_all is None else negative_all & bitmap
+        else:
+            positive |= bitmap
+    if negative_all is None:
+        return positive, False
+    return negative_all & ~positive, True
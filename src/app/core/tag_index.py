@@ -0,0 +1,209 @@
+"""
+标签位图索引 - 用于标签交集/并集/差集的内存计算
+
+每个标签对应一个 Python 整数位图，第 N 位表示文件 ID 为 N 的文件带有该标签。
+Python 整数的按位运算由 C 实现，对数十万文件的 AND/OR/NOT 也只需微秒级。
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import struct
+import threading
+from typing import Iterable
+
+# 持久化文件格式标识
+_MAGIC = b"MTBI2"
+_HEADER = struct.Struct("<qqqI")  # 校验戳(3 个 int64) + 标签数量
+_ENTRY = struct.Struct("<qI")     # 标签 ID + 位图字节长度
+
+# 每个字节值对应的置位下标，用于位图快速解码
+_BYTE_BITS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+)
+
+
+def bitmap_from_ids(file_ids: Iterable[int]) -> int:
+    """将文件 ID 集合编码为位图
+
+    先写入 bytearray 再一次性转换，避免逐位 `|=` 反复复制大整数。
+    """
+    ids = [int(file_id) for file_id in file_ids if int(file_id) >= 0]
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for file_id in ids:
+        buffer[file_id >> 3] |= 1 << (file_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def ids_from_bitmap(bitmap: int) -> list[int]:
+    """将位图解码为升序文件 ID 列表"""
+    if bitmap <= 0:
+        return []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    ids: list[int] = []
+    append = ids.append
+    for offset, value in enumerate(data):
+        if value:
+            base = offset << 3
+            for bit in _BYTE_BITS[value]:
+                append(base + bit)
+    return ids
+
+
+class TagBitmapIndex:
+    """
+    标签 → 文件 ID 位图索引
+
+    特性：
+    - 交集(match_all)、并集(match_any)、排除(exclude) 均为整数按位运算
+    - 增量维护：由 Repo 的标签写操作在事务提交后同步更新
+    - 可选持久化：save()/load() 附带校验戳，数据不一致时自动丢弃
+    - 写操作加锁，可在扫描/监听线程提交事务时安全更新
+    """
+
+    def __init__(self, bitmaps: dict[int, int] | None = None) -> None:
+        self._bitmaps: dict[int, int] = dict(bitmaps or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[int, int]]) -> "TagBitmapIndex":
+        """从 (file_id, tag_id) 关联对构建索引"""
+        grouped: dict[int, list[int]] = {}
+        for file_id, tag_id in pairs:
+            grouped.setdefault(int(tag_id), []).append(int(file_id))
+        return cls({tag_id: bitmap_from_ids(ids) for tag_id, ids in grouped.items()})
+
+    # ========== 维护 ==========
+
+    def add(self, file_ids: Iterable[int], tag_ids: Iterable[int]) -> None:
+        """为文件集合添加标签"""
+        mask = bitmap_from_ids(file_ids)
+        if not mask:
+            return
+        with self._lock:
+            for tag_id in tag_ids:
+                self._bitmaps[tag_id] = self._bitmaps.get(tag_id, 0) | mask
+
+    def remove(self, file_ids: Iterable[int], tag_ids: Iterable[int]) -> None:
+        """从文件集合移除标签"""
+        mask = bitmap_from_ids(file_ids)
+        if not mask:
+            return
+        with self._lock:
+            for tag_id in tag_ids:
+                if tag_id in self._bitmaps:
+                    self._bitmaps[tag_id] &= ~mask
+
+    def replace(self, file_ids: Iterable[int], tag_ids: Iterable[int]) -> None:
+        """将文件集合的标签替换为指定标签"""
+        file_ids = list(file_ids)
+        self.remove_files(file_ids)
+        self.add(file_ids, tag_ids)
+
+    def remove_files(self, file_ids: Iterable[int]) -> None:
+        """从所有标签中移除文件（文件被删除时）"""
+        mask = bitmap_from_ids(file_ids)
+        if not mask:
+            return
+        with self._lock:
+            for tag_id, bitmap in self._bitmaps.items():
+                if bitmap & mask:
+                    self._bitmaps[tag_id] = bitmap & ~mask
+
+    def remove_tag(self, tag_id: int) -> None:
+        """移除整个标签"""
+        with self._lock:
+            self._bitmaps.pop(tag_id, None)
+
+    # ========== 查询 ==========
+
+    def bitmap(self, tag_id: int) -> int:
+        """获取单个标签的位图"""
+        return self._bitmaps.get(tag_id, 0)
+
+    def count(self, tag_id: int) -> int:
+        """获取标签关联的文件数量"""
+        return self._bitmaps.get(tag_id, 0).bit_count()
+
+    def match_all(self, tag_ids: Iterable[int]) -> int:
+        """交集：同时带有所有标签的文件（从最稀疏的标签开始）"""
+        bitmaps = sorted((self.bitmap(tag_id) for tag_id in tag_ids), key=int.bit_count)
+        if not bitmaps:
+            return 0
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if not result:
+                break
+            result &= bitmap
+        return result
+
+    def match_any(self, tag_ids: Iterable[int]) -> int:
+        """并集：带有任一标签的文件"""
+        result = 0
+        for tag_id in tag_ids:
+            result |= self.bitmap(tag_id)
+        return result
+
+    def exclude(self, bitmap: int, tag_ids: Iterable[int]) -> int:
+        """差集：从位图中排除带有任一标签的文件"""
+        return bitmap & ~self.match_any(tag_ids)
+
+    def file_ids(self, bitmap: int) -> list[int]:
+        """位图解码为文件 ID 列表"""
+        return ids_from_bitmap(bitmap)
+
+    def __len__(self) -> int:
+        return len(self._bitmaps)
+
+    # ========== 持久化 ==========
+
+    def save(self, path: Path, stamp: tuple[int, int, int]) -> bool:
+        """保存索引到文件
+
+        Args:
+            path: 索引文件路径
+            stamp: 数据库校验戳，加载时用于判断索引是否过期
+        """
+        with self._lock:
+            items = list(self._bitmaps.items())
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("wb") as handle:
+                handle.write(_MAGIC)
+                handle.write(_HEADER.pack(*stamp, len(items)))
+                for tag_id, bitmap in items:
+                    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+                    handle.write(_ENTRY.pack(tag_id, len(data)))
+                    handle.write(data)
+            tmp_path.replace(path)
+            return True
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+    @classmethod
+    def load(cls, path: Path, stamp: tuple[int, int, int]) -> "TagBitmapIndex | None":
+        """从文件加载索引，校验戳不匹配或文件损坏时返回 None"""
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if not data.startswith(_MAGIC):
+            return None
+        try:
+            offset = len(_MAGIC)
+            *saved_stamp, count = _HEADER.unpack_from(data, offset)
+            if tuple(saved_stamp) != tuple(stamp):
+                return None
+            offset += _HEADER.size
+            bitmaps: dict[int, int] = {}
+            for _ in range(count):
+                tag_id, length = _ENTRY.unpack_from(data, offset)
+                offset += _ENTRY.size
+                bitmaps[tag_id] = int.from_bytes(data[offset:offset + length], "little")
+                offset += length
+        except struct.error:
+            return None
+        return cls(bitmaps)
@@ -45,6 +45,8 @@ class Tag(Base):
     color = Column(Text, nullable=True)
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # 关联文件数量，由 file_tags 触发器维护，不通过 ORM 写入
+    file_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     files = relationship("File", secondary="file_tags", back_populates="tags")
 
@@ -64,6 +66,25 @@ class FileTag(Base):
     )
 
 
+class TagTypeCount(Base):
+    """标签按文件类型的使用数量 - 由触发器维护的物化统计"""
+
+    __tablename__ = "tag_type_counts"
+
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    type = Column(Text, primary_key=True)
+    file_count = Column(Integer, nullable=False, default=0)
+
+
+class WriteCounter(Base):
+    """表写入计数 - 由触发器在每次增删改时递增，用于判断持久化的派生索引是否过期"""
+
+    __tablename__ = "write_counters"
+
+    name = Column(Text, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
 class FileSearch(Base):
     """FTS5 全文搜索虚拟表 - 用于高性能文件名搜索
     
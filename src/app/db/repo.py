@@ -1,19 +1,40 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
+import json
+import os
 from typing import Iterable
 
-from sqlalchemy import delete, func, select, text, update
+from sqlalchemy import and_, delete, exists, false, func, not_, or_, select, text, true, update
 from sqlalchemy.orm import Session
 
 from ..core.indexer import FileMeta
-from ..core.search import SearchQuery, SearchResult
+from ..core.search import FolderResult, SearchQuery, SearchResult
+from ..core.tag_expr import (
+    TagAnd,
+    TagExpr,
+    TagNot,
+    TagTerm,
+    evaluate_tag_expression,
+    expression_tag_names,
+    plan_operands,
+    tags_to_expression,
+)
 from ..core.tag_manager import TagSpec
-from .models import File, FileTag, FileSearch, Tag
+from .models import File, FileTag, FileSearch, Tag, TagTypeCount
+from .session import get_tag_index, queue_tag_index_update
 
 # 批量操作默认批次大小
 DEFAULT_BATCH_SIZE = 500
+# 超过此数量的 ID 列表通过 json_each 传入，避免触及 SQLite 参数个数上限
+MAX_INLINE_IDS = 500
+
+
+def _folder_range(folder: str) -> tuple[str, str]:
+    """目录下所有路径的区间 [prefix, upper)，用于可走索引的前缀查询"""
+    prefix = folder.rstrip("/\\") + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
 
 
 @dataclass
@@ -156,6 +177,33 @@ class Repo:
             if file_id is not None
         ]
 
+    def list_files_after(
+        self, after_id: int, limit: int, types: Iterable[str] = ("image", "video")
+    ) -> list[SearchResult]:
+        """按 ID 顺序取 after_id 之后的指定类型文件（可断点续传的批量遍历）"""
+        stmt = (
+            select(File.id, File.path, File.name, File.type, File.size, File.modified_at)
+            .where(File.id > after_id, File.type.in_(list(types)))
+            .order_by(File.id)
+            .limit(limit)
+        )
+        return [
+            SearchResult(
+                file_id=row.id,
+                path=row.path,
+                name=row.name,
+                type=row.type,
+                size=row.size,
+                modified_at=row.modified_at,
+            )
+            for row in self.session.execute(stmt)
+        ]
+
+    def count_files_after(self, after_id: int, types: Iterable[str] = ("image", "video")) -> int:
+        """after_id 之后的指定类型文件数"""
+        stmt = select(func.count(File.id)).where(File.id > after_id, File.type.in_(list(types)))
+        return int(self.session.execute(stmt).scalar_one())
+
     def update_file_meta(self, file_row: File, meta: FileMeta) -> None:
         """更新文件元数据"""
         file_row.path = str(meta.path)  # type: ignore[assignment]
@@ -189,6 +237,7 @@ class Repo:
             return
         self.session.execute(delete(FileTag).where(FileTag.file_id.in_(file_ids)))
         self.session.execute(delete(File).where(File.id.in_(file_ids)))
+        queue_tag_index_update(self.session, "remove_files", file_ids)
 
     # ========== 标签操作 ==========
 
@@ -196,6 +245,16 @@ class Repo:
         """获取所有标签列表"""
         return list(self.session.execute(select(Tag)).scalars())
 
+    def tag_type_counts(self) -> dict[int, dict[str, int]]:
+        """获取每个标签按文件类型的使用数量（物化统计，无聚合查询）"""
+        stmt = select(TagTypeCount.tag_id, TagTypeCount.type, TagTypeCount.file_count).where(
+            TagTypeCount.file_count > 0
+        )
+        counts: dict[int, dict[str, int]] = {}
+        for tag_id, file_type, file_count in self.session.execute(stmt):
+            counts.setdefault(int(tag_id), {})[str(file_type)] = int(file_count)
+        return counts
+
     def get_tag_by_name(self, name: str) -> Tag | None:
         """通过名称获取标签"""
         return self.session.execute(select(Tag).where(Tag.name == name)).scalar_one_or_none()
@@ -270,162 +329,370 @@ class Repo:
         stmt = select(File).where(File.id.in_(file_ids))
         return list(self.session.execute(stmt).scalars())
 
+    def existing_file_ids(self, file_ids: Iterable[int]) -> set[int]:
+        """返回给定 ID 中仍存在于索引的文件 ID"""
+        file_ids = [int(file_id) for file_id in file_ids]
+        if not file_ids:
+            return set()
+        stmt = select(File.id).where(self._id_in(File.id, file_ids))
+        return set(self.session.execute(stmt).scalars())
+
+    def existing_tag_ids(self, tag_ids: Iterable[int]) -> set[int]:
+        """返回给定 ID 中仍存在的标签 ID"""
+        tag_ids = [int(tag_id) for tag_id in tag_ids]
+        if not tag_ids:
+            return set()
+        stmt = select(Tag.id).where(self._id_in(Tag.id, tag_ids))
+        return set(self.session.execute(stmt).scalars())
+
     def delete_tag(self, tag_id: int) -> None:
         """删除标签及其关联"""
         self.session.execute(delete(FileTag).where(FileTag.tag_id == tag_id))
         tag = self.session.execute(select(Tag).where(Tag.id == tag_id)).scalar_one_or_none()
         if tag is not None:
             self.session.delete(tag)
+        queue_tag_index_update(self.session, "remove_tag", tag_id)
 
     # ========== 文件-标签关联操作 ==========
 
     def attach_tags(self, file_row: File, tags: Iterable[Tag]) -> None:
         """为文件添加标签（跳过已存在的）"""
         existing = {tag.id for tag in file_row.tags}
+        added: list[int] = []
         for tag in tags:
             if tag.id not in existing:
                 file_row.tags.append(tag)
+                added.append(int(tag.id))
+        if added:
+            queue_tag_index_update(self.session, "add", [int(file_row.id)], added)
 
     def attach_tags_to_files(
         self, file_ids: Iterable[int], tag_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE
     ) -> None:
         """批量为多个文件添加标签
-        
+
+        每批执行一条 `INSERT OR IGNORE ... SELECT`，由数据库完成文件 × 标签的组合，
+        跳过已存在的关联。只对确实存在的文件/标签操作，位图索引也只登记这些 ID，
+        不存在（或刚被删除）的 ID 不会在索引中留下标记。
+
         Args:
             file_ids: 文件 ID 列表
             tag_ids: 标签 ID 列表
             batch_size: 批次大小
         """
-        file_ids = list(file_ids)
-        tag_ids = list(tag_ids)
+        file_ids = [int(file_id) for file_id in file_ids]
+        tag_ids = sorted(self.existing_tag_ids(tag_ids)) if file_ids else []
         
         if not file_ids or not tag_ids:
             return
         
-        # 获取已存在的关联，避免重复
-        existing = {
-            (ft.file_id, ft.tag_id)
-            for ft in self.session.execute(
-                select(FileTag).where(
-                    FileTag.file_id.in_(file_ids),
-                    FileTag.tag_id.in_(tag_ids),
-                )
-            ).scalars()
-        }
-        
-        # 批量插入新关联
-        new_associations: list[dict] = []
-        for file_id in file_ids:
-            for tag_id in tag_ids:
-                if (file_id, tag_id) not in existing:
-                    new_associations.append({"file_id": file_id, "tag_id": tag_id})
-                    if len(new_associations) >= batch_size:
-                        self.session.execute(FileTag.__table__.insert(), new_associations)
-                        new_associations.clear()
-        
-        if new_associations:
-            self.session.execute(FileTag.__table__.insert(), new_associations)
+        attached: list[int] = []
+        for start in range(0, len(file_ids), batch_size):
+            chunk = sorted(self.existing_file_ids(file_ids[start:start + batch_size]))
+            if not chunk:
+                continue
+            attached.extend(chunk)
+            pairs = (
+                select(File.id, Tag.id)
+                .join(Tag, true())  # 显式交叉连接
+                .where(self._id_in(File.id, chunk), self._id_in(Tag.id, tag_ids))
+            )
+            self.session.execute(
+                FileTag.__table__.insert()
+                .prefix_with("OR IGNORE")
+                .from_select(["file_id", "tag_id"], pairs)
+            )
+        if attached:
+            queue_tag_index_update(self.session, "add", attached, tag_ids)
+
+    def detach_tags_from_files(
+        self, file_ids: Iterable[int], tag_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        """批量从多个文件移除标签（按批次执行 DELETE）"""
+        file_ids = [int(file_id) for file_id in file_ids]
+        tag_ids = sorted(self.existing_tag_ids(tag_ids)) if file_ids else []
+        if not file_ids or not tag_ids:
+            return
+        detached: list[int] = []
+        for start in range(0, len(file_ids), batch_size):
+            chunk = sorted(self.existing_file_ids(file_ids[start:start + batch_size]))
+            if not chunk:
+                continue
+            detached.extend(chunk)
+            self.session.execute(
+                delete(FileTag).where(FileTag.file_id.in_(chunk), FileTag.tag_id.in_(tag_ids))
+            )
+        if detached:
+            queue_tag_index_update(self.session, "remove", detached, tag_ids)
+
+    def replace_tags_for_files(
+        self, file_ids: Iterable[int], tag_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        """批量将多个文件的标签替换为指定标签集合
+
+        只删除不在目标集合中的关联，再插入缺失的关联，保留未变化的行。
+        """
+        file_ids = [int(file_id) for file_id in file_ids]
+        tag_ids = sorted(self.existing_tag_ids(tag_ids)) if file_ids else []
+        if not file_ids:
+            return
+        replaced: list[int] = []
+        for start in range(0, len(file_ids), batch_size):
+            chunk = sorted(self.existing_file_ids(file_ids[start:start + batch_size]))
+            if not chunk:
+                continue
+            replaced.extend(chunk)
+            stmt = delete(FileTag).where(FileTag.file_id.in_(chunk))
+            if tag_ids:
+                stmt = stmt.where(FileTag.tag_id.not_in(tag_ids))
+            self.session.execute(stmt)
+        if not replaced:
+            return
+        self.attach_tags_to_files(replaced, tag_ids, batch_size=batch_size)
+        queue_tag_index_update(self.session, "replace", replaced, tag_ids)
 
     def detach_all_tags(self, file_row: File) -> None:
         """移除文件的所有标签"""
         file_row.tags.clear()
+        queue_tag_index_update(self.session, "remove_files", [int(file_row.id)])
 
     def replace_tags(self, file_row: File, tags: Iterable[Tag]) -> None:
         """替换文件的所有标签"""
-        file_row.tags = list(tags)
+        tags = list(tags)
+        file_row.tags = tags
+        queue_tag_index_update(
+            self.session, "replace", [int(file_row.id)], [int(tag.id) for tag in tags]
+        )
 
     def remove_tag_from_file(self, file_row: File, tag: Tag) -> None:
         """从文件移除单个标签"""
         if tag in file_row.tags:
             file_row.tags.remove(tag)
+            queue_tag_index_update(self.session, "remove", [int(file_row.id)], [int(tag.id)])
 
     def remove_tags_from_file(self, file_row: File, tags: Iterable[Tag]) -> None:
         """从文件批量移除标签"""
+        removed: list[int] = []
         for tag in tags:
             if tag in file_row.tags:
                 file_row.tags.remove(tag)
+                removed.append(int(tag.id))
+        if removed:
+            queue_tag_index_update(self.session, "remove", [int(file_row.id)], removed)
 
     # ========== 搜索功能 ==========
 
-    def search(self, query: SearchQuery, limit: int | None = None) -> list[SearchResult]:
+    def search(
+        self,
+        query: SearchQuery,
+        limit: int | None = None,
+        offset: int = 0,
+        file_ids: Iterable[int] | None = None,
+    ) -> list[SearchResult]:
         """文件搜索 - 支持多种搜索条件
         
         Args:
             query: 搜索查询对象，包含文本、类型、标签等条件
             limit: 结果数量限制
+            offset: 跳过的结果数量（分页加载）
+            file_ids: 只在这些文件中匹配（增量刷新视图时使用）
         
         Returns:
             搜索结果列表
         """
-        stmt = select(File)
+        conditions = self._search_conditions(
+            query, None if limit is None or file_ids is not None else offset + limit
+        )
+        if conditions is None:
+            return []
+        if file_ids is not None:
+            conditions.append(self._id_in(File.id, list(file_ids)))
+        stmt = select(File).where(*conditions)
+
+        # 排序
+        if query.sort_by:
+            sort_map = {
+                "name": File.name,
+                "size": File.size,
+                "type": File.type,
+                "created_at": File.created_at,
+                "updated_at": File.updated_at,
+                "modified_at": File.modified_at,
+            }
+            column = sort_map.get(query.sort_by)
+            if column is not None:
+                stmt = stmt.order_by(column.desc() if query.sort_desc else column.asc())
+        # ID 作为次级排序，保证分页结果稳定
+        stmt = stmt.order_by(File.id)
+
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        if offset:
+            stmt = stmt.offset(offset)
+
+        # 只取结果需要的列，避免为每行构造 ORM 对象
+        stmt = stmt.with_only_columns(
+            File.id, File.path, File.name, File.type, File.size, File.modified_at
+        )
+        return [
+            SearchResult(
+                file_id=row.id,
+                path=row.path,
+                name=row.name,
+                type=row.type,
+                size=row.size,
+                modified_at=row.modified_at,
+            )
+            for row in self.session.execute(stmt)
+        ]
+
+    def list_child_folders(self, query: SearchQuery, parent: str) -> list[FolderResult]:
+        """列出 parent 下包含匹配文件的直接子目录（按名称排序）
+
+        子目录由文件路径推导：对 parent 路径区间内的文件取下一级路径段去重，
+        区间查询可以使用 path 索引。query 的其余条件（文本、类型、标签）同样生效，
+        query.folder 被忽略。
+
+        Args:
+            query: 搜索条件
+            parent: 父目录路径
+        """
+        conditions = self._search_conditions(replace(query, folder=None), None)
+        if conditions is None:
+            return []
+        prefix, upper = _folder_range(parent)
+        rest = func.substr(File.path, len(prefix) + 1)
+        position = func.instr(rest, os.sep)
+        child = func.substr(rest, 1, position - 1)
+        # 子目录下一级是否还有目录
+        nested = func.max(func.instr(func.substr(rest, position + 1), os.sep) > 0)
+        stmt = (
+            select(child.label("child"), nested.label("nested"))
+            .where(*conditions, File.path >= prefix, File.path < upper, position > 0)
+            .group_by(child)
+            .order_by(func.lower(child))
+        )
+        return [
+            FolderResult(path=prefix + row.child, name=row.child, has_children=bool(row.nested))
+            for row in self.session.execute(stmt)
+        ]
+
+    def _search_conditions(self, query: SearchQuery, fts_limit: int | None) -> list | None:
+        """把搜索条件编译为 WHERE 条件列表；确定无结果时返回 None"""
+        conditions: list = []
 
         # 文本搜索：优先使用 FTS5，回退到 LIKE
         if query.text:
             if query.use_fts and self._has_fts5() and self._should_use_fts(query.text):
                 # 使用 FTS5 全文搜索
-                fts_ids = self._fts_search(query.text, limit)
+                fts_ids = self._fts_search(query.text, fts_limit)
                 if fts_ids:
-                    stmt = stmt.where(File.id.in_(fts_ids))
+                    conditions.append(File.id.in_(fts_ids))
                 else:
                     # FTS 无结果，回退到 LIKE
                     term = f"%{query.text}%"
-                    stmt = stmt.where(File.name.ilike(term))
+                    conditions.append(File.name.ilike(term))
             else:
                 # 无 FTS5 或不适合用 FTS，使用 LIKE
                 term = f"%{query.text}%"
-                stmt = stmt.where(File.name.ilike(term))
+                conditions.append(File.name.ilike(term))
 
         # 路径前缀过滤
         if query.root:
             root = query.root.rstrip("/\\") + "%"
-            stmt = stmt.where(File.path.like(root))
+            conditions.append(File.path.like(root))
+
+        # 目录过滤：路径区间 + 剩余部分不含分隔符，即直接子文件
+        if query.folder:
+            prefix, upper = _folder_range(query.folder)
+            conditions.append(File.path >= prefix)
+            conditions.append(File.path < upper)
+            conditions.append(func.instr(func.substr(File.path, len(prefix) + 1), os.sep) == 0)
 
         # 文件类型过滤
         if query.types:
-            stmt = stmt.where(File.type.in_(query.types))
-
-        # 标签过滤
-        if query.tags:
-            stmt = stmt.join(FileTag, FileTag.file_id == File.id).join(
-                Tag, Tag.id == FileTag.tag_id
-            )
-            stmt = stmt.where(Tag.name.in_(query.tags))
-            if query.match_all_tags:
-                stmt = stmt.group_by(File.id).having(
-                    func.count(func.distinct(Tag.name)) == len(query.tags)
-                )
+            conditions.append(File.type.in_(query.types))
+
+        # 标签过滤：扁平标签与布尔表达式合并后统一求值
+        tag_expr = tags_to_expression(query.tags, query.match_all_tags)
+        if query.tag_expr is not None:
+            tag_expr = query.tag_expr if tag_expr is None else TagAnd((tag_expr, query.tag_expr))
+        if tag_expr is not None:
+            tag_ids, counts = self._tag_stats_by_name(expression_tag_names(tag_expr))
+            if query.use_tag_index:
+                condition = self._tag_expr_index_condition(tag_expr, tag_ids, counts)
             else:
-                stmt = stmt.distinct()
+                condition = self._tag_expr_sql_condition(tag_expr, tag_ids, counts)
+            if condition is None:
+                return None
+            conditions.append(condition)
+        return conditions
 
-        # 排序
-        if query.sort_by:
-            sort_map = {
-                "name": File.name,
-                "size": File.size,
-                "type": File.type,
-                "created_at": File.created_at,
-                "updated_at": File.updated_at,
-                "modified_at": File.modified_at,
-            }
-            column = sort_map.get(query.sort_by)
-            if column is not None:
-                stmt = stmt.order_by(column.desc() if query.sort_desc else column.asc())
+    def _tag_stats_by_name(
+        self, names: Iterable[str]
+    ) -> tuple[dict[str, int], dict[str, int]]:
+        """查询标签 ID 与使用数量（不存在的标签不出现在结果中）
 
-        if limit is not None:
-            stmt = stmt.limit(limit)
+        Returns:
+            (标签名 → 标签 ID, 标签名 → 关联文件数)
+        """
+        names = list(names)
+        if not names:
+            return {}, {}
+        stmt = select(Tag.name, Tag.id, Tag.file_count).where(Tag.name.in_(names))
+        tag_ids: dict[str, int] = {}
+        counts: dict[str, int] = {}
+        for name, tag_id, file_count in self.session.execute(stmt):
+            tag_ids[str(name)] = int(tag_id)
+            counts[str(name)] = int(file_count or 0)
+        return tag_ids, counts
+
+    def _tag_expr_index_condition(
+        self, expr: TagExpr, tag_ids: dict[str, int], counts: dict[str, int]
+    ):
+        """通过标签位图索引求值表达式，生成文件 ID 过滤条件
 
-        rows = self.session.execute(stmt).scalars().all()
-        results: list[SearchResult] = []
-        for row in rows:
-            results.append(
-                SearchResult(
-                    file_id=row.id,  # type: ignore[arg-type]
-                    path=row.path,  # type: ignore[arg-type]
-                    name=row.name,  # type: ignore[arg-type]
-                    type=row.type,  # type: ignore[arg-type]
-                )
-            )
-        return results
+        Returns:
+            SQL 条件；结果必为空集时返回 None
+        """
+        index = get_tag_index()
+        bitmaps = {name: index.bitmap(tag_id) for name, tag_id in tag_ids.items()}
+        bitmap, negated = evaluate_tag_expression(expr, bitmaps, counts)
+        file_ids = index.file_ids(bitmap)
+        if negated:
+            return not_(self._id_in(File.id, file_ids)) if file_ids else true()
+        if not file_ids:
+            return None
+        return self._id_in(File.id, file_ids)
+
+    def _tag_expr_sql_condition(
+        self, expr: TagExpr, tag_ids: dict[str, int], counts: dict[str, int]
+    ):
+        """将表达式编译为 EXISTS/NOT EXISTS 子查询
+
+        AND/OR 的子条件按 `tags.file_count` 升序排列，让最有选择性的条件先执行。
+        """
+
+        def compile_expr(node: TagExpr):
+            if isinstance(node, TagTerm):
+                tag_id = tag_ids.get(node.name)
+                if tag_id is None:
+                    return false()
+                return exists().where(FileTag.file_id == File.id, FileTag.tag_id == tag_id)
+            if isinstance(node, TagNot):
+                return not_(compile_expr(node.operand))
+            clauses = [compile_expr(operand) for operand in plan_operands(node, counts)]
+            return and_(*clauses) if isinstance(node, TagAnd) else or_(*clauses)
+
+        return compile_expr(expr)
+
+    @staticmethod
+    def _id_in(column, ids: list[int]):
+        """生成 `column IN (...)` 条件，大列表通过 json_each 作为单个参数传入"""
+        if len(ids) <= MAX_INLINE_IDS:
+            return column.in_(ids)
+        values = func.json_each(json.dumps(ids)).table_valued("value")
+        return column.in_(select(values.c.value))
 
     def search_by_fts(self, text: str, limit: int | None = None) -> list[SearchResult]:
         """使用 FTS5 全文搜索文件名
@@ -459,6 +726,8 @@ class Repo:
                         path=f.path,  # type: ignore[arg-type]
                         name=f.name,  # type: ignore[arg-type]
                         type=f.type,  # type: ignore[arg-type]
+                        size=f.size,  # type: ignore[arg-type]
+                        modified_at=f.modified_at,  # type: ignore[arg-type]
                     )
                 )
         return results
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 from pathlib import Path
+import hashlib
+import threading
+
 from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from sqlalchemy.pool import QueuePool
 
+from ..core.tag_index import TagBitmapIndex
+
 Base = declarative_base()
 SessionLocal = sessionmaker(autoflush=False, autocommit=False)
 _engine = None
 _engine_path: Path | None = None
+_db_key = "nodb"
+# 数据库写入代数：任何写操作后递增，用于使查询缓存失效
+_generation = 0
+_generation_lock = threading.Lock()
+# 标签位图索引（按需构建，随引擎切换重置）
+_tag_index: TagBitmapIndex | None = None
+_tag_index_lock = threading.Lock()
 
 # 连接池配置常量
 POOL_SIZE = 5              # 连接池保持的连接数
@@ -24,11 +36,14 @@ def init_db(db_path: Path) -> None:
     Args:
         db_path: SQLite 数据库文件路径
     """
-    global _engine, _engine_path
+    global _engine, _engine_path, _tag_index, _db_key
     db_path.parent.mkdir(parents=True, exist_ok=True)
     
     if _engine is None or _engine_path != db_path:
         from . import models
+        if _engine is not None:
+            save_tag_index()
+        _tag_index = None
         # 创建带连接池的引擎
         # 使用 QueuePool 实现连接复用，减少连接开销
         _engine = create_engine(
@@ -45,7 +60,36 @@ def init_db(db_path: Path) -> None:
         Base.metadata.create_all(bind=_engine, tables=_schema_tables())
         _ensure_schema()
         _init_fts5()
+        _init_tag_counts()
+        _init_write_counters()
         _engine_path = db_path
+        _db_key = hashlib.sha1(str(db_path).encode("utf-8")).hexdigest()[:12]
+        bump_generation()
+
+
+def bump_generation() -> int:
+    """递增数据库写入代数
+
+    扫描、标签变更、文件监听等写操作完成后调用，
+    使依赖旧数据的缓存（如搜索结果缓存）失效。
+
+    Returns:
+        递增后的代数
+    """
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        return _generation
+
+
+def current_generation() -> int:
+    """获取当前数据库写入代数"""
+    return _generation
+
+
+def current_db_key() -> str:
+    """当前数据库的短标识，用于区分共享缓存（如缩略图）中不同工作空间的文件 ID"""
+    return _db_key
 
 
 def _ensure_schema() -> None:
@@ -53,10 +97,16 @@ def _ensure_schema() -> None:
     
     检查并添加缺失的列（如 modified_at），用于数据库升级。
     """
+    _add_column("files", "modified_at FLOAT")
+    _add_column("tags", "file_count INTEGER NOT NULL DEFAULT 0")
+
+
+def _add_column(table: str, column_sql: str) -> None:
+    """为旧数据库添加列（列已存在时忽略）"""
     session = SessionLocal()
     try:
         connection = session.connection()
-        connection.execute(text("ALTER TABLE files ADD COLUMN modified_at FLOAT"))
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_sql}"))
         session.commit()
     except Exception:
         session.rollback()
@@ -169,6 +219,131 @@ def _init_fts5() -> None:
         session.close()
 
 
+_TAG_COUNT_TRIGGERS = {
+    # 绑定标签：总数 +1，对应文件类型计数 +1
+    "file_tags_count_ai": """
+        CREATE TRIGGER file_tags_count_ai AFTER INSERT ON file_tags BEGIN
+            UPDATE tags SET file_count = file_count + 1 WHERE id = new.tag_id;
+            INSERT INTO tag_type_counts(tag_id, type, file_count)
+                SELECT new.tag_id, type, 1 FROM files WHERE id = new.file_id
+                ON CONFLICT(tag_id, type) DO UPDATE SET file_count = file_count + 1;
+        END
+    """,
+    # 解除绑定：总数 -1，对应文件类型计数 -1（删除文件时须先删除 file_tags）
+    "file_tags_count_ad": """
+        CREATE TRIGGER file_tags_count_ad AFTER DELETE ON file_tags BEGIN
+            UPDATE tags SET file_count = file_count - 1 WHERE id = old.tag_id;
+            UPDATE tag_type_counts SET file_count = file_count - 1
+                WHERE tag_id = old.tag_id
+                  AND type = (SELECT type FROM files WHERE id = old.file_id);
+        END
+    """,
+    # 文件类型变化：把该文件所有标签的计数从旧类型移到新类型
+    "files_type_count_au": """
+        CREATE TRIGGER files_type_count_au AFTER UPDATE OF type ON files
+        WHEN old.type IS NOT new.type BEGIN
+            UPDATE tag_type_counts SET file_count = file_count - 1
+                WHERE type = old.type
+                  AND tag_id IN (SELECT tag_id FROM file_tags WHERE file_id = new.id);
+            INSERT INTO tag_type_counts(tag_id, type, file_count)
+                SELECT tag_id, new.type, 1 FROM file_tags WHERE file_id = new.id
+                ON CONFLICT(tag_id, type) DO UPDATE SET file_count = file_count + 1;
+        END
+    """,
+    "tags_count_ad": """
+        CREATE TRIGGER tags_count_ad AFTER DELETE ON tags BEGIN
+            DELETE FROM tag_type_counts WHERE tag_id = old.id;
+        END
+    """,
+}
+
+
+def _init_tag_counts() -> None:
+    """初始化标签使用数量的物化统计
+
+    `tags.file_count` 与 `tag_type_counts` 由 file_tags/files 触发器维护，
+    标签面板与搜索规划器无需再对 file_tags 做聚合查询。
+    首次创建触发器时（新库或旧库升级）根据现有数据回填一次。
+    """
+    session = SessionLocal()
+    try:
+        connection = session.connection()
+        existing = {
+            row[0]
+            for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type='trigger'")
+            )
+        }
+        missing = [name for name in _TAG_COUNT_TRIGGERS if name not in existing]
+        if not missing:
+            return
+        for name in _TAG_COUNT_TRIGGERS:
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            connection.execute(text(_TAG_COUNT_TRIGGERS[name]))
+
+        # 回填
+        connection.execute(text("""
+            UPDATE tags SET file_count = (
+                SELECT count(*) FROM file_tags WHERE file_tags.tag_id = tags.id
+            )
+        """))
+        connection.execute(text("DELETE FROM tag_type_counts"))
+        connection.execute(text("""
+            INSERT INTO tag_type_counts(tag_id, type, file_count)
+            SELECT file_tags.tag_id, files.type, count(*)
+            FROM file_tags JOIN files ON files.id = file_tags.file_id
+            GROUP BY file_tags.tag_id, files.type
+        """))
+        session.commit()
+    except Exception:
+        session.rollback()
+    finally:
+        session.close()
+
+
+_WRITE_COUNTER_TRIGGERS = {
+    f"file_tags_version_{suffix}": f"""
+        CREATE TRIGGER file_tags_version_{suffix} AFTER {event} ON file_tags BEGIN
+            UPDATE write_counters SET value = value + 1 WHERE name = 'file_tags';
+        END
+    """
+    for suffix, event in (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE"))
+}
+
+
+def _init_write_counters() -> None:
+    """初始化 file_tags 写入计数
+
+    计数单调递增，任何关联的增删改（包括在两个文件之间交换标签这类
+    行数与 ID 和都不变的修改）都会改变它，标签位图索引的校验戳以此为准。
+    重新创建触发器时计数再加 1，使之前保存的索引失效。
+    """
+    session = SessionLocal()
+    try:
+        connection = session.connection()
+        connection.execute(
+            text("INSERT OR IGNORE INTO write_counters(name, value) VALUES ('file_tags', 0)")
+        )
+        existing = {
+            row[0]
+            for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type='trigger'")
+            )
+        }
+        if any(name not in existing for name in _WRITE_COUNTER_TRIGGERS):
+            for name, sql in _WRITE_COUNTER_TRIGGERS.items():
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+                connection.execute(text(sql))
+            connection.execute(
+                text("UPDATE write_counters SET value = value + 1 WHERE name = 'file_tags'")
+            )
+        session.commit()
+    except Exception:
+        session.rollback()
+    finally:
+        session.close()
+
+
 def get_session() -> Session:
     """获取数据库会话
     
@@ -224,3 +399,105 @@ def rebuild_fts_index() -> None:
         session.rollback()
     finally:
         session.close()
+
+
+# ========== 标签位图索引 ==========
+
+_TAG_INDEX_OPS = "tag_index_ops"
+
+
+def _tag_index_path() -> Path | None:
+    if _engine_path is None:
+        return None
+    return _engine_path.with_suffix(".tagidx")
+
+
+def _tag_index_stamp(connection) -> tuple[int, int, int]:
+    """计算 file_tags 校验戳（写入计数 + 行数 + 文件 ID 和），用于判断持久化索引是否过期"""
+    row = connection.execute(
+        text("""
+            SELECT
+                (SELECT value FROM write_counters WHERE name = 'file_tags'),
+                count(*),
+                total(file_id)
+            FROM file_tags
+        """)
+    ).one()
+    return int(row[0] or 0), int(row[1]), int(row[2])
+
+
+def get_tag_index() -> TagBitmapIndex:
+    """获取当前数据库的标签位图索引
+
+    首次调用时优先加载持久化索引，校验失败则从 file_tags 全量构建。
+    之后由 Repo 的标签写操作在事务提交后增量维护。
+    """
+    global _tag_index
+    index = _tag_index
+    if index is not None:
+        return index
+    with _tag_index_lock:
+        if _tag_index is not None:
+            return _tag_index
+        session = SessionLocal()
+        try:
+            connection = session.connection()
+            path = _tag_index_path()
+            index = None
+            if path is not None:
+                index = TagBitmapIndex.load(path, _tag_index_stamp(connection))
+            if index is None:
+                pairs = connection.execute(text("SELECT file_id, tag_id FROM file_tags"))
+                index = TagBitmapIndex.from_pairs(pairs)
+        finally:
+            session.close()
+        _tag_index = index
+        return index
+
+
+def save_tag_index() -> bool:
+    """持久化标签位图索引（应用退出或切换数据库时调用）"""
+    index = _tag_index
+    path = _tag_index_path()
+    if index is None or path is None:
+        return False
+    session = SessionLocal()
+    try:
+        stamp = _tag_index_stamp(session.connection())
+    except Exception:
+        return False
+    finally:
+        session.close()
+    return index.save(path, stamp)
+
+
+def queue_tag_index_update(session: Session, op: str, *args) -> None:
+    """登记标签位图索引的变更，事务提交后才会应用
+
+    Args:
+        session: 执行写操作的会话
+        op: `TagBitmapIndex` 的维护方法名（add/remove/replace/remove_files/remove_tag）
+        args: 方法参数
+    """
+    session.info.setdefault(_TAG_INDEX_OPS, []).append((op, args))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_tag_index_ops(session: Session) -> None:
+    ops = session.info.pop(_TAG_INDEX_OPS, None)
+    if not ops:
+        return
+    # 持锁应用，避免与正在进行的全量构建交错（所有操作均为幂等的终态设置）
+    with _tag_index_lock:
+        index = _tag_index
+        if index is None:
+            return
+        for op, args in ops:
+            getattr(index, op)(*args)
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _discard_tag_index_ops(session: Session, transaction) -> None:
+    # 回滚或事务结束后丢弃未提交的变更
+    if transaction.parent is None:
+        session.info.pop(_TAG_INDEX_OPS, None)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import multiprocessing
 import sys
 
 from PySide6.QtWidgets import QApplication
@@ -10,6 +11,8 @@ from .ui.main_window import MainWindow
 
 
 def main() -> int:
+    # 打包后的可执行文件启动缩略图工作进程时需要
+    multiprocessing.freeze_support()
     config = load_config()
     init_db(config.db_path)
 
@@ -0,0 +1,220 @@
+"""
+缩略图解码 - 以接近目标尺寸的分辨率解码源图片
+
+- 内嵌 EXIF 缩略图足够大时直接使用，完全不解码原图（相机 JPEG 通常内嵌 160x120 左右的预览）
+- JPEG 通过 draft() 让解码器按 1/2、1/4、1/8 做 DCT 缩放，直接输出接近目标尺寸的小图
+- 缩放使用 reducing_gap：先 reduce() 整数倍缩小，再在小图上做高质量重采样
+- EXIF 方向在缩小之后再应用；先旋转会强制全尺寸解码，使 draft() 失效
+
+只依赖 Pillow，不导入 Qt，可在缩略图工作进程中使用（见 thumbnail_worker）。
+"""
+from __future__ import annotations
+
+from io import BytesIO
+from pathlib import Path
+from typing import Literal
+
+from PIL import ExifTags, Image
+
+# draft()/reduce() 保留的余量：解码结果至少为目标尺寸的该倍数，再做高质量缩放
+REDUCING_GAP = 2.0
+# 内嵌缩略图与原图宽高比的允许误差（部分相机的内嵌图带黑边）
+EXIF_ASPECT_TOLERANCE = 0.02
+
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def decode_thumbnail(
+    path: Path,
+    size: tuple[int, int],
+    *,
+    use_draft: bool = True,
+    use_exif_thumbnail: bool = True,
+    reducing_gap: float | None = REDUCING_GAP,
+) -> Image.Image:
+    """解码图片并缩小到 size 以内（已按 EXIF 方向校正）
+
+    Args:
+        path: 图片路径
+        size: 目标尺寸（物理像素），结果保持宽高比
+        use_draft: JPEG 是否使用 DCT 缩放解码
+        use_exif_thumbnail: 是否优先使用足够大的内嵌 EXIF 缩略图
+        reducing_gap: 传给 Image.thumbnail()，None 表示在全尺寸图上直接重采样
+
+    Returns:
+        已加载到内存、与源文件无关的图片
+    """
+    with Image.open(path) as image:
+        orientation = _orientation(image)
+        thumb = _exif_thumbnail(image, size, orientation) if use_exif_thumbnail else None
+        if thumb is None:
+            if use_draft and image.format == "JPEG":
+                # 方向为 5-8 时宽高互换，按旋转前的方向请求
+                width, height = size if orientation < 5 else (size[1], size[0])
+                gap = reducing_gap or 1.0
+                image.draft(
+                    "RGB" if image.mode in ("RGB", "YCbCr") else None,
+                    (int(width * gap), int(height * gap)),
+                )
+            thumb = image
+            thumb.thumbnail(
+                size if orientation < 5 else (size[1], size[0]),
+                reducing_gap=reducing_gap,
+            )
+            # 关闭文件会释放解码结果，复制一份（此时已是小图）
+            thumb = thumb.copy()
+    return _apply_orientation(thumb, orientation)
+
+
+def _orientation(image: Image.Image) -> int:
+    try:
+        return int(image.getexif().get(ExifTags.Base.Orientation, 1))
+    except Exception:
+        return 1
+
+
+def _apply_orientation(image: Image.Image, orientation: int) -> Image.Image:
+    method = _ORIENTATION_TRANSPOSE.get(orientation)
+    return image if method is None else image.transpose(method)
+
+
+def _exif_thumbnail(
+    image: Image.Image, size: tuple[int, int], orientation: int
+) -> Image.Image | None:
+    """内嵌缩略图不小于缩放后的目标尺寸且宽高比一致时返回（未旋转）"""
+    raw = image.info.get("exif")
+    if not raw:
+        return None
+    try:
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(ExifTags.Base.JpegIFOffset)
+        length = ifd1.get(ExifTags.Base.JpegIFByteCount)
+        if not offset or not length:
+            return None
+        # 偏移量相对 TIFF 头，APP1 数据以 "Exif\0\0" 开头
+        tiff = raw[6:] if raw.startswith(b"Exif\x00\x00") else raw
+        data = tiff[offset:offset + length]
+        thumb = Image.open(BytesIO(data))
+        thumb.load()
+    except Exception:
+        return None
+
+    width, height = image.size
+    thumb_width, thumb_height = thumb.size
+    if abs(thumb_width / thumb_height - width / height) > EXIF_ASPECT_TOLERANCE * width / height:
+        return None
+    box = size if orientation < 5 else (size[1], size[0])
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    if thumb_width < round(width * scale) or thumb_height < round(height * scale):
+        return None
+    if thumb.mode != "RGB":
+        thumb = thumb.convert("RGB")
+    thumb.thumbnail(box, reducing_gap=REDUCING_GAP)
+    return thumb
+
+
+def calculate_dynamic_quality(size: tuple[int, int], original_size: tuple[int, int] | None = None) -> int:
+    """根据显示尺寸动态计算压缩质量
+    
+    原理：
+    - 小尺寸缩略图可以使用更低质量（人眼难以察觉）
+    - 大尺寸预览需要更高质量保持清晰度
+    
+    Args:
+        size: 目标缩略图尺寸
+        original_size: 原始图片尺寸（可选）
+    
+    Returns:
+        推荐的质量值 (50-95)
+    """
+    max_dimension = max(size)
+    
+    if max_dimension <= 64:
+        # 极小图标：质量可以很低
+        return 60
+    elif max_dimension <= 100:
+        # 小图标
+        return 70
+    elif max_dimension <= 200:
+        # 中等缩略图
+        return 80
+    elif max_dimension <= 400:
+        # 大缩略图
+        return 85
+    else:
+        # 预览尺寸
+        return 90
+
+
+class ThumbnailFormat:
+    """缩略图格式管理 - WebP 优先，JPEG 回退"""
+    
+    _webp_supported: bool | None = None
+    
+    @classmethod
+    def is_webp_supported(cls) -> bool:
+        """检测系统是否支持 WebP"""
+        if cls._webp_supported is not None:
+            return cls._webp_supported
+        
+        try:
+            # 尝试创建一个 WebP 图片
+            test_img = Image.new('RGB', (10, 10), color='red')
+            buffer = BytesIO()
+            test_img.save(buffer, 'WEBP')
+            cls._webp_supported = True
+        except Exception:
+            cls._webp_supported = False
+        
+        return cls._webp_supported
+    
+    @classmethod
+    def get_extension(cls) -> Literal[".webp", ".jpg"]:
+        """获取推荐的文件扩展名"""
+        return ".webp" if cls.is_webp_supported() else ".jpg"
+    
+    @classmethod
+    def get_save_kwargs(cls, quality: int, size: tuple[int, int]) -> dict:
+        """获取保存参数
+        
+        Args:
+            quality: 质量值
+            size: 目标尺寸
+        
+        Returns:
+            PIL Image.save() 的参数字典
+        """
+        if cls.is_webp_supported():
+            return {
+                "format": "WEBP",
+                "quality": quality,
+                "method": 6,  # 压缩方法 (0-6)，越高压缩率越好但越慢
+            }
+        else:
+            # JPEG 回退
+            # 根据尺寸调整 JPEG 质量
+            adjusted_quality = min(quality + 5, 95)  # JPEG 需要稍高质量补偿
+            return {
+                "format": "JPEG",
+                "quality": adjusted_quality,
+                "optimize": True,
+                "progressive": True,
+            }
+
+
+def encode_thumbnail(image: Image.Image, size: tuple[int, int]) -> bytes:
+    """缩放到 size 以内并编码为磁盘缓存格式 - 自动选择格式和质量"""
+    quality = calculate_dynamic_quality(size)
+    kwargs = ThumbnailFormat.get_save_kwargs(quality, size)
+    image.thumbnail(size)
+    buffer = BytesIO()
+    image.save(buffer, **kwargs)
+    return buffer.getvalue()
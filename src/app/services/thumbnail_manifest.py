@@ -0,0 +1,266 @@
+"""
+缩略图清单 - 记录磁盘缓存中每个缩略图的来源与访问信息
+
+清单位于 `thumbs_dir/manifest.db`，与存储后端无关。过期淘汰、容量淘汰、
+孤儿清理都是对清单的索引查询，不再遍历缓存目录逐个 stat。
+
+访问时间与命中次数先记录在内存中，由后台清理任务批量写回，避免 UI 线程读缓存时写库。
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+# 单条 SQL 中 IN (...) 的参数上限（低于 SQLite 默认的 999）
+_CHUNK = 500
+
+# 容量淘汰策略
+EVICTION_LRU = "lru"
+EVICTION_LFU = "lfu"
+EVICTION_POLICIES = (EVICTION_LRU, EVICTION_LFU)
+
+
+class ThumbnailManifest:
+    """
+    缩略图清单
+
+    表结构：
+        thumbnails(key, namespace, file_id, bytes, created_at, last_access, hits)
+    - namespace/file_id：来源文件所在库标识与文件 ID（缺少元数据时为空）
+    - last_access：最近一次命中时间，用于按 LRU 顺序淘汰
+    - hits：命中次数，用于 LFU 淘汰；每轮 LFU 淘汰后减半，避免历史热点长期占用
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.path = root / "manifest.db"
+        self._lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+        # key → (最近访问时间, 未落库的命中次数)
+        self._pending_access: dict[str, tuple[float, int]] = {}
+        # (数量, 总字节数)，首次查询后随写入/删除增量维护
+        self._totals: tuple[int, int] | None = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS thumbnails ("
+                " key TEXT PRIMARY KEY,"
+                " namespace TEXT,"
+                " file_id INTEGER,"
+                " bytes INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(thumbnails)")}
+            if "hits" not in columns:
+                conn.execute("ALTER TABLE thumbnails ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_thumbnails_last_access ON thumbnails(last_access)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_thumbnails_source ON thumbnails(namespace, file_id)"
+            )
+            # LFU 淘汰按 (hits, last_access) 顺序读取，老化只更新 hits > 0 的行
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_thumbnails_hits ON thumbnails(hits, last_access)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._conn = conn
+        return self._conn
+
+    # ========== 记录 ==========
+
+    def record(self, key: str, namespace: str | None, file_id: int | None, size: int) -> None:
+        """记录新写入的缩略图"""
+        now = time.time()
+        with self._lock:
+            self._pending_access.pop(key, None)
+            conn = self._db()
+            old = conn.execute("SELECT bytes FROM thumbnails WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO thumbnails"
+                " (key, namespace, file_id, bytes, created_at, last_access, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, namespace, file_id, size, now, now),
+            )
+            if self._totals is not None:
+                count, total = self._totals
+                if old is None:
+                    self._totals = (count + 1, total + size)
+                else:
+                    self._totals = (count, total - old[0] + size)
+
+    def touch(self, key: str) -> None:
+        """记录一次命中（仅写内存，由 flush_access() 批量落库）"""
+        with self._lock:
+            _, hits = self._pending_access.get(key, (0.0, 0))
+            self._pending_access[key] = (time.time(), hits + 1)
+
+    def flush_access(self) -> int:
+        """将内存中的访问时间写回清单"""
+        with self._lock:
+            pending = self._pending_access
+            self._pending_access = {}
+            if not pending:
+                return 0
+            conn = self._db()
+            conn.execute("BEGIN")
+            conn.executemany(
+                "UPDATE thumbnails SET last_access = ?, hits = hits + ? WHERE key = ?",
+                [(accessed, hits, key) for key, (accessed, hits) in pending.items()],
+            )
+            conn.execute("COMMIT")
+        return len(pending)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            removed_count = removed_bytes = 0
+            for start in range(0, len(keys), _CHUNK):
+                chunk = keys[start:start + _CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                count, size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM thumbnails"
+                    f" WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchone()
+                conn.execute(f"DELETE FROM thumbnails WHERE key IN ({placeholders})", chunk)
+                removed_count += count
+                removed_bytes += size
+            conn.execute("COMMIT")
+            for key in keys:
+                self._pending_access.pop(key, None)
+            if self._totals is not None:
+                count, total = self._totals
+                self._totals = (count - removed_count, total - removed_bytes)
+
+    # ========== 查询 ==========
+
+    def expired_keys(self, max_age_days: float) -> list[str]:
+        """超过指定天数未访问的缩略图"""
+        cutoff = time.time() - max_age_days * 24 * 3600
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key FROM thumbnails WHERE last_access < ?", (cutoff,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def over_budget_keys(self, max_bytes: int, policy: str = EVICTION_LRU) -> list[str]:
+        """总大小超出预算时返回需要淘汰的缩略图
+
+        Args:
+            max_bytes: 磁盘预算（字节）
+            policy: "lru" 按最久未访问淘汰；"lfu" 按命中次数最少淘汰（同次数再按访问时间），
+                淘汰后所有命中次数减半（老化）
+        """
+        order = "hits, last_access" if policy == EVICTION_LFU else "last_access"
+        with self._lock:
+            conn = self._db()
+            _, total = self.totals()
+            excess = total - max_bytes
+            if excess <= 0:
+                return []
+            keys: list[str] = []
+            for key, size in conn.execute(
+                f"SELECT key, bytes FROM thumbnails ORDER BY {order}"
+            ):
+                keys.append(key)
+                excess -= size
+                if excess <= 0:
+                    break
+            if policy == EVICTION_LFU:
+                conn.execute("UPDATE thumbnails SET hits = hits / 2 WHERE hits > 0")
+        return keys
+
+    def file_ids(self, namespace: str) -> list[int]:
+        """某个库下有缩略图的文件 ID"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT file_id FROM thumbnails"
+                " WHERE namespace = ? AND file_id IS NOT NULL",
+                (namespace,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def keys_for_files(self, namespace: str, file_ids: Iterable[int]) -> list[str]:
+        """指定文件的全部缩略图（各尺寸/类型）"""
+        file_ids = list(file_ids)
+        keys: list[str] = []
+        with self._lock:
+            conn = self._db()
+            for start in range(0, len(file_ids), _CHUNK):
+                chunk = file_ids[start:start + _CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key FROM thumbnails WHERE namespace = ? AND file_id IN ({placeholders})",
+                    (namespace, *chunk),
+                ).fetchall()
+                keys.extend(row[0] for row in rows)
+        return keys
+
+    def all_keys(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._db().execute("SELECT key FROM thumbnails")}
+
+    def totals(self) -> tuple[int, int]:
+        """(缩略图数量, 总字节数)，首次调用后为内存中的计数"""
+        with self._lock:
+            if self._totals is None:
+                count, total = self._db().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM thumbnails"
+                ).fetchone()
+                self._totals = (count, total)
+            return self._totals
+
+    def get_meta(self, name: str) -> str | None:
+        with self._lock:
+            row = self._db().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: str) -> None:
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self.flush_access()
+                finally:
+                    self._conn.close()
+                    self._conn = None
+
+
+_manifests: dict[Path, ThumbnailManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def open_thumbnail_manifest(root: Path) -> ThumbnailManifest:
+    """获取目录对应的共享清单实例"""
+    cache_key = root.resolve()
+    with _manifests_lock:
+        manifest = _manifests.get(cache_key)
+        if manifest is None:
+            manifest = ThumbnailManifest(root)
+            _manifests[cache_key] = manifest
+        return manifest
+
+
+def close_thumbnail_manifests() -> None:
+    """关闭所有共享清单（应用退出时调用）"""
+    with _manifests_lock:
+        for manifest in _manifests.values():
+            manifest.close()
+        _manifests.clear()
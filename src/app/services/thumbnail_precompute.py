@@ -0,0 +1,193 @@
+"""
+缩略图预生成 - 扫描完成后在后台为图片/视频生成缩略图
+
+- 按文件 ID 顺序遍历，游标（最后处理的 ID）定期写入缩略图清单，重启后从游标继续
+- 已存在的缩略图（键包含 size/mtime，未变化的文件命中）直接跳过，只生成新增或修改的文件
+- 限速：CPU 预算为生成耗时占比，I/O 预算为每秒读取的源文件字节数；界面有加载任务时让出
+- 生成任务以后台优先级提交到服务的调度器，与界面请求的同一缩略图合并，不会重复生成
+- 可暂停/继续；切换工作空间或停止后退出
+"""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Sequence
+
+from PySide6.QtCore import QObject, Signal
+
+from ..core.search import SearchResult
+from ..db.repo import Repo
+from ..db.session import current_db_key, get_session_context
+from .thumbnail_service import ThumbnailService, ThumbnailSize, ThumbnailSource
+
+logger = logging.getLogger(__name__)
+
+# 每批从数据库读取的文件数，也是游标写回的间隔
+PRECOMPUTE_BATCH = 200
+# 界面有缩略图加载任务时的等待间隔（秒）
+YIELD_INTERVAL = 0.2
+# 清单中的游标值：本轮已完成
+CURSOR_DONE = "done"
+# 进度信号的最小间隔（秒）
+PROGRESS_INTERVAL = 0.25
+
+
+class ThumbnailPrecomputer(QObject):
+    """
+    后台缩略图预生成任务
+
+    通过 `progress(done, total)` 汇报进度，`finished()` 在本轮完成（非暂停/停止）时发出。
+    信号在工作线程发出，接收方为 QObject 时自动排队到 UI 线程。
+    """
+
+    progress = Signal(int, int)
+    finished = Signal()
+
+    def __init__(
+        self,
+        service: ThumbnailService,
+        cpu_budget: float = 0.5,
+        io_budget_mb: float = 0.0,
+        parent: QObject | None = None,
+    ) -> None:
+        """
+        Args:
+            service: 缩略图服务（与界面共用，共享存储和生成后端）
+            cpu_budget: 生成耗时占墙钟时间的上限（0-1]
+            io_budget_mb: 每秒读取源文件的上限（MB），0 表示不限制
+        """
+        super().__init__(parent)
+        self._service = service
+        self._cpu_budget = min(1.0, max(0.05, cpu_budget))
+        self._io_budget = io_budget_mb * 1024 * 1024
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def start(self, sizes: Sequence[ThumbnailSize], restart: bool) -> None:
+        """开始预生成
+
+        Args:
+            sizes: 要生成的缩略图尺寸（在 UI 线程计算，已含设备像素比）
+            restart: True 表示从头开始新一轮（扫描完成后）；
+                False 只续上未完成的一轮（启动时），已完成则不做任何事
+        """
+        self.stop()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(list(sizes), restart, self._stop),
+            name="thumbnail-precompute",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def pause(self) -> None:
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def stop(self) -> None:
+        """停止并等待工作线程退出（游标已写回）"""
+        self._stop.set()
+        self._running.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # ========== 工作线程 ==========
+
+    def _run(self, sizes: list[ThumbnailSize], restart: bool, stop: threading.Event) -> None:
+        try:
+            self._precompute(sizes, restart, stop)
+        except Exception as e:
+            logger.warning(f"Thumbnail precompute failed: {e}")
+
+    def _precompute(self, sizes: list[ThumbnailSize], restart: bool, stop: threading.Event) -> None:
+        service = self._service
+        namespace = current_db_key()
+        cursor_name = f"precompute:{namespace}"
+        if restart:
+            cursor = 0
+        else:
+            value = service.get_meta(cursor_name)
+            if value is None or value == CURSOR_DONE:
+                return
+            cursor = int(value)
+
+        with get_session_context() as session:
+            total = Repo(session).count_files_after(cursor)
+        done = 0
+        reported = time.monotonic()
+        self.progress.emit(done, total)
+        while not stop.is_set():
+            with get_session_context() as session:
+                rows = Repo(session).list_files_after(cursor, PRECOMPUTE_BATCH)
+            if not rows:
+                service.set_meta(cursor_name, CURSOR_DONE)
+                self.progress.emit(done, total)
+                self.finished.emit()
+                return
+            for row in rows:
+                self._running.wait()
+                if stop.is_set() or namespace != current_db_key():
+                    break
+                self._wait_for_idle(stop)
+                self._precompute_file(row, sizes, stop)
+                if stop.is_set():
+                    # 中途停止的文件下次重新处理
+                    break
+                cursor = row.file_id
+                done += 1
+                if time.monotonic() - reported >= PROGRESS_INTERVAL:
+                    reported = time.monotonic()
+                    self.progress.emit(done, total)
+            service.set_meta(cursor_name, str(cursor))
+            if namespace != current_db_key():
+                return
+
+    def _wait_for_idle(self, stop: threading.Event) -> None:
+        """界面正在加载缩略图时让出 CPU 和生成后端"""
+        while self._service.loading and not stop.is_set():
+            stop.wait(YIELD_INTERVAL)
+
+    def _precompute_file(
+        self, row: SearchResult, sizes: list[ThumbnailSize], stop: threading.Event
+    ) -> None:
+        source = ThumbnailSource(Path(row.path), row.file_id, row.size, row.modified_at)
+        service = self._service
+        for size in sizes:
+            try:
+                cache_key = service.thumbnail_key(source, row.type, size)
+            except OSError:
+                return
+            if service.is_stored(cache_key):
+                continue
+            started = time.perf_counter()
+            job = service.submit_background(cache_key, source, row.type, size)
+            # 后台任务可能排在界面任务之后很久，等待时响应停止
+            while not job.done:
+                if stop.is_set():
+                    service.cancel_background(cache_key)
+                    return
+                job.wait(YIELD_INTERVAL)
+            elapsed = time.perf_counter() - started
+            # CPU 预算：生成耗时 t 后休息 t * (1 - b) / b
+            delay = elapsed * (1 - self._cpu_budget) / self._cpu_budget
+            # I/O 预算：读取 size 字节至少占用 size / rate 秒
+            if self._io_budget and row.size:
+                delay = max(delay, row.size / self._io_budget - elapsed)
+            if delay > 0 and stop.wait(delay):
+                return
@@ -0,0 +1,361 @@
+"""
+缩略图任务调度 - 持久的优先级队列
+
+- 优先级：可视项请求先于预加载，预加载先于后台预生成；预加载按视口中心距离与滚动方向排位
+- 去重：同一缓存键排队或运行中只有一个任务，重复请求合并到该任务（并提升优先级），
+  同一缩略图不会被并发生成两次
+- 取消：按缓存键取消单个任务或其中一个接收方；排队中的任务直接丢弃，
+  运行中的任务无法中断，但完成后不再通知已取消的接收方
+- 统计：队列深度、运行数、合并与取消次数、任务耗时与可视项的首次绘制延迟
+
+工作线程取自服务的 QThreadPool：有排队任务且工作者少于上限时启动一个 `_Worker`，
+工作者循环取出优先级最高的任务，队列为空时退出。
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Sequence
+
+from PySide6.QtCore import QRunnable, QThreadPool
+from PySide6.QtGui import QImage
+
+if TYPE_CHECKING:
+    from .thumbnail_service import ThumbnailService, ThumbnailSize, ThumbnailSource
+
+logger = logging.getLogger(__name__)
+
+# 任务类别（数值越小越先执行）
+PRIORITY_VISIBLE = 0
+PRIORITY_PRELOAD = 1
+PRIORITY_BACKGROUND = 2
+# 延迟统计保留的最近样本数
+LATENCY_SAMPLES = 256
+# 工作者在线程池中的优先级（高于清理任务）
+WORKER_POOL_PRIORITY = 10
+
+# 接收方：(缓存键, 图像或 None)，在工作线程调用
+Listener = Callable[[str, "QImage | None"], None]
+
+
+@dataclass(eq=False)
+class ThumbnailJob:
+    """一个缩略图的生成/读取任务"""
+
+    cache_key: str
+    source: ThumbnailSource
+    kind: str
+    size: ThumbnailSize
+    priority: int
+    rank: int
+    submitted_at: float
+    # 需要图像的接收方；为空时只确保磁盘缓存（预加载）
+    listeners: list[Listener] = field(default_factory=list)
+    # 有线程在 wait() 等待结果，不随接收方清空而取消
+    pinned: bool = False
+    state: str = "queued"  # queued / running / done / cancelled
+    succeeded: bool = False
+    # 堆中对应条目的序号；重新排位后旧条目作废
+    sequence: int = 0
+    _done: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def done(self) -> bool:
+        """任务已结束（完成或取消）"""
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """等待任务结束，返回是否成功生成"""
+        self._done.wait(timeout)
+        return self.succeeded
+
+
+def _percentile(samples: Sequence[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ThumbnailScheduler:
+    """缩略图任务调度器（每个 ThumbnailService 一个）"""
+
+    def __init__(self, service: ThumbnailService, pool: QThreadPool) -> None:
+        self._service = service
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._heap: list[tuple[int, int, int, ThumbnailJob]] = []
+        self._sequence = itertools.count()
+        # 缓存键 -> 排队或运行中的任务
+        self._jobs: dict[str, ThumbnailJob] = {}
+        self._queued = 0
+        self._running = 0
+        self._workers = 0
+        # 统计
+        self._max_queued = 0
+        self._completed = 0
+        self._deduped = 0
+        self._cancelled = 0
+        self._job_latency: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._paint_latency: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    # ========== 提交与取消 ==========
+
+    def submit(
+        self,
+        cache_key: str,
+        source: ThumbnailSource,
+        kind: str,
+        size: ThumbnailSize,
+        priority: int = PRIORITY_VISIBLE,
+        rank: int = 0,
+        listener: Listener | None = None,
+        pinned: bool = False,
+    ) -> ThumbnailJob:
+        """提交任务；同一缓存键已在排队或运行时合并，返回该任务"""
+        with self._lock:
+            job, start_worker = self._enqueue(
+                cache_key, source, kind, size, priority, rank, listener, pinned
+            )
+        if start_worker:
+            self._pool.start(_Worker(self), WORKER_POOL_PRIORITY)
+        return job
+
+    def cancel(self, cache_key: str, listener: Listener | None = None) -> bool:
+        """取消任务
+
+        指定 listener 时只移除该接收方，任务在没有接收方且无人等待时才取消；
+        否则直接取消排队中的任务。返回是否有任务被取消。
+        """
+        with self._lock:
+            job = self._jobs.get(cache_key)
+            if job is None:
+                return False
+            if listener is not None:
+                try:
+                    job.listeners.remove(listener)
+                except ValueError:
+                    pass
+                if job.listeners or job.pinned:
+                    return False
+            if job.state != "queued":
+                # 运行中的任务无法中断；接收方已移除，完成后不会收到通知
+                return False
+            self._drop(job)
+        job._done.set()
+        return True
+
+    def release(self, cache_key: str) -> bool:
+        """不再等待后台任务的结果
+
+        取消固定；排队中的后台任务没有接收方时丢弃，已被界面请求合并或提升的任务保留。
+        返回是否有任务被取消。
+        """
+        with self._lock:
+            job = self._jobs.get(cache_key)
+            if job is None:
+                return False
+            job.pinned = False
+            if job.listeners or job.state != "queued" or job.priority != PRIORITY_BACKGROUND:
+                return False
+            self._drop(job)
+        job._done.set()
+        return True
+
+    def replace_preload(
+        self, entries: Sequence[tuple[str, ThumbnailSource, str, ThumbnailSize]]
+    ) -> None:
+        """用新的预加载列表替换排队中的预加载任务
+
+        entries 按优先顺序排列（缓存键, 来源, 类型, 尺寸）；不在新列表中的排队预加载任务被取消，
+        仍在列表中的按新位次重新排队。
+        """
+        wanted = {entry[0] for entry in entries}
+        dropped: list[ThumbnailJob] = []
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if (
+                    job.state == "queued"
+                    and job.priority == PRIORITY_PRELOAD
+                    and not job.listeners
+                    and not job.pinned
+                    and job.cache_key not in wanted
+                ):
+                    self._drop(job)
+                    dropped.append(job)
+            start_worker = False
+            for rank, (cache_key, source, kind, size) in enumerate(entries):
+                _, started = self._enqueue(
+                    cache_key, source, kind, size, PRIORITY_PRELOAD, rank, None, False, merge=False
+                )
+                start_worker = start_worker or started
+        for job in dropped:
+            job._done.set()
+        if start_worker:
+            self._pool.start(_Worker(self), WORKER_POOL_PRIORITY)
+
+    def _enqueue(
+        self,
+        cache_key: str,
+        source: ThumbnailSource,
+        kind: str,
+        size: ThumbnailSize,
+        priority: int,
+        rank: int,
+        listener: Listener | None,
+        pinned: bool,
+        merge: bool = True,
+    ) -> tuple[ThumbnailJob, bool]:
+        """加入或合并任务，返回 (任务, 是否需要启动工作者)（持锁调用）
+
+        merge=False 表示预加载重新排位，不计入合并次数。
+        """
+        job = self._jobs.get(cache_key)
+        if job is not None:
+            if merge:
+                self._deduped += 1
+            if listener is not None:
+                job.listeners.append(listener)
+            job.pinned = job.pinned or pinned
+            if job.state == "queued" and (
+                priority < job.priority or (priority == job.priority == PRIORITY_PRELOAD)
+            ):
+                self._push(job, priority, rank)
+            return job, False
+        job = ThumbnailJob(
+            cache_key, source, kind, size, priority, rank, time.perf_counter(), pinned=pinned
+        )
+        if listener is not None:
+            job.listeners.append(listener)
+        self._jobs[cache_key] = job
+        self._queued += 1
+        self._max_queued = max(self._max_queued, self._queued)
+        self._push(job, priority, rank)
+        if self._workers < self._pool.maxThreadCount():
+            self._workers += 1
+            return job, True
+        return job, False
+
+    def _push(self, job: ThumbnailJob, priority: int, rank: int) -> None:
+        """（重新）放入堆中；旧条目按序号作废（持锁调用）"""
+        job.priority = priority
+        job.rank = rank
+        job.sequence = next(self._sequence)
+        heapq.heappush(self._heap, (priority, rank, job.sequence, job))
+        if len(self._heap) > 4 * self._queued + 256:
+            # 重新排位留下的作废条目过多时重建堆
+            self._heap = [
+                entry
+                for entry in self._heap
+                if entry[3].sequence == entry[2] and entry[3].state == "queued"
+            ]
+            heapq.heapify(self._heap)
+
+    def _drop(self, job: ThumbnailJob) -> None:
+        """丢弃排队中的任务（持锁调用）"""
+        job.state = "cancelled"
+        self._jobs.pop(job.cache_key, None)
+        self._queued -= 1
+        self._cancelled += 1
+
+    # ========== 执行 ==========
+
+    def _next_job(self) -> ThumbnailJob | None:
+        """取出下一个任务；队列为空时注销工作者并返回 None"""
+        with self._lock:
+            while self._heap:
+                _, _, sequence, job = heapq.heappop(self._heap)
+                if job.state == "queued" and job.sequence == sequence:
+                    job.state = "running"
+                    self._queued -= 1
+                    self._running += 1
+                    return job
+            self._workers -= 1
+            return None
+
+    def _run(self, job: ThumbnailJob) -> None:
+        service = self._service
+        with self._lock:
+            wants_image = bool(job.listeners)
+        image: QImage | None = None
+        succeeded = False
+        try:
+            if wants_image:
+                image = service.load_thumbnail_image(job.source, job.kind, job.size)
+                succeeded = image is not None
+            else:
+                succeeded = service.ensure_thumbnail(job.source, job.kind, job.size)
+        except Exception as e:
+            logger.debug(f"Thumbnail job failed: {e}")
+
+        with self._lock:
+            job.state = "done"
+            job.succeeded = succeeded
+            self._jobs.pop(job.cache_key, None)
+            self._running -= 1
+            self._completed += 1
+            self._job_latency.append(time.perf_counter() - job.submitted_at)
+            listeners = list(job.listeners)
+        job._done.set()
+
+        if listeners and image is None and succeeded:
+            # 运行期间才加入的接收方：缩略图已生成，读取即可
+            try:
+                image = service.read_thumbnail_image(job.cache_key)
+            except Exception:
+                image = None
+        for listener in listeners:
+            try:
+                listener(job.cache_key, image)
+            except Exception as e:
+                logger.debug(f"Thumbnail listener failed: {e}")
+
+    # ========== 统计 ==========
+
+    def record_first_paint(self, seconds: float) -> None:
+        """记录可视项从请求到结果交回 UI 线程的延迟"""
+        with self._lock:
+            self._paint_latency.append(seconds)
+
+    @property
+    def busy(self) -> bool:
+        """有排队或运行中的任务（不含后台预生成）"""
+        with self._lock:
+            return any(job.priority != PRIORITY_BACKGROUND for job in self._jobs.values())
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            paint = list(self._paint_latency)
+            jobs = list(self._job_latency)
+            return {
+                "queued": self._queued,
+                "running": self._running,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+                "deduped": self._deduped,
+                "cancelled": self._cancelled,
+                "first_paint_ms": round(sum(paint) / len(paint) * 1000, 1) if paint else 0.0,
+                "first_paint_p95_ms": round(_percentile(paint, 0.95) * 1000, 1),
+                "job_p95_ms": round(_percentile(jobs, 0.95) * 1000, 1),
+            }
+
+
+class _Worker(QRunnable):
+    """线程池中的工作者：循环执行调度器中的任务直到队列为空"""
+
+    def __init__(self, scheduler: ThumbnailScheduler) -> None:
+        super().__init__()
+        self._scheduler = scheduler
+
+    def run(self) -> None:
+        while True:
+            job = self._scheduler._next_job()
+            if job is None:
+                return
+            self._scheduler._run(job)
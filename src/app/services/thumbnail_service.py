@@ -3,35 +3,58 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from pathlib import Path
 import hashlib
+from io import BytesIO
 import logging
 import os
 import shutil
-import subprocess
+import threading
 import time
-from typing import Literal
+from typing import Sequence
 
 from PIL import Image
-from PySide6.QtCore import QRunnable, QThreadPool, QRect, QTimer
-from PySide6.QtGui import QPixmap, QGuiApplication
-from PySide6.QtWidgets import QListWidget, QListWidgetItem
+from PySide6.QtCore import QObject, QPoint, QRunnable, QThreadPool, QRect, QTimer, Signal
+from PySide6.QtGui import QImage, QPixmap, QGuiApplication
+from PySide6.QtWidgets import QListView
 
+from ..db.repo import Repo
+from ..db.session import current_db_key, get_session_context
+from .thumbnail_codec import ThumbnailFormat, encode_thumbnail
+from .thumbnail_manifest import EVICTION_LRU, open_thumbnail_manifest
+from .thumbnail_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_VISIBLE,
+    Listener,
+    ThumbnailJob,
+    ThumbnailScheduler,
+)
+from .thumbnail_store import STORE_FILES, ThumbnailStore, open_thumbnail_store
+from .thumbnail_worker import open_thumbnail_renderer
 from ..utils.windows_thumbnails import load_shell_thumbnail
-from ..utils.lru_cache import LRUCache
+from ..utils.cache_policy import POLICY_LRU
+from ..utils.lru_cache import ShardedLRUCache
 
 logger = logging.getLogger(__name__)
 
 
 # 缩略图配置常量
-DEFAULT_QUALITY = 80          # 默认 WebP 质量
-JPEG_FALLBACK_QUALITY = 85    # JPEG 回退质量
 BUFFER_ITEMS = 10             # 上下缓冲区项目数
 PRELOAD_DELAY_MS = 100        # 预加载延迟（防抖）
 MAX_PRELOAD_WORKERS = 4       # 最大并发预加载线程数
+BUDGET_SLACK = 1.1            # 磁盘占用超过预算的该倍数时立即触发后台淘汰
+MAX_ENCODED_ITEMS = 100_000   # 编码字节缓存条目上限（实际由内存上限约束）
+UNTRACKED_GRACE_SECONDS = 60  # 清理未登记缓存时跳过最近写入的条目（写入存储与登记清单之间）
+# 缩略图物理尺寸档位（最长边像素）：请求尺寸向上取整到档位，
+# 不同图标尺寸、DPR 与详情面板宽度共用同一缩略图；超出最大档位时取最大档位
+SIZE_BUCKETS = (128, 256, 512, 1024)
 
 
 @dataclass
 class ThumbnailSize:
-    """缩略图尺寸配置 - 支持 1x/2x 版本"""
+    """缩略图尺寸配置 - 支持 1x/2x 版本
+
+    磁盘与内存缓存按物理尺寸档位（`SIZE_BUCKETS`）存放，生成尺寸为档位的正方形边界框，
+    显示时由视图缩放到实际尺寸。
+    """
     logical_size: tuple[int, int]   # 逻辑尺寸（CSS像素）
     scale_factor: float = 1.0       # 设备像素比
     
@@ -43,10 +66,67 @@ class ThumbnailSize:
             int(self.logical_size[1] * self.scale_factor),
         )
     
+    @property
+    def bucket(self) -> int:
+        """覆盖物理尺寸的最小档位"""
+        edge = max(self.physical_size)
+        for bucket in SIZE_BUCKETS:
+            if edge <= bucket:
+                return bucket
+        return SIZE_BUCKETS[-1]
+
+    @property
+    def render_size(self) -> tuple[int, int]:
+        """生成尺寸（档位边界框，保持宽高比缩放到其内）"""
+        return (self.bucket, self.bucket)
+
     @property
     def size_key(self) -> str:
         """尺寸缓存键"""
-        return f"{self.logical_size[0]}x{self.logical_size[1]}@{self.scale_factor:.1f}x"
+        return f"b{self.bucket}"
+
+    @classmethod
+    def for_bucket(cls, bucket: int) -> "ThumbnailSize":
+        return cls(logical_size=(bucket, bucket))
+
+
+@dataclass(frozen=True)
+class ThumbnailSource:
+    """缩略图来源 - 携带数据库中已索引的元数据
+
+    提供 file_id/size/modified_at 时，缓存键直接由这些元数据生成，
+    无需对源文件 stat() 或计算路径哈希（网络盘/慢盘上滚动时尤为明显）。
+    缺少元数据时回退为基于 stat 的旧键。
+    """
+    path: Path
+    file_id: int | None = None
+    size: int | None = None
+    modified_at: float | None = None
+
+    @classmethod
+    def from_item(cls, item: dict) -> "ThumbnailSource":
+        """从浏览列表的项目字典构建"""
+        return cls(
+            path=Path(item.get("path", "")),
+            file_id=item.get("id"),
+            size=item.get("size"),
+            modified_at=item.get("modified_at"),
+        )
+
+    @property
+    def has_metadata(self) -> bool:
+        return self.file_id is not None and self.size is not None and self.modified_at is not None
+
+
+def _as_source(source: "Path | ThumbnailSource") -> ThumbnailSource:
+    return source if isinstance(source, ThumbnailSource) else ThumbnailSource(Path(source))
+
+
+def thumbnail_kind(file_type: str | None) -> str:
+    """根据文件类型确定缩略图类型"""
+    if file_type in {"image", "video"}:
+        return str(file_type)
+    return "shell"
 
 
 @dataclass
@@ -55,6 +135,10 @@ class ViewportRange:
     first_visible: int
     last_visible: int
     total_items: int
+    # 每行项目数（列表模式为 1）
+    columns: int = 1
+    # 滚动方向：1 向下，-1 向上，0 未知
+    direction: int = 0
     
     @property
     def visible_count(self) -> int:
@@ -66,7 +150,37 @@ class ViewportRange:
             first_visible=max(0, self.first_visible - buffer_size),
             last_visible=min(self.total_items - 1, self.last_visible + buffer_size),
             total_items=self.total_items,
+            columns=self.columns,
+            direction=self.direction,
+        )
+    
+    def preload_order(self, buffered: "ViewportRange") -> list[int]:
+        """预加载顺序：可视项按到视口中心的距离（先按行、再按列），
+        然后是缓冲区，滚动方向一侧在前；方向未知时上下交替
+        """
+        columns = max(1, self.columns)
+        center_row = (self.first_visible // columns + self.last_visible // columns) / 2
+        center_column = (columns - 1) / 2
+        visible = sorted(
+            range(self.first_visible, self.last_visible + 1),
+            key=lambda index: (
+                abs(index // columns - center_row),
+                abs(index % columns - center_column),
+            ),
         )
+        ahead = list(range(self.last_visible + 1, buffered.last_visible + 1))
+        behind = list(range(self.first_visible - 1, buffered.first_visible - 1, -1))
+        if self.direction > 0:
+            return visible + ahead + behind
+        if self.direction < 0:
+            return visible + behind + ahead
+        interleaved = [
+            index
+            for pair in zip(ahead, behind)
+            for index in pair
+        ]
+        shorter = min(len(ahead), len(behind))
+        return visible + interleaved + ahead[shorter:] + behind[shorter:]
 
 
 def get_device_pixel_ratio() -> float:
@@ -84,96 +198,6 @@ def get_device_pixel_ratio() -> float:
     return 1.0
 
 
-def calculate_dynamic_quality(size: tuple[int, int], original_size: tuple[int, int] | None = None) -> int:
-    """根据显示尺寸动态计算压缩质量
-    
-    原理：
-    - 小尺寸缩略图可以使用更低质量（人眼难以察觉）
-    - 大尺寸预览需要更高质量保持清晰度
-    
-    Args:
-        size: 目标缩略图尺寸
-        original_size: 原始图片尺寸（可选）
-    
-    Returns:
-        推荐的质量值 (50-95)
-    """
-    max_dimension = max(size)
-    
-    if max_dimension <= 64:
-        # 极小图标：质量可以很低
-        return 60
-    elif max_dimension <= 100:
-        # 小图标
-        return 70
-    elif max_dimension <= 200:
-        # 中等缩略图
-        return 80
-    elif max_dimension <= 400:
-        # 大缩略图
-        return 85
-    else:
-        # 预览尺寸
-        return 90
-
-
-class ThumbnailFormat:
-    """缩略图格式管理 - WebP 优先，JPEG 回退"""
-    
-    _webp_supported: bool | None = None
-    
-    @classmethod
-    def is_webp_supported(cls) -> bool:
-        """检测系统是否支持 WebP"""
-        if cls._webp_supported is not None:
-            return cls._webp_supported
-        
-        try:
-            # 尝试创建一个 WebP 图片
-            test_img = Image.new('RGB', (10, 10), color='red')
-            from io import BytesIO
-            buffer = BytesIO()
-            test_img.save(buffer, 'WEBP')
-            cls._webp_supported = True
-        except Exception:
-            cls._webp_supported = False
-        
-        return cls._webp_supported
-    
-    @classmethod
-    def get_extension(cls) -> Literal[".webp", ".jpg"]:
-        """获取推荐的文件扩展名"""
-        return ".webp" if cls.is_webp_supported() else ".jpg"
-    
-    @classmethod
-    def get_save_kwargs(cls, quality: int, size: tuple[int, int]) -> dict:
-        """获取保存参数
-        
-        Args:
-            quality: 质量值
-            size: 目标尺寸
-        
-        Returns:
-            PIL Image.save() 的参数字典
-        """
-        if cls.is_webp_supported():
-            return {
-                "format": "WEBP",
-                "quality": quality,
-                "method": 6,  # 压缩方法 (0-6)，越高压缩率越好但越慢
-            }
-        else:
-            # JPEG 回退
-            # 根据尺寸调整 JPEG 质量
-            adjusted_quality = min(quality + 5, 95)  # JPEG 需要稍高质量补偿
-            return {
-                "format": "JPEG",
-                "quality": adjusted_quality,
-                "optimize": True,
-                "progressive": True,
-            }
-
-
 def _pixmap_size_bytes(pixmap: QPixmap) -> int:
     """计算QPixmap占用的字节数"""
     if pixmap.isNull():
@@ -191,7 +215,7 @@ class ThumbnailService:
     2. 动态质量调整
     3. WebP/JPEG 自适应
     4. Retina/高分屏支持
-    5. LRU缓存管理内存
+    5. LRU缓存管理内存：解码后的 QPixmap 与编码后的 WebP/JPEG 字节两级缓存
     """
     
     thumbs_dir: Path
@@ -199,33 +223,85 @@ class ThumbnailService:
     max_cache_memory_mb: float = 256.0
     # 最大缓存条目数
     max_cache_items: int = 2000
+    # 编码字节缓存（MB），0 表示关闭；同样内存可容纳约 10-20 倍的缩略图
+    max_encoded_cache_mb: float = 64.0
+    # 两级内存缓存的淘汰策略："lru"、"2q" 或 "tinylfu"（抗快速滑动的扫描）
+    memory_policy: str = POLICY_LRU
+    # 访问轨迹文件：每次查询内存缓存写入一行缓存键，供 bench_cache_policies 回放
+    trace_path: Path | None = None
+    # 磁盘存储后端："files"（每个缩略图一个文件）或 "pack"（打包存储）
+    store_kind: str = STORE_FILES
+    # 磁盘缓存预算（MB），0 表示不限制
+    disk_budget_mb: float = 0.0
+    # 超出预算时的淘汰策略："lru" 或 "lfu"
+    eviction_policy: str = EVICTION_LRU
+    # 图片/视频缩略图生成进程数，0 表示在线程池线程中生成
+    render_workers: int = 0
+    # 视频联系表帧数，0 表示不生成
+    video_sheet_frames: int = 0
 
     def __post_init__(self) -> None:
-        # 初始化LRU缓存替代QPixmapCache
-        self._memory_cache = LRUCache[str, QPixmap](
+        # 磁盘存储（同一目录的服务实例共享）
+        self._store: ThumbnailStore = open_thumbnail_store(
+            self.store_kind, self.thumbs_dir, ThumbnailFormat.get_extension()
+        )
+        # 缩略图清单（来源文件与访问时间，用于淘汰和孤儿清理）
+        self._manifest = open_thumbnail_manifest(self.thumbs_dir)
+        
+        # 初始化LRU缓存替代QPixmapCache；工作线程与 UI 线程共用，使用分片加锁的实现
+        self._memory_cache = ShardedLRUCache[str, QPixmap](
             max_size=self.max_cache_items,
             max_memory_mb=self.max_cache_memory_mb,
             size_callback=_pixmap_size_bytes,
             eviction_callback=self._on_cache_eviction,
+            policy=self.memory_policy,
         )
+        # 第二级：磁盘读出的编码字节，像素缓存未命中时在内存中解码提升，不再读盘
+        self._encoded_cache = ShardedLRUCache[str, bytes](
+            max_size=MAX_ENCODED_ITEMS if self.max_encoded_cache_mb > 0 else 0,
+            max_memory_mb=self.max_encoded_cache_mb,
+            size_callback=len,
+            policy=self.memory_policy,
+        )
+        
+        # 生成后端（进程池在同数量的服务实例间共享）
+        self._renderer = open_thumbnail_renderer(self.render_workers)
         
-        # 线程池用于后台预加载
+        # 线程池用于后台预加载；使用进程后端时线程只等待结果，按进程数放宽并发
         self._thread_pool = QThreadPool()
-        self._thread_pool.setMaxThreadCount(MAX_PRELOAD_WORKERS)
+        self._thread_pool.setMaxThreadCount(max(MAX_PRELOAD_WORKERS, self._renderer.workers))
         
-        # 预加载令牌（用于取消旧任务）
-        self._preheat_token = 0
+        # 缩略图任务调度（可视项、预加载与后台预生成共用，按缓存键去重）
+        self._scheduler = ThumbnailScheduler(self, self._thread_pool)
         
-        # 防抖定时器
+        # 防抖定时器（首次预加载时创建，之后复用）与待执行的预加载参数
         self._preload_timer: QTimer | None = None
+        self._pending_preheat: tuple | None = None
         
         # 当前预加载范围
         self._current_range: ViewportRange | None = None
+        # 各视图上次的首个可见项（判断滚动方向）
+        self._last_first_visible: dict[int, int] = {}
         
-        # 最后清理时间
-        self._last_cleanup_time = time.time()
+        # 最后清理时间（启动后首次预加载即在后台清理一次）
+        self._last_cleanup_time = 0.0
         # 清理间隔（1小时）
         self._cleanup_interval = 3600
+        # 清理任务运行期间持有（工作线程写入时也可能触发清理，用锁保证只有一个任务）
+        self._cleanup_lock = threading.Lock()
+        
+        # 磁盘缓存命中统计（工作线程更新）
+        self._stats_lock = threading.Lock()
+        self._disk_hits = 0
+        self._disk_misses = 0
+        
+        self._trace_lock = threading.Lock()
+        self._trace = None
+        if self.trace_path is not None:
+            try:
+                self._trace = open(self.trace_path, "a", encoding="utf-8", buffering=1)
+            except OSError as e:
+                logger.warning(f"Cannot open thumbnail trace {self.trace_path}: {e}")
     
     def _on_cache_eviction(self, key: str, pixmap: QPixmap) -> None:
         """缓存淘汰时的回调 - 确保资源释放"""
@@ -234,230 +310,437 @@ class ThumbnailService:
     
     def cleanup_old_cache_files(self, max_age_days: int = 30) -> int:
         """
-        清理旧的缩略图缓存文件
+        清理缩略图磁盘缓存（耗时操作，由后台任务调用）
+        
+        淘汰超过指定天数未访问的缩略图、来源文件已从索引删除的孤儿缩略图，
+        再按 `disk_budget_mb` 和淘汰策略把总大小降到预算以内。
+        清单建立之前生成的旧缓存在首次清理时一并删除。
         
         Args:
-            max_age_days: 超过此天数的缓存文件将被删除
+            max_age_days: 超过此天数未访问的缓存将被删除
             
         Returns:
-            删除的文件数量
+            删除的缓存数量
         """
-        if not self.thumbs_dir.exists():
-            return 0
-        
+        self._manifest.flush_access()
+        keys = set(self._manifest.expired_keys(max_age_days))
+        keys.update(self._orphan_keys())
         deleted_count = 0
-        current_time = time.time()
-        max_age_seconds = max_age_days * 24 * 3600
-        
-        try:
-            for subdir in self.thumbs_dir.iterdir():
-                if not subdir.is_dir():
-                    continue
-                for subsubdir in subdir.iterdir():
-                    if not subsubdir.is_dir():
-                        continue
-                    for cache_file in subsubdir.iterdir():
-                        if not cache_file.is_file():
-                            continue
-                        try:
-                            stat = cache_file.stat()
-                            age = current_time - stat.st_mtime
-                            if age > max_age_seconds:
-                                cache_file.unlink()
-                                deleted_count += 1
-                        except OSError:
-                            continue
-        except Exception as e:
-            logger.warning(f"Error cleaning up cache files: {e}")
+        if keys:
+            deleted_count = self._store.remove(list(keys))
+            self._manifest.delete(keys)
+        
+        # 按预算淘汰（在过期/孤儿清理之后，避免多删）
+        if self.disk_budget_mb > 0:
+            budget_bytes = int(self.disk_budget_mb * 1024 * 1024)
+            keys = set(self._manifest.over_budget_keys(budget_bytes, self.eviction_policy))
+            if keys:
+                deleted_count += self._store.remove(list(keys))
+                self._manifest.delete(keys)
+        
+        if self._manifest.get_meta("untracked_purged") is None:
+            # 工作线程先写入存储再登记清单：快照之前不久写入的条目可能还没登记，不删除
+            written_before = time.time() - UNTRACKED_GRACE_SECONDS
+            deleted_count += self._store.purge_untracked(
+                self._manifest.all_keys(), written_before
+            )
+            self._manifest.set_meta("untracked_purged", "1")
         
+        self._store.compact()
         logger.info(f"Cleaned up {deleted_count} old cache files")
         return deleted_count
     
+    def _orphan_keys(self) -> list[str]:
+        """来源文件已不在当前库索引中的缩略图"""
+        namespace = current_db_key()
+        file_ids = self._manifest.file_ids(namespace)
+        if not file_ids:
+            return []
+        try:
+            with get_session_context() as session:
+                existing = Repo(session).existing_file_ids(file_ids)
+        except Exception as e:
+            logger.warning(f"Failed to check thumbnail sources: {e}")
+            return []
+        # 查询期间切换了工作空间：结果不可信
+        if namespace != current_db_key():
+            return []
+        missing = [file_id for file_id in file_ids if file_id not in existing]
+        return self._manifest.keys_for_files(namespace, missing)
+    
     def _maybe_cleanup(self) -> None:
-        """定期检查并清理旧缓存文件"""
+        """定期在后台线程清理磁盘缓存"""
         current_time = time.time()
+        if self._cleanup_lock.locked():
+            return
         if current_time - self._last_cleanup_time > self._cleanup_interval:
-            self.cleanup_old_cache_files()
-            self._last_cleanup_time = current_time
+            self._schedule_cleanup()
+    
+    def _schedule_cleanup(self) -> None:
+        """提交后台清理任务（已有任务运行时跳过；锁由任务结束时释放）"""
+        if not self._cleanup_lock.acquire(blocking=False):
+            return
+        self._last_cleanup_time = time.time()
+        self._thread_pool.start(_CleanupTask(self))
+    
+    def _check_disk_budget(self) -> None:
+        """写入后检查磁盘占用，明显超出预算时立即淘汰而不是等到下一轮定期清理"""
+        if self.disk_budget_mb <= 0:
+            return
+        _, total = self._manifest.totals()
+        if total > self.disk_budget_mb * 1024 * 1024 * BUDGET_SLACK:
+            self._schedule_cleanup()
     
     @property
     def cache_stats(self) -> dict:
         """返回缓存统计信息"""
+        disk_items, disk_bytes = self._manifest.totals()
+        with self._stats_lock:
+            disk_hits, disk_misses = self._disk_hits, self._disk_misses
+        lookups = disk_hits + disk_misses
+        memory = self._memory_cache.stats
+        encoded = self._encoded_cache.stats
+        scheduler = self._scheduler.stats
         return {
             "cache_items": self._memory_cache.size,
             "cache_memory_mb": round(self._memory_cache.memory_usage_mb, 2),
             "max_memory_mb": self.max_cache_memory_mb,
+            "memory_hit_rate": round(memory.hit_rate, 3),
+            "memory_evictions": memory.evictions,
+            "encoded_items": self._encoded_cache.size,
+            "encoded_memory_mb": round(self._encoded_cache.memory_usage_mb, 2),
+            "encoded_hit_rate": round(encoded.hit_rate, 3),
+            "disk_items": disk_items,
+            "disk_mb": round(disk_bytes / 1024 / 1024, 2),
+            "disk_budget_mb": self.disk_budget_mb,
+            "disk_hit_rate": round(disk_hits / lookups, 3) if lookups else 0.0,
+            "eviction_policy": self.eviction_policy,
+            "queue_depth": scheduler["queued"],
+            "queue_running": scheduler["running"],
+            "queue_deduped": scheduler["deduped"],
+            "first_paint_p95_ms": scheduler["first_paint_p95_ms"],
         }
 
-    def _ensure_dir(self) -> None:
-        self.thumbs_dir.mkdir(parents=True, exist_ok=True)
+    # ========== 任务调度 ==========
+
+    def thumbnail_key(self, source: ThumbnailSource, kind: str, size: ThumbnailSize) -> str:
+        """缩略图的缓存键（源文件无索引元数据且无法访问时抛出 OSError）"""
+        return self._cache_key(source, kind, size)
+
+    def submit_visible(
+        self,
+        cache_key: str,
+        source: ThumbnailSource,
+        kind: str,
+        size: ThumbnailSize,
+        listener: Listener,
+    ) -> ThumbnailJob:
+        """以可视项优先级提交加载任务，完成后在工作线程调用 listener"""
+        return self._scheduler.submit(
+            cache_key, source, kind, size, PRIORITY_VISIBLE, listener=listener
+        )
+
+    def cancel_request(self, cache_key: str, listener: Listener) -> bool:
+        """移除 listener；任务没有其他接收方时从队列中丢弃，返回是否取消"""
+        return self._scheduler.cancel(cache_key, listener)
+
+    def record_first_paint(self, seconds: float) -> None:
+        """记录可视项从请求到交回 UI 线程的延迟（计入 cache_stats）"""
+        self._scheduler.record_first_paint(seconds)
+
+    # ========== 后台预生成 ==========
+
+    def is_stored(self, cache_key: str) -> bool:
+        """缩略图是否已写入磁盘存储"""
+        return self._store.contains(cache_key)
+
+    @property
+    def loading(self) -> bool:
+        """界面是否有排队或正在加载的缩略图（不含后台预生成）"""
+        return self._scheduler.busy
 
-    def _cache_key(self, source: Path, kind: str, size: ThumbnailSize) -> str:
-        """生成缓存键 - 包含 DPR 信息"""
-        stat = source.stat()
-        digest = hashlib.sha1(str(source).encode("utf-8")).hexdigest()
+    def submit_background(
+        self, cache_key: str, source: ThumbnailSource, kind: str, size: ThumbnailSize
+    ) -> ThumbnailJob:
+        """以后台优先级提交生成任务，与界面对同一缩略图的请求合并"""
+        return self._scheduler.submit(
+            cache_key, source, kind, size, PRIORITY_BACKGROUND, pinned=True
+        )
+
+    def cancel_background(self, cache_key: str) -> None:
+        """放弃 submit_background 提交的任务；尚未开始且界面未请求时从队列中移除"""
+        self._scheduler.release(cache_key)
+
+    def get_meta(self, name: str) -> str | None:
+        """读取缩略图清单中的元数据（如预生成游标）"""
+        return self._manifest.get_meta(name)
+
+    def set_meta(self, name: str, value: str) -> None:
+        self._manifest.set_meta(name, value)
+
+    def _cache_key(self, source: Path | ThumbnailSource, kind: str, size: ThumbnailSize) -> str:
+        """生成缓存键 - 包含 DPR 信息
+
+        有索引元数据时为 `kind:库标识:file_id:size:mtime:尺寸`，不访问文件系统；
+        库标识用于区分共享缩略图目录下不同工作空间的文件 ID。
+        """
+        source = _as_source(source)
+        if kind == "sheet":
+            # 帧数不同的联系表不能互相复用
+            kind = f"sheet{self.video_sheet_frames}"
+        if source.has_metadata:
+            return (
+                f"{kind}:{current_db_key()}:{source.file_id}:{source.size}:"
+                f"{int(source.modified_at)}:{size.size_key}"
+            )
+        stat = source.path.stat()
+        digest = hashlib.sha1(str(source.path).encode("utf-8")).hexdigest()
         stamp = int(stat.st_mtime)
         return f"{kind}:{digest}:{stamp}:{size.size_key}"
 
-    def _cache_path(self, cache_key: str) -> Path:
-        """生成磁盘缓存路径"""
-        digest = hashlib.sha1(cache_key.encode("utf-8")).hexdigest()
-        ext = ThumbnailFormat.get_extension()
-        return self.thumbs_dir / digest[:2] / digest[2:4] / f"{digest}{ext}"
+    def _read_encoded(self, cache_key: str) -> bytes | None:
+        """读取编码后的缩略图：先查编码字节缓存，再读磁盘并放入缓存（线程安全）"""
+        data = self._encoded_cache.get(cache_key)
+        if data is not None:
+            return data
+        data = self._store.read(cache_key)
+        if not data:
+            with self._stats_lock:
+                self._disk_misses += 1
+            return None
+        with self._stats_lock:
+            self._disk_hits += 1
+        self._manifest.touch(cache_key)
+        self._encoded_cache.put(cache_key, data)
+        return data
+
+    def _promote(self, cache_key: str, data: bytes) -> QPixmap | None:
+        """解码编码字节并放入像素缓存"""
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data):
+            self._encoded_cache.remove(cache_key)
+            return None
+        self._memory_cache.put(cache_key, pixmap)
+        return pixmap
 
-    def _load_cached_pixmap(self, cache_key: str, path: Path) -> QPixmap | None:
+    def _load_cached_pixmap(self, cache_key: str) -> QPixmap | None:
         """从内存或磁盘加载缓存的缩略图"""
         # 先查LRU内存缓存
         cached = self._memory_cache.get(cache_key)
         if cached is not None and not cached.isNull():
             return cached
         
-        # 再查磁盘缓存
-        if not path.exists():
+        # 再查编码字节缓存与磁盘存储
+        data = self._read_encoded(cache_key)
+        if data is None:
             return None
-        
-        # 根据 DPR 加载合适尺寸的图片
-        pixmap = QPixmap(str(path))
-        if pixmap.isNull():
+        return self._promote(cache_key, data)
+
+    def _record_access(self, cache_key: str) -> None:
+        """记录一次内存缓存查询到轨迹文件"""
+        with self._trace_lock:
+            try:
+                self._trace.write(cache_key + "\n")
+            except (OSError, ValueError):
+                self._trace = None
+
+    def cached_thumbnail(
+        self, source: Path | ThumbnailSource, kind: str, logical_size: tuple[int, int]
+    ) -> QPixmap | None:
+        """仅查询内存缓存，不访问磁盘（UI 线程渲染时使用）
+
+        像素缓存未命中而编码字节仍在内存中时，就地解码（小尺寸 WebP/JPEG 约 1ms）并提升。
+        """
+        try:
+            cache_key = self._cache_key(source, kind, self.get_thumbnail_size(logical_size))
+        except OSError:
             return None
-        
-        # 存入LRU内存缓存
-        self._memory_cache.put(cache_key, pixmap)
-        return pixmap
+        if self._trace is not None:
+            self._record_access(cache_key)
+        cached = self._memory_cache.get(cache_key)
+        if cached is not None and not cached.isNull():
+            return cached
+        data = self._encoded_cache.get(cache_key)
+        if data is None:
+            return None
+        return self._promote(cache_key, data)
 
-    def _save_thumbnail(self, image: Image.Image, target: Path, size: tuple[int, int]) -> bool:
-        """保存缩略图到磁盘 - 自动选择格式和质量"""
+    def stored_thumbnail(
+        self, source: Path | ThumbnailSource, kind: str, logical_size: tuple[int, int]
+    ) -> QPixmap | None:
+        """查询内存缓存与磁盘中已生成的缩略图，不生成（读取小尺寸缩略图约 1ms）"""
         try:
-            self._ensure_dir()
-            target.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 动态计算质量
-            quality = calculate_dynamic_quality(size)
-            kwargs = ThumbnailFormat.get_save_kwargs(quality, size)
-            
-            # 调整尺寸（保持比例）
-            image.thumbnail(size)
-            
-            # 保存
-            image.save(target, **kwargs)
-            return target.exists()
+            cache_key = self._cache_key(source, kind, self.get_thumbnail_size(logical_size))
+        except OSError:
+            return None
+        return self._load_cached_pixmap(cache_key)
+
+    def cache_pixmap(self, cache_key: str, pixmap: QPixmap) -> None:
+        """将后台加载的缩略图放入内存缓存（UI 线程调用）"""
+        if not pixmap.isNull():
+            self._memory_cache.put(cache_key, pixmap)
+
+    def load_thumbnail_image(
+        self, source: Path | ThumbnailSource, kind: str, size: ThumbnailSize
+    ) -> QImage | None:
+        """生成（如需要）并读取缩略图，返回 QImage
+
+        可在工作线程调用：只使用线程安全的 QImage、编码字节缓存与磁盘存储，不触碰 QPixmap。
+        """
+        cache_key = self._cache_key(source, kind, size)
+        image = self.read_thumbnail_image(cache_key)
+        if image is None and self.ensure_thumbnail(source, kind, size):
+            image = self.read_thumbnail_image(cache_key)
+        return image
+
+    def read_thumbnail_image(self, cache_key: str) -> QImage | None:
+        """从编码字节缓存或磁盘读取已生成的缩略图（可在工作线程调用）"""
+        data = self._read_encoded(cache_key)
+        if data is None:
+            return None
+        image = QImage.fromData(data)
+        if image.isNull():
+            self._encoded_cache.remove(cache_key)
+            return None
+        return image
+
+    def ensure_thumbnail(self, source: Path | ThumbnailSource, kind: str, size: ThumbnailSize) -> bool:
+        """确保缩略图已生成到磁盘（可在工作线程调用）"""
+        ensure = {
+            "image": self._ensure_disk_image,
+            "video": self._ensure_disk_video,
+            "sheet": self._ensure_disk_sheet,
+        }.get(kind, self._ensure_disk_shell)
+        return ensure(source, size)
+
+    def _save_thumbnail(
+        self,
+        image: Image.Image,
+        cache_key: str,
+        size: tuple[int, int],
+        source: ThumbnailSource,
+    ) -> bool:
+        """编码缩略图并写入磁盘存储 - 自动选择格式和质量"""
+        try:
+            data = encode_thumbnail(image, size)
         except Exception:
             return False
+        return self._store_thumbnail(data, cache_key, source)
 
-    def _ensure_disk_image(self, source: Path, size: ThumbnailSize) -> Path | None:
-        """确保图片缩略图已生成并返回缓存路径"""
-        cache_key = self._cache_key(source, "image", size)
-        target = self._cache_path(cache_key)
-        
-        if target.exists():
-            return target
-        
-        # 优先使用系统 Shell 缩略图
-        shell_image = load_shell_thumbnail(source, size.physical_size)
-        
+    def _store_thumbnail(self, data: bytes, cache_key: str, source: ThumbnailSource) -> bool:
+        """写入已编码的缩略图并登记到清单"""
         try:
-            if shell_image is not None:
-                if self._save_thumbnail(shell_image, target, size.physical_size):
-                    return target
+            if not self._store.write(cache_key, data):
+                return False
             
-            # 回退到 PIL 处理
-            with Image.open(source) as image:
-                # 处理 EXIF 旋转
-                image = self._apply_exif_rotation(image)
-                if self._save_thumbnail(image, target, size.physical_size):
-                    return target
+            # 登记到清单；无元数据的旧式键没有来源文件信息，只参与按时间淘汰
+            if source.has_metadata:
+                self._manifest.record(cache_key, current_db_key(), source.file_id, len(data))
+            else:
+                self._manifest.record(cache_key, None, None, len(data))
+            self._check_disk_budget()
+            return True
         except Exception:
-            pass
-        
+            return False
+
+    def _render_from_larger(
+        self, source: ThumbnailSource, kind: str, size: ThumbnailSize
+    ) -> bytes | None:
+        """从已缓存的更大档位缩小生成，不再解码源文件（视频不再调用 ffmpeg）
+
+        按档位从小到大查找编码字节缓存与磁盘存储，都没有时返回 None。
+        """
+        for bucket in SIZE_BUCKETS:
+            if bucket <= size.bucket:
+                continue
+            larger_key = self._cache_key(source, kind, ThumbnailSize.for_bucket(bucket))
+            data = self._encoded_cache.get(larger_key)
+            if data is None and self._store.contains(larger_key):
+                data = self._store.read(larger_key)
+            if not data:
+                continue
+            try:
+                with Image.open(BytesIO(data)) as image:
+                    return encode_thumbnail(image, size.render_size)
+            except Exception as e:
+                logger.debug(f"Downscale from {larger_key} failed: {e}")
         return None
 
-    def _ensure_disk_video(self, source: Path, size: ThumbnailSize) -> Path | None:
+    def _ensure_disk_image(self, source: Path | ThumbnailSource, size: ThumbnailSize) -> bool:
+        """确保图片缩略图已生成并返回缓存路径"""
+        cache_key = self._cache_key(source, "image", size)
+        if self._store.contains(cache_key):
+            self._manifest.touch(cache_key)
+            return True
+        
+        # 解码与编码由生成后端完成（可能在工作进程中），这里只写入存储
+        thumb_source = _as_source(source)
+        data = self._render_from_larger(thumb_source, "image", size)
+        if data is None:
+            data = self._renderer.render("image", thumb_source.path, size.render_size)
+        if not data:
+            return False
+        return self._store_thumbnail(data, cache_key, thumb_source)
+
+    def _ensure_disk_video(self, source: Path | ThumbnailSource, size: ThumbnailSize) -> bool:
         """确保视频缩略图已生成"""
         cache_key = self._cache_key(source, "video", size)
-        target = self._cache_path(cache_key)
-        
-        if target.exists():
-            return target
-        
-        # 优先使用系统 Shell 缩略图
-        shell_image = load_shell_thumbnail(source, size.physical_size)
-        if shell_image is not None:
-            if self._save_thumbnail(shell_image, target, size.physical_size):
-                return target
-        
-        # 回退到 ffmpeg
-        ffmpeg_bin = self._ffmpeg_bin()
-        if not ffmpeg_bin:
-            return None
-        
-        # 先生成临时帧，再转换
-        temp_frame = target.with_suffix(".jpg")
-        command = [
-            ffmpeg_bin,
-            "-y",
-            "-ss", "00:00:01",
-            "-i", str(source),
-            "-vframes", "1",
-            "-vf", f"scale={size.physical_size[0]}:{size.physical_size[1]}:force_original_aspect_ratio=decrease",
-            "-q:v", "3",
-            str(temp_frame),
-        ]
-        
-        try:
-            subprocess.run(
-                command,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True,
+        if self._store.contains(cache_key):
+            self._manifest.touch(cache_key)
+            return True
+        
+        thumb_source = _as_source(source)
+        data = self._render_from_larger(thumb_source, "video", size)
+        if data is None:
+            data = self._renderer.render(
+                "video", thumb_source.path, size.render_size, self._ffmpeg_bin()
             )
-            
-            if temp_frame.exists():
-                with Image.open(temp_frame) as img:
-                    if self._save_thumbnail(img, target, size.physical_size):
-                        return target
-        except Exception:
-            pass
-        finally:
-            # 清理临时文件
-            if temp_frame.exists():
-                temp_frame.unlink(missing_ok=True)
-        
-        return None
+        if not data:
+            return False
+        return self._store_thumbnail(data, cache_key, thumb_source)
+
+    def _ensure_disk_sheet(self, source: Path | ThumbnailSource, size: ThumbnailSize) -> bool:
+        """确保视频联系表已生成（video_sheet_frames 帧横向拼接，每帧不超过 size）"""
+        if self.video_sheet_frames < 2:
+            return False
+        cache_key = self._cache_key(source, "sheet", size)
+        if self._store.contains(cache_key):
+            self._manifest.touch(cache_key)
+            return True
+        
+        thumb_source = _as_source(source)
+        data = self._renderer.render(
+            "sheet",
+            thumb_source.path,
+            size.render_size,
+            self._ffmpeg_bin(),
+            frames=self.video_sheet_frames,
+        )
+        if not data:
+            return False
+        return self._store_thumbnail(data, cache_key, thumb_source)
 
-    def _ensure_disk_shell(self, source: Path, size: ThumbnailSize) -> Path | None:
+    def _ensure_disk_shell(self, source: Path | ThumbnailSource, size: ThumbnailSize) -> bool:
         """确保 Shell 缩略图已生成"""
         cache_key = self._cache_key(source, "shell", size)
-        target = self._cache_path(cache_key)
+        if self._store.contains(cache_key):
+            self._manifest.touch(cache_key)
+            return True
         
-        if target.exists():
-            return target
+        thumb_source = _as_source(source)
+        data = self._render_from_larger(thumb_source, "shell", size)
+        if data is not None:
+            return self._store_thumbnail(data, cache_key, thumb_source)
+        source = thumb_source.path
         
-        shell_image = load_shell_thumbnail(source, size.physical_size)
+        shell_image = load_shell_thumbnail(source, size.render_size)
         if shell_image is None:
-            return None
+            return False
         
-        if self._save_thumbnail(shell_image, target, size.physical_size):
-            return target
+        if self._save_thumbnail(shell_image, cache_key, size.render_size, thumb_source):
+            return True
         
-        return None
-
-    def _apply_exif_rotation(self, image: Image.Image) -> Image.Image:
-        """应用 EXIF 旋转信息"""
-        try:
-            from PIL import ExifTags
-            exif = image._getexif()
-            if exif is not None:
-                orientation = exif.get(ExifTags.Orientation)
-                rotations = {
-                    3: Image.ROTATE_180,
-                    6: Image.ROTATE_270,
-                    8: Image.ROTATE_90,
-                }
-                if orientation in rotations:
-                    image = image.transpose(rotations[orientation])
-        except Exception:
-            pass
-        return image
+        return False
 
     def _ffmpeg_bin(self) -> str | None:
         """获取 ffmpeg 可执行文件路径"""
@@ -470,119 +753,161 @@ class ThumbnailService:
         return ThumbnailSize(logical_size=logical_size, scale_factor=dpr)
 
     def generate_image_thumbnail(
-        self, source: Path, logical_size: tuple[int, int]
+        self, source: Path | ThumbnailSource, logical_size: tuple[int, int]
     ) -> QPixmap | None:
         """生成图片缩略图"""
         size = self.get_thumbnail_size(logical_size)
         cache_key = self._cache_key(source, "image", size)
-        target = self._cache_path(cache_key)
         
-        cached = self._load_cached_pixmap(cache_key, target)
+        cached = self._load_cached_pixmap(cache_key)
         if cached is not None:
             return cached
         
-        created = self._ensure_disk_image(source, size)
-        if created is None:
+        if not self._ensure_disk_image(source, size):
             return None
         
-        return self._load_cached_pixmap(cache_key, target)
+        return self._load_cached_pixmap(cache_key)
 
     def generate_video_thumbnail(
-        self, source: Path, logical_size: tuple[int, int]
+        self, source: Path | ThumbnailSource, logical_size: tuple[int, int]
     ) -> QPixmap | None:
         """生成视频缩略图"""
         size = self.get_thumbnail_size(logical_size)
         cache_key = self._cache_key(source, "video", size)
-        target = self._cache_path(cache_key)
         
-        cached = self._load_cached_pixmap(cache_key, target)
+        cached = self._load_cached_pixmap(cache_key)
         if cached is not None:
             return cached
         
-        created = self._ensure_disk_video(source, size)
-        if created is None:
+        if not self._ensure_disk_video(source, size):
             return None
         
-        return self._load_cached_pixmap(cache_key, target)
+        return self._load_cached_pixmap(cache_key)
 
     def generate_shell_thumbnail(
-        self, source: Path, logical_size: tuple[int, int]
+        self, source: Path | ThumbnailSource, logical_size: tuple[int, int]
     ) -> QPixmap | None:
         """生成 Shell 缩略图"""
         size = self.get_thumbnail_size(logical_size)
         cache_key = self._cache_key(source, "shell", size)
-        target = self._cache_path(cache_key)
         
-        cached = self._load_cached_pixmap(cache_key, target)
+        cached = self._load_cached_pixmap(cache_key)
         if cached is not None:
             return cached
         
-        created = self._ensure_disk_shell(source, size)
-        if created is None:
+        if not self._ensure_disk_shell(source, size):
             return None
         
-        return self._load_cached_pixmap(cache_key, target)
+        return self._load_cached_pixmap(cache_key)
 
-    def calculate_viewport_range(self, widget: QListWidget) -> ViewportRange:
+    def calculate_viewport_range(self, widget: QListView) -> ViewportRange:
         """计算可视区域范围
         
+        按视图的实际布局计算：在视口左上角与右下角附近用 `indexAt` 命中首尾项
+        （网格间距、换行的文件名都由视图自己处理）；视图尚未布局时回退为按行高估算。
+        
         Args:
-            widget: 文件列表控件
+            widget: 文件列表视图
         
         Returns:
-            可视区域范围，包含首尾索引和总数
+            可视区域范围，包含首尾索引、总数、每行项目数与滚动方向
         """
-        if widget.count() == 0:
+        model = widget.model()
+        count = model.rowCount() if model is not None else 0
+        if count == 0:
             return ViewportRange(0, 0, 0)
         
-        # 获取滚动条位置
-        scrollbar = widget.verticalScrollBar()
-        viewport_height = widget.viewport().height()
+        first_rect = widget.visualRect(model.index(0, 0))
+        columns = self._columns_per_row(widget, count, first_rect)
+        area = widget.viewport().rect()
+        first = self._index_near_corner(widget, area, first_rect, from_top=True)
+        last = self._index_near_corner(widget, area, first_rect, from_top=False)
+        if first is None or last is None or last < first:
+            first, last = self._estimate_viewport(widget, count, first_rect, columns)
         
-        # 估算每个项目的高度（列表模式 vs 网格模式）
-        if widget.viewMode() == QListWidget.IconMode:
-            # 网格模式：估算每行高度
-            item_height = widget.iconSize().height() + 20  # 图标 + 文字间距
-            items_per_row = max(1, widget.viewport().width() // (widget.iconSize().width() + 10))
-        else:
-            # 列表模式
-            item_height = widget.visualItemRect(widget.item(0)).height() if widget.count() > 0 else 20
-            items_per_row = 1
-        
-        # 计算可见范围
-        scroll_pos = scrollbar.value()
-        first_visible = int(scroll_pos / item_height) * items_per_row
-        visible_rows = int(viewport_height / item_height) + 1
-        last_visible = min(
-            first_visible + visible_rows * items_per_row - 1,
-            widget.count() - 1,
-        )
+        previous = self._last_first_visible.get(id(widget))
+        self._last_first_visible[id(widget)] = first
+        direction = 0 if previous is None or previous == first else (1 if first > previous else -1)
         
         return ViewportRange(
-            first_visible=max(0, first_visible),
-            last_visible=max(0, last_visible),
-            total_items=widget.count(),
+            first_visible=max(0, first),
+            last_visible=max(0, min(last, count - 1)),
+            total_items=count,
+            columns=columns,
+            direction=direction,
         )
 
+    @staticmethod
+    def _columns_per_row(widget: QListView, count: int, first_rect: QRect) -> int:
+        """每行项目数：第一行中与第 0 项顶边对齐的项目数"""
+        if widget.viewMode() != QListView.IconMode or first_rect.isEmpty():
+            return 1
+        # 顶边相同的项目在同一行；第一行最多有 视口宽 / 项目宽 个
+        limit = min(count, max(1, widget.viewport().width() // max(1, first_rect.width())) + 1)
+        columns = 1
+        while columns < limit and widget.visualRect(widget.model().index(columns, 0)).top() == first_rect.top():
+            columns += 1
+        return columns
+
+    @staticmethod
+    def _index_near_corner(
+        widget: QListView, area: QRect, first_rect: QRect, from_top: bool
+    ) -> int | None:
+        """从视口的左上角（或右下角）开始逐行扫描，返回最先命中的项目行号
+
+        行内按阅读顺序（或逆序）扫描，行间步长小于项目高度，
+        因此命中的是最靠上（或最靠下）的一行中最靠前（或最靠后）的项目。
+        """
+        if first_rect.isEmpty() or area.isEmpty():
+            return None
+        step_x = max(1, first_rect.width() // 4)
+        step_y = max(1, first_rect.height() // 4)
+        xs = list(range(area.left(), area.right() + 1, step_x))
+        ys = list(range(area.top(), area.bottom() + 1, step_y))
+        if not from_top:
+            xs.reverse()
+            ys.reverse()
+        for y in ys:
+            for x in xs:
+                index = widget.indexAt(QPoint(x, y))
+                if index.isValid():
+                    return index.row()
+        return None
+
+    @staticmethod
+    def _estimate_viewport(
+        widget: QListView, count: int, first_rect: QRect, columns: int
+    ) -> tuple[int, int]:
+        """按行高与滚动条位置估算（视图尚未布局时使用）"""
+        grid = widget.gridSize()
+        if grid.isValid():
+            item_height = grid.height() + widget.spacing()
+        else:
+            item_height = (first_rect.height() or 20) + widget.spacing()
+        item_height = max(1, item_height)
+        first = int(widget.verticalScrollBar().value() / item_height) * columns
+        visible_rows = int(widget.viewport().height() / item_height) + 1
+        return first, min(first + visible_rows * columns - 1, count - 1)
+
     def preheat_visible_thumbnails(
         self,
-        widget: QListWidget,
-        items: list[dict],
+        widget: QListView,
+        items: Sequence[dict],
         logical_size: tuple[int, int],
     ) -> None:
         """预加载可视区域+缓冲区的缩略图（智能防抖版）
         
         Args:
-            widget: 文件列表控件
-            items: 项目数据列表
+            widget: 文件列表视图
+            items: 项目数据（与视图行一一对应）
             logical_size: 缩略图逻辑尺寸
         """
-        if not items or widget.count() == 0:
+        if not items:
             return
         
-        # 计算新的可视区域
+        # 计算新的可视区域；网格模式下缓冲区取整行
         viewport = self.calculate_viewport_range(widget)
-        buffered = viewport.with_buffer(BUFFER_ITEMS)
+        buffered = viewport.with_buffer(-(-BUFFER_ITEMS // viewport.columns) * viewport.columns)
         
         # 如果范围没有变化，跳过
         if (self._current_range is not None and
@@ -595,29 +920,27 @@ class ThumbnailService:
         # 定期清理旧缓存文件
         self._maybe_cleanup()
         
-        # 释放不可见区域的缩略图缓存（超出缓冲区2倍的范围）
-        self._release_invisible_thumbnails(items, buffered, logical_size)
-        
-        # 取消旧的预加载任务
-        self._preheat_token += 1
-        token = self._preheat_token
-        
-        # 防抖：延迟启动预加载
-        if self._preload_timer is not None:
-            self._preload_timer.stop()
-        
-        self._preload_timer = QTimer()
-        self._preload_timer.setSingleShot(True)
-        
-        def do_preheat():
-            self._start_preheat(items, buffered, logical_size, token)
-        
-        self._preload_timer.timeout.connect(do_preheat)
+        # 释放不可见区域的缩略图缓存（超出缓冲区2倍的范围）；
+        # 抗扫描策略自行决定保留哪些缩略图，按可视范围释放会清掉它保护的常用项
+        if self.memory_policy == POLICY_LRU:
+            self._release_invisible_thumbnails(items, buffered, logical_size)
+        
+        # 防抖：延迟启动预加载；定时器重新计时，只执行最后一次的范围
+        self._pending_preheat = (items, viewport, buffered, logical_size)
+        if self._preload_timer is None:
+            self._preload_timer = QTimer()
+            self._preload_timer.setSingleShot(True)
+            self._preload_timer.timeout.connect(self._run_pending_preheat)
         self._preload_timer.start(PRELOAD_DELAY_MS)
     
+    def _run_pending_preheat(self) -> None:
+        pending, self._pending_preheat = self._pending_preheat, None
+        if pending is not None:
+            self._start_preheat(*pending)
+    
     def _release_invisible_thumbnails(
         self,
-        items: list[dict],
+        items: Sequence[dict],
         visible_range: ViewportRange,
         logical_size: tuple[int, int],
     ) -> None:
@@ -644,22 +967,15 @@ class ThumbnailService:
                 break
             
             item = items[i]
-            path = Path(item.get("path", ""))
-            file_type = item.get("type")
-            
-            if not path.exists():
+            source = ThumbnailSource.from_item(item)
+            kind = thumbnail_kind(item.get("type"))
+            try:
+                keys_to_keep.add(self._cache_key(source, kind, size))
+            except OSError:
                 continue
-            
-            # 确定缩略图类型
-            if file_type in {"image", "video"}:
-                kind = str(file_type)
-            else:
-                kind = "shell"
-            
-            cache_key = self._cache_key(path, kind, size)
-            keys_to_keep.add(cache_key)
         
         # 找出需要释放的缓存键（在LRU缓存中但不在保留列表中）
+        # 只释放解码后的像素，编码字节留在第二级缓存，滚动回来时无需读盘
         keys_to_release: list[str] = []
         for cache_key in self._memory_cache.keys():
             if cache_key not in keys_to_keep:
@@ -682,88 +998,122 @@ class ThumbnailService:
 
     def _start_preheat(
         self,
-        items: list[dict],
-        range_: ViewportRange,
+        items: Sequence[dict],
+        viewport: ViewportRange,
+        buffered: ViewportRange,
         logical_size: tuple[int, int],
-        token: int,
     ) -> None:
-        """启动预加载任务"""
+        """启动预加载任务（按到视口中心的距离与滚动方向排序）
+
+        替换调度器中排队的预加载任务：离开范围的取消，仍在范围内的按新位次重排。
+        """
         # 准备预加载列表
-        preheat_items: list[tuple[Path, str]] = []
+        preheat_items: list[tuple[str, ThumbnailSource, str, ThumbnailSize]] = []
         size = self.get_thumbnail_size(logical_size)
         
-        for i in range(range_.first_visible, range_.last_visible + 1):
+        for i in viewport.preload_order(buffered):
             if i >= len(items):
-                break
+                continue
             
             item = items[i]
-            path = Path(item.get("path", ""))
-            file_type = item.get("type")
+            source = ThumbnailSource.from_item(item)
+            kind = thumbnail_kind(item.get("type"))
             
-            if not path.exists():
+            # 仅检查内存缓存；磁盘缓存由后台任务检查，避免在 UI 线程访问文件系统
+            try:
+                cache_key = self._cache_key(source, kind, size)
+            except OSError:
                 continue
-            
-            # 确定缩略图类型
-            if file_type in {"image", "video"}:
-                kind = str(file_type)
-            else:
-                kind = "shell"
-            
-            # 检查是否已在内存或磁盘缓存中
-            cache_key = self._cache_key(path, kind, size)
-            # 先检查内存缓存
-            if cache_key in self._memory_cache:
+            if cache_key in self._memory_cache or cache_key in self._encoded_cache:
                 continue
-            # 再检查磁盘缓存
-            cache_path = self._cache_path(cache_key)
-            if not cache_path.exists():
-                preheat_items.append((path, kind))
-        
-        # 分批提交到线程池
-        if preheat_items:
-            batch_size = max(1, len(preheat_items) // MAX_PRELOAD_WORKERS)
-            for i in range(0, len(preheat_items), batch_size):
-                batch = preheat_items[i:i + batch_size]
-                self._thread_pool.start(
-                    _PreheatTask(self, batch, logical_size, token)
-                )
-
-
-class _PreheatTask(QRunnable):
-    """后台预加载任务"""
+            preheat_items.append((cache_key, source, kind, size))
+        
+        self._scheduler.replace_preload(preheat_items)
+
+
+class ThumbnailLoader(QObject):
+    """
+    异步缩略图加载器
+
+    请求以可视项优先级提交到服务的调度器，工作线程生成/读取缩略图后，
+    通过 `thumbnail_ready(cache_key, QImage)` 信号交回 UI 线程，
+    由接收方转换为 QPixmap 并放入内存缓存。失败时发送空 QImage。
+    同一缓存键在加载完成前只提交一次；交回 UI 线程时记录首次绘制延迟。
+    """
+
+    thumbnail_ready = Signal(str, QImage)
+    # 工作线程 -> UI 线程（排队连接）
+    _delivered = Signal(str, QImage)
+
+    def __init__(self, service: ThumbnailService, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._service = service
+        # 缓存键 -> 请求时间
+        self._in_flight: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._delivered.connect(self._on_delivered)
+
+    def request(
+        self, source: ThumbnailSource, kind: str, logical_size: tuple[int, int]
+    ) -> str | None:
+        """提交加载请求，返回缓存键（无法生成键时返回 None）"""
+        size = self._service.get_thumbnail_size(logical_size)
+        try:
+            cache_key = self._service.thumbnail_key(source, kind, size)
+        except OSError:
+            return None
+        with self._lock:
+            if cache_key in self._in_flight:
+                return cache_key
+            self._in_flight[cache_key] = time.perf_counter()
+        self._service.submit_visible(cache_key, source, kind, size, self._finish)
+        return cache_key
+
+    def cancel(self, cache_key: str) -> None:
+        """取消一个请求；排队中的任务在没有其他接收方时丢弃"""
+        with self._lock:
+            if self._in_flight.pop(cache_key, None) is None:
+                return
+        self._service.cancel_request(cache_key, self._finish)
+
+    def cancel_pending(self) -> None:
+        """放弃所有未完成的请求（视图重建时调用）"""
+        with self._lock:
+            keys = list(self._in_flight)
+            self._in_flight.clear()
+        for cache_key in keys:
+            self._service.cancel_request(cache_key, self._finish)
+
+    def _finish(self, cache_key: str, image: QImage | None) -> None:
+        """调度器回调（工作线程）"""
+        try:
+            self._delivered.emit(cache_key, image if image is not None else QImage())
+        except RuntimeError:
+            # 接收方已销毁（窗口关闭时仍有任务在运行）
+            pass
+
+    def _on_delivered(self, cache_key: str, image: QImage) -> None:
+        with self._lock:
+            requested_at = self._in_flight.pop(cache_key, None)
+        if requested_at is None:
+            # 已取消
+            return
+        if not image.isNull():
+            self._service.record_first_paint(time.perf_counter() - requested_at)
+        self.thumbnail_ready.emit(cache_key, image)
+
+
+class _CleanupTask(QRunnable):
+    """后台磁盘缓存清理任务"""
     
-    def __init__(
-        self,
-        service: ThumbnailService,
-        items: list[tuple[Path, str]],
-        logical_size: tuple[int, int],
-        token: int,
-    ) -> None:
+    def __init__(self, service: ThumbnailService) -> None:
         super().__init__()
         self._service = service
-        self._items = items
-        self._logical_size = logical_size
-        self._token = token
 
     def run(self) -> None:
-        """执行预加载"""
-        for path, kind in self._items:
-            # 检查令牌是否过期（新任务已启动）
-            if self._service._preheat_token != self._token:
-                return
-            
-            if not path.exists():
-                continue
-            
-            size = self._service.get_thumbnail_size(self._logical_size)
-            
-            try:
-                if kind == "image":
-                    self._service._ensure_disk_image(path, size)
-                elif kind == "video":
-                    self._service._ensure_disk_video(path, size)
-                elif kind == "shell":
-                    self._service._ensure_disk_shell(path, size)
-            except Exception:
-                # 预加载失败不抛出，避免阻塞
-                pass
+        try:
+            self._service.cleanup_old_cache_files()
+        except Exception as e:
+            logger.warning(f"Thumbnail cache cleanup failed: {e}")
+        finally:
+            self._service._cleanup_lock.release()
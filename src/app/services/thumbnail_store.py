@@ -0,0 +1,531 @@
+"""
+缩略图存储后端
+
+- FileThumbnailStore：每个缩略图一个文件，按 key 哈希分两级目录（默认）
+- PackedThumbnailStore：追加写入的 pack 文件 + SQLite 偏移索引，
+  读取只需一次 pread，避免数百万小文件带来的 inode 消耗和目录遍历开销
+
+后端通过 `open_thumbnail_store()` 获取，同一目录共享一个实例，
+保证浏览视图与详情面板等多个 ThumbnailService 不会并发追加同一个 pack。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+
+# 存储后端类型
+STORE_FILES = "files"
+STORE_PACK = "pack"
+THUMB_STORES = (STORE_FILES, STORE_PACK)
+
+PACK_MAX_BYTES = 256 * 1024 * 1024   # 单个 pack 文件上限，超过后滚动到新文件
+COMPACT_DEAD_RATIO = 0.5             # 失效字节占比超过该值的 pack 参与压缩
+
+
+class ThumbnailStore(Protocol):
+    """缩略图存储接口 - 以缓存键存取编码后的图片字节"""
+
+    def contains(self, key: str) -> bool: ...
+
+    def read(self, key: str) -> bytes | None: ...
+
+    def write(self, key: str, data: bytes) -> bool: ...
+
+    def remove(self, keys: list[str]) -> int: ...
+
+    def compact(self) -> int: ...
+
+    def purge_untracked(self, tracked_keys: set[str], written_before: float | None = None) -> int: ...
+
+    def close(self) -> None: ...
+
+
+def _key_digest(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class FileThumbnailStore:
+    """每个缩略图一个文件：`root/ab/cd/<sha1><ext>`"""
+
+    def __init__(self, root: Path, extension: str) -> None:
+        self.root = root
+        self._extension = extension
+
+    def path_for(self, key: str) -> Path:
+        """缓存键对应的文件路径"""
+        digest = _key_digest(key)
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{self._extension}"
+
+    def contains(self, key: str) -> bool:
+        return self.path_for(key).exists()
+
+    def read(self, key: str) -> bytes | None:
+        try:
+            return self.path_for(key).read_bytes()
+        except OSError:
+            return None
+
+    def write(self, key: str, data: bytes) -> bool:
+        target = self.path_for(key)
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(data)
+            tmp_path.replace(target)
+            return True
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+    def remove(self, keys: list[str]) -> int:
+        removed = 0
+        for key in keys:
+            try:
+                self.path_for(key).unlink()
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def compact(self) -> int:
+        return 0
+
+    def purge_untracked(self, tracked_keys: set[str], written_before: float | None = None) -> int:
+        """删除清单中没有记录的缓存文件（清单建立之前生成的旧缓存），返回删除数量
+
+        written_before: 只删除修改时间早于该时刻的文件；之后写入的可能尚未登记到清单
+        """
+        if not self.root.exists():
+            return 0
+
+        tracked = {_key_digest(key) for key in tracked_keys}
+        deleted_count = 0
+        try:
+            for subdir in self.root.iterdir():
+                if not subdir.is_dir() or len(subdir.name) != 2:
+                    continue
+                for subsubdir in subdir.iterdir():
+                    if not subsubdir.is_dir():
+                        continue
+                    for cache_file in subsubdir.iterdir():
+                        if not cache_file.is_file() or cache_file.stem in tracked:
+                            continue
+                        try:
+                            if (
+                                written_before is not None
+                                and cache_file.stat().st_mtime >= written_before
+                            ):
+                                continue
+                            cache_file.unlink()
+                            deleted_count += 1
+                        except OSError:
+                            continue
+        except Exception as e:
+            logger.warning(f"Error purging untracked cache files: {e}")
+        return deleted_count
+
+    def close(self) -> None:
+        return
+
+
+@dataclass
+class PackStats:
+    """pack 存储统计"""
+    packs: int
+    entries: int
+    total_bytes: int
+    dead_bytes: int
+
+
+class PackedThumbnailStore:
+    """
+    追加写入的 pack 存储
+
+    布局（位于 `root/packs/`）：
+    - `pack-000001.bin` ...：缩略图字节顺序追加，从不原地修改
+    - `index.db`：SQLite 索引 key → (pack, offset, length)，并记录每个 pack 的失效字节
+
+    写入先追加并 flush 数据再提交索引，崩溃时最多留下未被引用的尾部字节，
+    由 compact() 回收。覆盖或删除的条目只累加失效字节，compact() 将存活条目
+    复制到新的 pack 后删除旧文件。
+
+    锁只保护索引连接、写入句柄与读取句柄表：读取在锁内查到位置后在锁外 pread，
+    互不阻塞；压缩在锁外复制数据，只在交换索引时持锁。被压缩的 pack 的读取句柄
+    等到没有进行中的读取时才关闭。
+    """
+
+    def __init__(self, root: Path, pack_max_bytes: int = PACK_MAX_BYTES) -> None:
+        self.root = root / "packs"
+        self._pack_max_bytes = pack_max_bytes
+        self._lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+        self._writer = None
+        self._writer_pack = 0
+        self._read_fds: dict[int, int] = {}
+        # 锁外 pread 进行中的数量，以及等待它们结束后关闭的句柄
+        self._active_reads = 0
+        self._retired_fds: list[int] = []
+        # 正在压缩的源 pack 与目标 pack（不作为追加写入的目标）
+        self._compacting: set[int] = set()
+
+    # ========== 内部 ==========
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.root / "index.db"), check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " pack INTEGER NOT NULL,"
+                " offset INTEGER NOT NULL,"
+                " length INTEGER NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_pack ON entries(pack)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS packs ("
+                " id INTEGER PRIMARY KEY,"
+                " dead_bytes INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _pack_path(self, pack_id: int) -> Path:
+        return self.root / f"pack-{pack_id:06d}.bin"
+
+    def _open_writer(self, min_free: int):
+        """返回可追加的 pack 句柄，当前 pack 已满时滚动到新文件"""
+        if self._writer is not None and self._writer.tell() + min_free > self._pack_max_bytes:
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            conn = self._db()
+            row = conn.execute("SELECT MAX(id) FROM packs").fetchone()
+            pack_id = row[0] or 0
+            try:
+                current_size = self._pack_path(pack_id).stat().st_size if pack_id else 0
+            except OSError:
+                current_size = 0
+            if (
+                pack_id == 0
+                or pack_id in self._compacting
+                or current_size + min_free > self._pack_max_bytes
+            ):
+                pack_id += 1
+                conn.execute("INSERT INTO packs (id, dead_bytes) VALUES (?, 0)", (pack_id,))
+            self._writer = self._pack_path(pack_id).open("ab")
+            self._writer.seek(0, os.SEEK_END)
+            self._writer_pack = pack_id
+        return self._writer
+
+    def _append(self, data: bytes) -> tuple[int, int]:
+        writer = self._open_writer(len(data))
+        offset = writer.tell()
+        writer.write(data)
+        writer.flush()
+        return self._writer_pack, offset
+
+    def _mark_dead(self, pack_id: int, length: int) -> None:
+        self._db().execute(
+            "UPDATE packs SET dead_bytes = dead_bytes + ? WHERE id = ?", (length, pack_id)
+        )
+
+    def _read_fd(self, pack_id: int) -> int | None:
+        """pack 的只读句柄（持锁调用，打开后缓存）"""
+        fd = self._read_fds.get(pack_id)
+        if fd is None:
+            try:
+                fd = os.open(self._pack_path(pack_id), os.O_RDONLY)
+            except OSError:
+                return None
+            self._read_fds[pack_id] = fd
+        return fd
+
+    def _read_locked(self, pack_id: int, offset: int, length: int) -> bytes | None:
+        """无 os.pread 的平台（Windows）在锁内 seek+read"""
+        try:
+            with self._pack_path(pack_id).open("rb") as handle:
+                handle.seek(offset)
+                return handle.read(length)
+        except OSError:
+            return None
+
+    def _retire_read_fd(self, pack_id: int) -> None:
+        """停止使用 pack 的读取句柄，没有进行中的读取时关闭（持锁调用）"""
+        fd = self._read_fds.pop(pack_id, None)
+        if fd is not None:
+            self._retired_fds.append(fd)
+        self._close_retired_fds()
+
+    def _close_retired_fds(self) -> None:
+        if self._active_reads:
+            return
+        for fd in self._retired_fds:
+            os.close(fd)
+        self._retired_fds.clear()
+
+    # ========== 存取 ==========
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = self._db().execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def read(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT pack, offset, length FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            pack_id, offset, length = row
+            if not hasattr(os, "pread"):
+                data = self._read_locked(pack_id, offset, length)
+                return data if data is not None and len(data) == length else None
+            fd = self._read_fd(pack_id)
+            if fd is None:
+                return None
+            self._active_reads += 1
+        try:
+            data = os.pread(fd, length, offset)
+        except OSError:
+            data = None
+        finally:
+            with self._lock:
+                self._active_reads -= 1
+                self._close_retired_fds()
+        if data is None or len(data) != length:
+            return None
+        return data
+
+    def write(self, key: str, data: bytes) -> bool:
+        with self._lock:
+            try:
+                conn = self._db()
+                pack_id, offset = self._append(data)
+                conn.execute("BEGIN")
+                old = conn.execute(
+                    "SELECT pack, length FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if old is not None:
+                    self._mark_dead(*old)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, pack, offset, length, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, pack_id, offset, len(data), time.time()),
+                )
+                conn.execute("COMMIT")
+                return True
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Failed to write packed thumbnail: {e}")
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                return False
+
+    def remove(self, keys: list[str]) -> int:
+        """删除条目（仅标记失效字节，空间由 compact() 回收）"""
+        removed = 0
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            for key in keys:
+                row = conn.execute(
+                    "SELECT pack, length FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    continue
+                self._mark_dead(*row)
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                removed += 1
+            conn.execute("COMMIT")
+        return removed
+
+    # ========== 维护 ==========
+
+    def compact(self, dead_ratio: float = COMPACT_DEAD_RATIO) -> int:
+        """压缩失效字节占比过高的 pack，返回回收的字节数
+
+        存活条目复制到新 pack，索引更新后删除旧文件。
+        """
+        reclaimed = 0
+        with self._lock:
+            conn = self._db()
+            candidates = []
+            for pack_id, dead_bytes in conn.execute("SELECT id, dead_bytes FROM packs").fetchall():
+                path = self._pack_path(pack_id)
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    size = 0
+                live = conn.execute(
+                    "SELECT COALESCE(SUM(length), 0) FROM entries WHERE pack = ?", (pack_id,)
+                ).fetchone()[0]
+                # 包含崩溃遗留的未引用字节
+                dead = max(dead_bytes, size - live)
+                if size and dead / size >= dead_ratio:
+                    candidates.append((pack_id, size))
+
+        for pack_id, size in candidates:
+            moved_bytes = self._compact_pack(pack_id)
+            if moved_bytes is not None:
+                reclaimed += size - moved_bytes
+        if reclaimed:
+            logger.info(f"Compacted thumbnail packs, reclaimed {reclaimed / 1024 / 1024:.2f} MB")
+        return reclaimed
+
+    def _compact_pack(self, pack_id: int) -> int | None:
+        """把一个 pack 的存活条目复制到新 pack，返回仍有效的复制字节数（失败时 None）
+
+        复制在锁外进行，期间的读写照常；交换索引时只更新仍指向原位置的条目，
+        复制期间被覆盖或删除的条目在新 pack 中记为失效字节。
+        """
+        with self._lock:
+            conn = self._db()
+            if self._writer is not None and self._writer_pack == pack_id:
+                self._writer.close()
+                self._writer = None
+            rows = conn.execute(
+                "SELECT key, offset, length FROM entries WHERE pack = ?", (pack_id,)
+            ).fetchall()
+            target_id = (conn.execute("SELECT MAX(id) FROM packs").fetchone()[0] or 0) + 1
+            conn.execute("INSERT INTO packs (id, dead_bytes) VALUES (?, 0)", (target_id,))
+            self._compacting.update((pack_id, target_id))
+
+        try:
+            moves = self._copy_entries(pack_id, target_id, rows)
+        except OSError as e:
+            # 目标 pack 中已复制的字节未被引用，下次压缩时回收
+            logger.warning(f"Failed to compact thumbnail pack {pack_id}: {e}")
+            with self._lock:
+                self._compacting.difference_update((pack_id, target_id))
+            return None
+
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            moved_bytes = 0
+            stale_bytes = 0
+            for key, offset, length, new_offset in moves:
+                cursor = conn.execute(
+                    "UPDATE entries SET pack = ?, offset = ?"
+                    " WHERE key = ? AND pack = ? AND offset = ?",
+                    (target_id, new_offset, key, pack_id, offset),
+                )
+                if cursor.rowcount:
+                    moved_bytes += length
+                else:
+                    stale_bytes += length
+            if stale_bytes:
+                self._mark_dead(target_id, stale_bytes)
+            conn.execute("DELETE FROM entries WHERE pack = ?", (pack_id,))
+            conn.execute("DELETE FROM packs WHERE id = ?", (pack_id,))
+            conn.execute("COMMIT")
+            self._compacting.difference_update((pack_id, target_id))
+            self._retire_read_fd(pack_id)
+            self._pack_path(pack_id).unlink(missing_ok=True)
+        return moved_bytes
+
+    def _copy_entries(
+        self, pack_id: int, target_id: int, rows: list[tuple[str, int, int]]
+    ) -> list[tuple[str, int, int, int]]:
+        """把条目从源 pack 复制到目标 pack（不持锁：两个文件都不会被其他线程写入）
+
+        返回 (key, 原偏移, 长度, 新偏移)，读取不完整的条目跳过。
+        """
+        moves = []
+        with self._pack_path(pack_id).open("rb") as source, \
+                self._pack_path(target_id).open("ab") as target:
+            target.seek(0, os.SEEK_END)
+            for key, offset, length in rows:
+                source.seek(offset)
+                data = source.read(length)
+                if len(data) != length:
+                    continue
+                moves.append((key, offset, length, target.tell()))
+                target.write(data)
+            target.flush()
+        return moves
+
+    def purge_untracked(self, tracked_keys: set[str], written_before: float | None = None) -> int:
+        """删除清单中没有记录的条目，返回删除数量
+
+        written_before: 只删除写入时间早于该时刻的条目；之后写入的可能尚未登记到清单
+        """
+        with self._lock:
+            keys = [
+                key
+                for key, created_at in self._db().execute("SELECT key, created_at FROM entries")
+                if key not in tracked_keys
+                and (written_before is None or created_at < written_before)
+            ]
+        return self.remove(keys) if keys else 0
+
+    def stats(self) -> PackStats:
+        with self._lock:
+            conn = self._db()
+            packs, dead = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(dead_bytes), 0) FROM packs"
+            ).fetchone()
+            entries, live = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM entries"
+            ).fetchone()
+        return PackStats(packs=packs, entries=entries, total_bytes=live + dead, dead_bytes=dead)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for pack_id in list(self._read_fds):
+                self._retire_read_fd(pack_id)
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_stores: dict[tuple[str, Path], ThumbnailStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_thumbnail_store(kind: str, root: Path, extension: str) -> ThumbnailStore:
+    """获取目录对应的共享存储实例
+
+    Args:
+        kind: "files" 或 "pack"，未知值按 "files" 处理
+        root: 缩略图目录
+        extension: 文件存储使用的扩展名（.webp/.jpg）
+    """
+    kind = kind if kind in THUMB_STORES else STORE_FILES
+    cache_key = (kind, root.resolve())
+    with _stores_lock:
+        store = _stores.get(cache_key)
+        if store is None:
+            if kind == STORE_PACK:
+                store = PackedThumbnailStore(root)
+            else:
+                store = FileThumbnailStore(root, extension)
+            _stores[cache_key] = store
+        return store
+
+
+def close_thumbnail_stores() -> None:
+    """关闭所有共享存储（应用退出时调用）"""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1,344 @@
+"""
+缩略图生成后端 - 解码与编码在调用线程或独立进程中执行
+
+Pillow 的缩放与 WebP 编码有一部分持有 GIL，QThreadPool 线程增多后吞吐很快饱和。
+进程后端把 `render_image`/`render_video` 提交到进程池，进程间只传递路径与编码后的字节；
+调用方（QThreadPool 工作线程）等待结果时不占用 GIL，写入存储和清单仍在主进程完成。
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import re
+import signal
+import subprocess
+import threading
+
+from PIL import Image
+
+from .thumbnail_codec import decode_thumbnail, encode_thumbnail
+from ..utils.windows_thumbnails import load_shell_thumbnail
+
+logger = logging.getLogger(__name__)
+
+# 等待工作进程返回单个缩略图的最长时间（秒），超时按生成失败处理
+RENDER_TIMEOUT = 60.0
+# 同时运行的 ffmpeg 进程上限（进程后端下每个工作进程同一时间只处理一个任务）
+MAX_FFMPEG_PROCESSES = 2
+# 单次 ffmpeg 抓帧的超时（秒），超时后结束 ffmpeg 进程
+FFMPEG_TIMEOUT = 15.0
+# 抓帧位置（秒），跳过片头的黑场；更短的视频取第一帧
+VIDEO_SEEK_SECONDS = 1.0
+
+_ffmpeg_slots = threading.BoundedSemaphore(MAX_FFMPEG_PROCESSES)
+_DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def render_image(path: str, size: tuple[int, int]) -> bytes | None:
+    """生成图片缩略图，返回编码后的字节（失败返回 None）"""
+    source = Path(path)
+    # 优先使用系统 Shell 缩略图
+    shell_image = load_shell_thumbnail(source, size)
+    if shell_image is not None:
+        try:
+            return encode_thumbnail(shell_image, size)
+        except Exception:
+            pass
+    try:
+        # 回退到 PIL 处理：按目标尺寸降分辨率解码（见 thumbnail_codec）
+        return encode_thumbnail(decode_thumbnail(source, size), size)
+    except Exception:
+        return None
+
+
+def render_video(path: str, size: tuple[int, int], ffmpeg_bin: str | None) -> bytes | None:
+    """生成视频缩略图，返回编码后的字节（失败返回 None）"""
+    source = Path(path)
+    # 优先使用系统 Shell 缩略图
+    shell_image = load_shell_thumbnail(source, size)
+    if shell_image is not None:
+        try:
+            return encode_thumbnail(shell_image, size)
+        except Exception:
+            pass
+
+    # 回退到 ffmpeg
+    if not ffmpeg_bin:
+        return None
+    image = extract_video_frame(source, size, ffmpeg_bin)
+    if image is None:
+        return None
+    try:
+        return encode_thumbnail(image, size)
+    except Exception:
+        return None
+
+
+def extract_video_frame(
+    path: Path, size: tuple[int, int], ffmpeg_bin: str, seek: float = VIDEO_SEEK_SECONDS
+) -> Image.Image | None:
+    """用 ffmpeg 抓取一帧并缩放到 size 以内
+
+    帧以 PPM 格式经 stdout 管道直接交给 PIL，不写临时文件、不做中间 JPEG 编码。
+    视频短于 seek 时没有输出，回退到第一帧；超时视为文件损坏，不再重试。
+    """
+    scale = f"scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease"
+    for position in (seek, 0.0) if seek > 0 else (0.0,):
+        command = [
+            ffmpeg_bin,
+            "-v", "error",
+            "-nostdin",
+            "-ss", f"{position:g}",
+            "-i", str(path),
+            "-frames:v", "1",
+            "-vf", scale,
+            "-f", "image2pipe",
+            "-c:v", "ppm",
+            "pipe:1",
+        ]
+        output = _run_ffmpeg(command, path)
+        if output is None:
+            # 超时：文件可能已损坏，不再重试
+            return None
+        if output:
+            try:
+                image = Image.open(BytesIO(output))
+                image.load()
+                return image
+            except Exception:
+                return None
+    return None
+
+
+def _run_ffmpeg(command: list[str], path: Path | str) -> bytes | None:
+    """运行 ffmpeg 并返回 stdout；超时或无法启动时返回 None"""
+    with _ffmpeg_slots:
+        try:
+            return subprocess.run(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=FFMPEG_TIMEOUT,
+            ).stdout
+        except subprocess.TimeoutExpired:
+            logger.warning(f"ffmpeg timed out after {FFMPEG_TIMEOUT:g}s: {path}")
+        except OSError:
+            pass
+    return None
+
+
+def render_video_sheet(
+    path: str, size: tuple[int, int], ffmpeg_bin: str | None, frames: int
+) -> bytes | None:
+    """生成视频联系表：frames 帧横向拼接为一张图，每帧缩放到 size 以内
+
+    时长取自容器头；一次 ffmpeg 调用中每帧各用一个 `-ss` 输入定位（只解码定位点附近），
+    由 hstack 拼接后经管道输出。
+    """
+    if not ffmpeg_bin or frames < 2:
+        return None
+    duration = _probe_duration(Path(path), ffmpeg_bin)
+    if not duration:
+        return None
+
+    command = [ffmpeg_bin, "-v", "error", "-nostdin"]
+    for index in range(frames):
+        # 取各段的中点，避开片头片尾
+        command += ["-ss", f"{duration * (index + 0.5) / frames:.3f}", "-i", path]
+    scale = f"scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease,setsar=1"
+    graph = ";".join(f"[{index}:v:0]{scale}[v{index}]" for index in range(frames))
+    inputs = "".join(f"[v{index}]" for index in range(frames))
+    command += [
+        "-filter_complex", f"{graph};{inputs}hstack=inputs={frames}[sheet]",
+        "-map", "[sheet]",
+        "-frames:v", "1",
+        "-f", "image2pipe",
+        "-c:v", "ppm",
+        "pipe:1",
+    ]
+    output = _run_ffmpeg(command, path)
+    if not output:
+        return None
+    try:
+        sheet = Image.open(BytesIO(output))
+        sheet.load()
+        return encode_thumbnail(sheet, sheet.size)
+    except Exception:
+        return None
+
+
+def _probe_duration(path: Path, ffmpeg_bin: str) -> float | None:
+    """读取容器头中的时长（秒）；`ffmpeg -i` 不指定输出时只解析头部"""
+    with _ffmpeg_slots:
+        try:
+            result = subprocess.run(
+                [ffmpeg_bin, "-hide_banner", "-nostdin", "-i", str(path)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=FFMPEG_TIMEOUT,
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+    match = _DURATION_PATTERN.search(result.stderr.decode("utf-8", "replace"))
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _register_worker(pids) -> None:
+    """工作进程启动时登记进程号，超时后由主进程终止"""
+    pids.put(os.getpid())
+
+
+def _terminate(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+def _render(
+    kind: str, path: str, size: tuple[int, int], ffmpeg_bin: str | None, frames: int
+) -> bytes | None:
+    if kind == "sheet":
+        return render_video_sheet(path, size, ffmpeg_bin, frames)
+    if kind == "video":
+        return render_video(path, size, ffmpeg_bin)
+    return render_image(path, size)
+
+
+class ThumbnailRenderer:
+    """在调用线程中生成缩略图（默认后端）"""
+
+    workers = 0
+
+    def render(
+        self,
+        kind: str,
+        path: Path,
+        size: tuple[int, int],
+        ffmpeg_bin: str | None = None,
+        frames: int = 0,
+    ) -> bytes | None:
+        """生成 image/video/sheet（视频联系表）缩略图并返回编码后的字节"""
+        return _render(kind, str(path), size, ffmpeg_bin, frames)
+
+    def close(self) -> None:
+        pass
+
+
+class ProcessThumbnailRenderer(ThumbnailRenderer):
+    """在进程池中生成缩略图
+
+    进程池在首次生成时才启动；使用 spawn 方式创建子进程，
+    避免在已运行 Qt 线程的进程中 fork 导致死锁。工作进程崩溃（如解码器异常退出）或
+    任务超时时丢弃进程池，下次生成时重建；超时的进程池中的工作进程被终止，
+    卡住的解码不会一直占用进程。同一进程池中其他正在运行的任务按失败处理。
+
+    多个服务共用一个后端，同时提交的任务不超过工作进程数，提交后立即开始运行，
+    超时只计算生成耗时，不包括排队等待。
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = max(1, workers)
+        self._executor: ProcessPoolExecutor | None = None
+        # 当前进程池的工作进程登记的进程号
+        self._pids = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context("spawn")
+                self._pids = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_register_worker,
+                    initargs=(self._pids,),
+                )
+            return self._executor
+
+    def render(
+        self,
+        kind: str,
+        path: Path,
+        size: tuple[int, int],
+        ffmpeg_bin: str | None = None,
+        frames: int = 0,
+    ) -> bytes | None:
+        with self._slots:
+            return self._render_in_pool(kind, path, size, ffmpeg_bin, frames)
+
+    def _render_in_pool(
+        self, kind: str, path: Path, size: tuple[int, int], ffmpeg_bin: str | None, frames: int
+    ) -> bytes | None:
+        pool = self._pool()
+        try:
+            future = pool.submit(_render, kind, str(path), size, ffmpeg_bin, frames)
+            return future.result(timeout=RENDER_TIMEOUT)
+        except FutureTimeoutError:
+            # 已在运行的任务无法取消，只能终止工作进程
+            logger.warning(f"Thumbnail worker timed out: {path}")
+            self._discard(pool, terminate=True)
+        except BrokenProcessPool:
+            logger.warning(f"Thumbnail worker crashed: {path}")
+            self._discard(pool)
+        except RuntimeError:
+            # 进程池已关闭（应用退出时仍有任务在运行）
+            pass
+        return None
+
+    def _discard(self, pool: ProcessPoolExecutor, terminate: bool = False) -> None:
+        """丢弃进程池，下次生成时重建"""
+        with self._lock:
+            if self._executor is not pool:
+                # 其他线程已丢弃
+                return
+            self._executor = None
+            pids, self._pids = self._pids, None
+        pool.shutdown(wait=False, cancel_futures=True)
+        if terminate:
+            while not pids.empty():
+                _terminate(pids.get())
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._executor = self._executor, None
+            self._pids = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_renderers: dict[int, ThumbnailRenderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def open_thumbnail_renderer(workers: int) -> ThumbnailRenderer:
+    """获取共享的生成后端
+
+    Args:
+        workers: 工作进程数，0 表示在调用线程中生成
+    """
+    workers = max(0, workers)
+    with _renderers_lock:
+        renderer = _renderers.get(workers)
+        if renderer is None:
+            renderer = ProcessThumbnailRenderer(workers) if workers else ThumbnailRenderer()
+            _renderers[workers] = renderer
+        return renderer
+
+
+def close_thumbnail_renderers() -> None:
+    """关闭所有进程池（应用退出时调用）"""
+    with _renderers_lock:
+        for renderer in _renderers.values():
+            renderer.close()
+        _renderers.clear()
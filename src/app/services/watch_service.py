@@ -57,6 +57,8 @@ class _WatchHandler(FileSystemEventHandler):
     def on_moved(self, event) -> None:
         if event.is_directory:
             return
+        if self.on_delete:
+            self.on_delete(Path(event.src_path))
         if self.on_change:
             self.on_change(Path(event.dest_path))
 
@@ -1,20 +1,34 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import shutil
+from typing import Callable, Iterable
 
 from ..config import AppConfig
-from ..core.search import SearchQuery
+from ..core.search import FolderResult, SearchQuery, SearchResult
 from ..core.tag_manager import TagSpec
 from ..db.repo import Repo
-from ..db.session import get_session
+from ..db.session import bump_generation, current_generation, get_session
 from ..services.scan_service import ScanService
+from ..utils.lru_cache import LRUCache
+
+# 搜索结果缓存的最大查询条数
+SEARCH_CACHE_SIZE = 64
+# 批量打标签时每次集合操作处理的文件数（用于进度汇报）
+BULK_TAG_CHUNK = 1000
 
 
 @dataclass
 class AppController:
     config: AppConfig
+    # 搜索结果缓存：键为 (SearchQuery, limit, offset)，数据库写入代数变化时整体失效
+    _search_cache: LRUCache[tuple[SearchQuery, int | None, int], list[SearchResult]] = field(
+        default_factory=lambda: LRUCache(max_size=SEARCH_CACHE_SIZE),
+        init=False,
+        repr=False,
+    )
+    _search_generation: int = field(default=-1, init=False, repr=False)
 
     @staticmethod
     def _within_workspace(path: Path, workspace_root: Path | None) -> bool:
@@ -35,6 +49,7 @@ class AppController:
             return count
         finally:
             session.close()
+            bump_generation()
 
     def list_files(self, limit: int | None = None):
         session = get_session()
@@ -52,11 +67,41 @@ class AppController:
         finally:
             session.close()
 
-    def search(self, query: SearchQuery, limit: int | None = None):
+    def search(
+        self, query: SearchQuery, limit: int | None = None, offset: int = 0
+    ) -> list[SearchResult]:
+        generation = current_generation()
+        if generation != self._search_generation:
+            self._search_cache.clear()
+            self._search_generation = generation
+        key = (query, limit, offset)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        session = get_session()
+        try:
+            repo = Repo(session)
+            results = repo.search(query, limit=limit, offset=offset)
+        finally:
+            session.close()
+        self._search_cache.put(key, results)
+        return list(results)
+
+    def match_files(self, query: SearchQuery, file_ids: Iterable[int]) -> list[SearchResult]:
+        """指定文件中仍满足查询条件的结果（不缓存，用于增量刷新视图）"""
         session = get_session()
         try:
             repo = Repo(session)
-            return repo.search(query, limit=limit)
+            return repo.search(query, file_ids=file_ids)
+        finally:
+            session.close()
+
+    def list_child_folders(self, query: SearchQuery, parent: str) -> list[FolderResult]:
+        session = get_session()
+        try:
+            repo = Repo(session)
+            return repo.list_child_folders(query, parent)
         finally:
             session.close()
 
@@ -68,6 +113,14 @@ class AppController:
         finally:
             session.close()
 
+    def tag_type_counts(self) -> dict[int, dict[str, int]]:
+        session = get_session()
+        try:
+            repo = Repo(session)
+            return repo.tag_type_counts()
+        finally:
+            session.close()
+
     def create_tag(self, name: str):
         session = get_session()
         try:
@@ -77,6 +130,7 @@ class AppController:
             return tag
         finally:
             session.close()
+            bump_generation()
 
     def delete_tag(self, tag_id: int) -> None:
         session = get_session()
@@ -86,19 +140,10 @@ class AppController:
             session.commit()
         finally:
             session.close()
+            bump_generation()
 
     def attach_tags(self, file_id: int, tag_ids: list[int]) -> None:
-        session = get_session()
-        try:
-            repo = Repo(session)
-            file_row = repo.get_file_by_id(file_id)
-            if file_row is None:
-                return
-            tags = repo.get_tags_by_ids(tag_ids)
-            repo.attach_tags(file_row, tags)
-            session.commit()
-        finally:
-            session.close()
+        self.attach_tags_bulk([file_id], tag_ids)
 
     def tags_for_file(self, file_id: int):
         session = get_session()
@@ -109,30 +154,67 @@ class AppController:
             session.close()
 
     def replace_tags(self, file_id: int, tag_ids: list[int]) -> None:
-        session = get_session()
-        try:
-            repo = Repo(session)
-            file_row = repo.get_file_by_id(file_id)
-            if file_row is None:
-                return
-            tags = repo.get_tags_by_ids(tag_ids)
-            repo.replace_tags(file_row, tags)
-            session.commit()
-        finally:
-            session.close()
+        self.replace_tags_bulk([file_id], tag_ids)
 
     def remove_tags(self, file_id: int, tag_ids: list[int]) -> None:
+        self.remove_tags_bulk([file_id], tag_ids)
+
+    def attach_tags_bulk(
+        self,
+        file_ids: list[int],
+        tag_ids: list[int],
+        on_progress: Callable[[int, int], None] | None = None,
+    ) -> int:
+        return self._bulk_tag_update("attach", file_ids, tag_ids, on_progress)
+
+    def remove_tags_bulk(
+        self,
+        file_ids: list[int],
+        tag_ids: list[int],
+        on_progress: Callable[[int, int], None] | None = None,
+    ) -> int:
+        return self._bulk_tag_update("remove", file_ids, tag_ids, on_progress)
+
+    def replace_tags_bulk(
+        self,
+        file_ids: list[int],
+        tag_ids: list[int],
+        on_progress: Callable[[int, int], None] | None = None,
+    ) -> int:
+        return self._bulk_tag_update("replace", file_ids, tag_ids, on_progress)
+
+    def _bulk_tag_update(
+        self,
+        mode: str,
+        file_ids: list[int],
+        tag_ids: list[int],
+        on_progress: Callable[[int, int], None] | None = None,
+    ) -> int:
+        """Apply a tag change to many files in a single transaction.
+
+        Work is split into ``BULK_TAG_CHUNK`` sized set operations so progress
+        can be reported; the transaction is committed once at the end.
+        """
+        file_ids = list(dict.fromkeys(int(file_id) for file_id in file_ids))
+        tag_ids = list(dict.fromkeys(int(tag_id) for tag_id in tag_ids))
+        total = len(file_ids)
         session = get_session()
         try:
             repo = Repo(session)
-            file_row = repo.get_file_by_id(file_id)
-            if file_row is None:
-                return
-            tags = repo.get_tags_by_ids(tag_ids)
-            repo.remove_tags_from_file(file_row, tags)
+            operation = {
+                "attach": repo.attach_tags_to_files,
+                "remove": repo.detach_tags_from_files,
+                "replace": repo.replace_tags_for_files,
+            }[mode]
+            for start in range(0, total, BULK_TAG_CHUNK):
+                operation(file_ids[start:start + BULK_TAG_CHUNK], tag_ids)
+                if on_progress:
+                    on_progress(min(start + BULK_TAG_CHUNK, total), total)
             session.commit()
+            return total
         finally:
             session.close()
+            bump_generation()
 
     def delete_files(self, file_ids: list[int]) -> None:
         session = get_session()
@@ -142,6 +224,7 @@ class AppController:
             session.commit()
         finally:
             session.close()
+            bump_generation()
 
     def move_files(
         self, file_ids: list[int], destination: Path, workspace_root: Path | None = None
@@ -176,6 +259,7 @@ class AppController:
             session.commit()
         finally:
             session.close()
+            bump_generation()
         return moved, errors
 
     def copy_files(
@@ -208,29 +292,38 @@ class AppController:
             session.commit()
         finally:
             session.close()
+            bump_generation()
         return copied, errors
 
-    def handle_file_changed(self, path: Path) -> None:
+    def handle_file_changed(self, path: Path) -> int | None:
+        """更新单个文件的索引，返回文件 ID"""
         if not path.exists() or not path.is_file():
-            return
+            return None
         session = get_session()
         try:
             repo = Repo(session)
             from ..core.indexer import build_file_meta
 
             meta = build_file_meta(path)
-            repo.upsert_file(meta)
+            file_row = repo.upsert_file(meta)
             session.commit()
+            return int(file_row.id) if file_row.id is not None else None
         finally:
             session.close()
+            bump_generation()
 
-    def handle_file_deleted(self, path: Path) -> None:
+    def handle_file_deleted(self, path: Path) -> int | None:
+        """从索引中删除文件，返回被删除的文件 ID"""
         session = get_session()
         try:
             repo = Repo(session)
             file_row = repo.get_file_by_path(str(path))
             if file_row and file_row.id is not None:
-                repo.delete_files([int(file_row.id)])
+                file_id = int(file_row.id)
+                repo.delete_files([file_id])
                 session.commit()
+                return file_id
+            return None
         finally:
             session.close()
+            bump_generation()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from dataclasses import replace
 from pathlib import Path
-from typing import cast
+from typing import Iterable, cast
 
 from PySide6.QtCore import QObject, QThread, Signal, QUrl, QSize, Qt, QTimer
 from PySide6.QtWidgets import (
@@ -26,10 +27,12 @@ from PySide6.QtGui import QDesktopServices, QAction
 
 from ..config import AppConfig, workspace_db_path, save_last_workspace
 from ..core.search import SearchQuery
+from ..core.tag_expr import TagExpressionError, parse_tag_expression
 from .controllers import AppController
-from .views.browser_view import FileBrowserView
+from .views.browser_view import THUMBNAIL_SIZES, FileBrowserView
 from .views.detail_panel import DetailPanel
 from .views.tag_panel import TagPanel
+from ..services.thumbnail_precompute import ThumbnailPrecomputer
 from ..services.watch_service import WatchService
 from .resources import get_icon, set_theme
 from .resources.styles import get_stylesheet
@@ -44,7 +47,22 @@ class MainWindow(QMainWindow):
         self.active_workspace = config.default_workspace
         self._scan_thread: QThread | None = None
         self._scan_worker: ScanWorker | None = None
+        self._tag_thread: QThread | None = None
+        self._tag_worker: TagWorker | None = None
         self._watch_service = WatchService()
+        self._watch_bridge = WatchBridge(self.controller)
+        self._watch_bridge.file_changed.connect(self._on_watch_event)
+        self._watch_bridge.file_deleted.connect(self._on_watch_event)
+        # Watcher events arrive in bursts; patch the view once per burst
+        self._watched_ids: set[int] = set()
+        self._watch_timer = QTimer(self)
+        self._watch_timer.setSingleShot(True)
+        self._watch_timer.setInterval(200)
+        self._watch_timer.timeout.connect(self._flush_watch_events)
+        # Query behind the browser contents, for in-place updates
+        self._shown_query: SearchQuery | None = None
+        self._shown_root: Path | None = None
+        self._tag_job_file_ids: list[int] = []
         self._view_mode_value = "list"
         self._layout_mode_value = "all"
         self._type_filter_value = ""
@@ -74,15 +92,28 @@ class MainWindow(QMainWindow):
         # Create status bar
         self._build_status_bar()
 
+        # Background thumbnail generation after scans (optional)
+        self._precomputer: ThumbnailPrecomputer | None = None
+        self._precompute_progress = (0, 0)
+        if self.config.thumb_precompute:
+            self._precomputer = ThumbnailPrecomputer(
+                self.browser_view._thumb_service,
+                cpu_budget=self.config.thumb_precompute_cpu,
+                io_budget_mb=self.config.thumb_precompute_io_mb,
+                parent=self,
+            )
+            self._precomputer.progress.connect(self._on_precompute_progress)
+            self._precomputer.finished.connect(self._on_precompute_finished)
+        self._precompute_action.setEnabled(self._precomputer is not None)
+
         # Apply theme
         self._apply_theme_preset("light")
 
         # Load initial data
         if self.active_workspace is not None:
-            self.config = AppConfig(
-                data_dir=self.config.data_dir,
+            self.config = replace(
+                self.config,
                 db_path=workspace_db_path(self.config.data_dir, self.active_workspace),
-                thumbs_dir=self.config.thumbs_dir,
                 default_workspace=self.active_workspace,
             )
             from ..db.session import init_db
@@ -92,6 +123,8 @@ class MainWindow(QMainWindow):
         self._load_initial_files()
         self._load_tags()
         self._refresh_workspace_ui()
+        # Resume a pass interrupted by the last exit
+        self._start_precompute(restart=False)
 
     def _build_toolbar(self) -> QToolBar:
         """Build a modern, organized toolbar."""
@@ -281,6 +314,7 @@ class MainWindow(QMainWindow):
         self.tag_panel.apply_button.clicked.connect(self._on_apply_tags)
         self.tag_panel.remove_button.clicked.connect(self._on_remove_tags)
         self.tag_panel.filter_button.clicked.connect(self._on_tag_filter_clicked)
+        self.tag_panel.expression_input.returnPressed.connect(self._on_tag_filter_clicked)
         self.tag_panel.clear_filter_button.clicked.connect(self._on_clear_filter)
         self.detail_panel.tag_remove_requested.connect(self._on_detail_tag_removed)
 
@@ -299,6 +333,12 @@ class MainWindow(QMainWindow):
         self.progress.setTextVisible(False)
         self.status_bar.addPermanentWidget(self.progress)
 
+        # Thumbnail precompute progress (hidden when idle)
+        self.precompute_label = QLabel("")
+        self.precompute_label.setObjectName("precomputeLabel")
+        self.precompute_label.setVisible(False)
+        self.status_bar.addPermanentWidget(self.precompute_label)
+
         # Memory cache stats label
         self.cache_stats_label = QLabel("")
         self.cache_stats_label.setObjectName("cacheStatsLabel")
@@ -339,6 +379,10 @@ class MainWindow(QMainWindow):
         file_menu.addAction(QAction("🧹 Clean Databases", self, triggered=self._on_clean_databases))
         file_menu.addSeparator()
         file_menu.addAction(QAction("🗑️ Clean Thumbnail Cache", self, triggered=self._on_clean_thumbnail_cache))
+        self._precompute_action = QAction(
+            "⏸️ Pause Thumbnail Generation", self, checkable=True, triggered=self._on_pause_precompute
+        )
+        file_menu.addAction(self._precompute_action)
         file_menu.addSeparator()
         file_menu.addAction(QAction("❌ Exit", self, triggered=self.close))
 
@@ -416,7 +460,7 @@ class MainWindow(QMainWindow):
 
     def _load_tags(self) -> None:
         tags = self.controller.list_tags()
-        self.tag_panel.set_tags(tags)
+        self.tag_panel.set_tags(tags, self.controller.tag_type_counts())
 
     def _refresh_workspace_ui(self) -> None:
         if self.active_workspace is not None:
@@ -433,10 +477,9 @@ class MainWindow(QMainWindow):
         if self.config.db_path != workspace_db_path(
             self.config.data_dir, self.active_workspace
         ):
-            self.config = AppConfig(
-                data_dir=self.config.data_dir,
+            self.config = replace(
+                self.config,
                 db_path=workspace_db_path(self.config.data_dir, self.active_workspace),
-                thumbs_dir=self.config.thumbs_dir,
                 default_workspace=self.active_workspace,
             )
             from ..db.session import init_db
@@ -453,6 +496,10 @@ class MainWindow(QMainWindow):
                 self._scan_thread = None
                 self._scan_worker = None
 
+        # Files are about to change; a new pass starts when the scan finishes
+        if self._precomputer is not None:
+            self._precomputer.stop()
+
         self.statusBar().showMessage("🔍 Scanning...")
         self.progress.setRange(0, 0)
         self.progress.setVisible(True)
@@ -487,10 +534,9 @@ class MainWindow(QMainWindow):
             sort_by=sort_by if sort_by else None,
             sort_desc=sort_desc,
         )
-        results = self.controller.search(query)
-        self.browser_view.set_search_results(results, root=self.active_workspace)
-        self.detail_panel.set_file(None)
-        self.selection_label.setText("0 items selected")
+        if self._show_search(query):
+            self.detail_panel.set_file(None)
+            self.selection_label.setText("0 items selected")
 
     def _on_search_text_changed(self, text: str) -> None:
         self._search_timer.stop()
@@ -513,10 +559,51 @@ class MainWindow(QMainWindow):
             sort_by=sort_by if sort_by else None,
             sort_desc=sort_desc,
         )
-        results = self.controller.search(query)
-        self.browser_view.set_search_results(results, root=self.active_workspace)
-        self.detail_panel.set_file(None)
-        self.selection_label.setText("0 items selected")
+        if self._show_search(query):
+            self.detail_panel.set_file(None)
+            self.selection_label.setText("0 items selected")
+
+    def _show_search(self, query: SearchQuery) -> bool:
+        """Show search results; further pages load as the list scrolls.
+
+        Re-running the query on screen only patches what changed. Returns True
+        when the browser was reset to a new result set.
+        """
+        if query == self._shown_query and self.active_workspace == self._shown_root:
+            self.browser_view.refresh()
+            return False
+        self._shown_query = query
+        self._shown_root = self.active_workspace
+        self.browser_view.set_search(
+            lambda offset, limit: self.controller.search(query, limit=limit, offset=offset),
+            root=self.active_workspace,
+            list_folders=lambda parent: self.controller.list_child_folders(query, parent),
+            fetch_folder_page=lambda folder, offset, limit: self.controller.search(
+                replace(query, folder=folder), limit=limit, offset=offset
+            ),
+        )
+        return True
+
+    def _patch_files(self, file_ids: Iterable[int]) -> None:
+        """Update the given files in the browser in place after they changed."""
+        if self._shown_query is None:
+            return
+        ids = set(file_ids)
+        if not ids:
+            return
+        matched = self.controller.match_files(self._shown_query, ids)
+        removed = ids - {result.file_id for result in matched}
+        self.browser_view.update_files(matched, removed)
+
+    def _on_watch_event(self, file_id: int) -> None:
+        self._watched_ids.add(file_id)
+        if not self._watch_timer.isActive():
+            self._watch_timer.start()
+
+    def _flush_watch_events(self) -> None:
+        file_ids = self._watched_ids
+        self._watched_ids = set()
+        self._patch_files(file_ids)
 
     def _selected_types(self) -> tuple[str, ...]:
         value = self._type_filter_value
@@ -528,26 +615,37 @@ class MainWindow(QMainWindow):
         return self._sort_filter_value
 
     def _on_tag_filter_clicked(self) -> None:
-        tag_names = self.tag_panel.selected_tag_names()
-        if not tag_names:
-            return
+        expression = self.tag_panel.tag_expression()
+        tag_names: list[str] = []
+        tag_expr = None
+        if expression:
+            try:
+                tag_expr = parse_tag_expression(expression)
+            except TagExpressionError as exc:
+                self.statusBar().showMessage(f"⚠ Invalid tag expression: {exc}")
+                return
+        else:
+            tag_names = self.tag_panel.selected_tag_names()
+            if not tag_names:
+                return
         types = self._selected_types()
         sort_by, sort_desc = self._selected_sort()
         match_all = self.tag_panel.match_all_tags()
         query = SearchQuery(
             tags=tuple(tag_names),
             match_all_tags=match_all,
+            tag_expr=tag_expr,
             root=str(self.active_workspace) if self.active_workspace else None,
             types=types,
             sort_by=sort_by if sort_by else None,
             sort_desc=sort_desc,
         )
-        results = self.controller.search(query)
-        self.browser_view.set_search_results(results, root=self.active_workspace)
-        self.detail_panel.set_file(None)
+        if self._show_search(query):
+            self.detail_panel.set_file(None)
 
     def _on_clear_filter(self) -> None:
         self.search_input.clear()
+        self.tag_panel.clear_expression()
         self._type_filter_value = ""
         self._sort_filter_value = ("name", False)
         self._view_mode_value = "list"
@@ -559,21 +657,71 @@ class MainWindow(QMainWindow):
 
     def _on_apply_tags(self) -> None:
         file_ids = self.browser_view.selected_file_ids()
-        if not file_ids:
-            return
         tag_ids = self.tag_panel.selected_tag_ids()
-        for file_id in file_ids:
-            self.controller.attach_tags(file_id, tag_ids)
-        self._on_file_selected(file_ids[0])
+        if not file_ids or not tag_ids:
+            return
+        self._start_tag_job("attach", file_ids, tag_ids)
 
     def _on_remove_tags(self) -> None:
         file_ids = self.browser_view.selected_file_ids()
-        if not file_ids:
-            return
         tag_ids = self.tag_panel.selected_tag_ids()
-        for file_id in file_ids:
-            self.controller.remove_tags(file_id, tag_ids)
-        self._on_file_selected(file_ids[0])
+        if not file_ids or not tag_ids:
+            return
+        self._start_tag_job("remove", file_ids, tag_ids)
+
+    def _start_tag_job(self, mode: str, file_ids: list[int], tag_ids: list[int]) -> None:
+        """Run a bulk tag change on a worker thread with progress."""
+        if self._tag_thread is not None:
+            try:
+                if self._tag_thread.isRunning():
+                    self.statusBar().showMessage("⏳ A tagging job is already running")
+                    return
+            except RuntimeError:
+                self._tag_thread = None
+                self._tag_worker = None
+
+        self.statusBar().showMessage(f"🏷️ Tagging {len(file_ids)} files...")
+        self.progress.setRange(0, len(file_ids))
+        self.progress.setValue(0)
+        self.progress.setVisible(True)
+
+        tag_thread = QThread(self)
+        tag_worker = TagWorker(self.controller, mode, file_ids, tag_ids)
+        tag_worker.moveToThread(tag_thread)
+
+        tag_thread.started.connect(tag_worker.run)
+        tag_worker.progress.connect(self._on_tag_job_progress)
+        tag_worker.finished.connect(self._on_tag_job_finished)
+        tag_worker.failed.connect(self._on_tag_job_failed)
+
+        tag_worker.finished.connect(tag_thread.quit)
+        tag_worker.failed.connect(tag_thread.quit)
+        tag_worker.finished.connect(tag_worker.deleteLater)
+        tag_worker.failed.connect(tag_worker.deleteLater)
+        tag_thread.finished.connect(tag_thread.deleteLater)
+
+        self._tag_thread = tag_thread
+        self._tag_worker = tag_worker
+        self._tag_job_file_ids = list(file_ids)
+        tag_thread.start()
+
+    def _on_tag_job_progress(self, done: int, total: int) -> None:
+        self.progress.setRange(0, total)
+        self.progress.setValue(done)
+        self.statusBar().showMessage(f"🏷️ Tagging... {done}/{total} files")
+
+    def _on_tag_job_finished(self, count: int) -> None:
+        self.progress.setVisible(False)
+        self.statusBar().showMessage(f"✓ Updated tags on {count} files")
+        self._load_tags()
+        # Files may have entered or left a tag filter
+        self._patch_files(self._tag_job_file_ids)
+        if self.browser_view.selected_file_id is not None:
+            self._on_file_selected(self.browser_view.selected_file_id)
+
+    def _on_tag_job_failed(self, message: str) -> None:
+        self.progress.setVisible(False)
+        QMessageBox.critical(self, "Tagging failed", message)
 
     def _on_detail_tag_removed(self, file_id: int, tag_name: str) -> None:
         """Handle tag removal from detail panel."""
@@ -586,6 +734,8 @@ class MainWindow(QMainWindow):
                 break
         if tag_id is not None:
             self.controller.remove_tags(file_id, [tag_id])
+            self._load_tags()
+            self._patch_files([file_id])
             # Refresh the detail panel
             self._on_file_selected(file_id)
 
@@ -601,7 +751,8 @@ class MainWindow(QMainWindow):
         if confirm != QMessageBox.Yes:
             return
         self.controller.delete_files(file_ids)
-        self._load_initial_files()
+        self.browser_view.update_files([], file_ids)
+        self._load_tags()
         self.detail_panel.set_file(None)
         self.selection_label.setText("0 items selected")
 
@@ -610,10 +761,9 @@ class MainWindow(QMainWindow):
         if not selected:
             return
         self.active_workspace = Path(selected)
-        self.config = AppConfig(
-            data_dir=self.config.data_dir,
+        self.config = replace(
+            self.config,
             db_path=workspace_db_path(self.config.data_dir, self.active_workspace),
-            thumbs_dir=self.config.thumbs_dir,
             default_workspace=self.active_workspace,
         )
         from ..db.session import init_db
@@ -664,7 +814,7 @@ class MainWindow(QMainWindow):
         moved, errors = self.controller.move_files(
             file_ids, Path(destination), self.active_workspace
         )
-        self._load_initial_files()
+        self._patch_files(file_ids)
         self.detail_panel.set_file(None)
         self.selection_label.setText("0 items selected")
         if errors:
@@ -743,11 +893,28 @@ class MainWindow(QMainWindow):
         self.progress.setVisible(False)
         self.statusBar().showMessage(f"✓ Scan complete: {count} files")
         self._load_initial_files()
-        self.detail_panel.set_file(None)
+        self._load_tags()
+        if self.browser_view.selected_file_id is not None:
+            self._on_file_selected(self.browser_view.selected_file_id)
+        else:
+            self.detail_panel.set_file(None)
         self._restart_watch()
+        self._start_precompute(restart=True)
 
     def closeEvent(self, event) -> None:
         self._watch_service.stop()
+        if self._precomputer is not None:
+            # Writes the resume cursor
+            self._precomputer.stop()
+        from ..db.session import save_tag_index
+        from ..services.thumbnail_manifest import close_thumbnail_manifests
+        from ..services.thumbnail_store import close_thumbnail_stores
+        from ..services.thumbnail_worker import close_thumbnail_renderers
+
+        save_tag_index()
+        close_thumbnail_renderers()
+        close_thumbnail_stores()
+        close_thumbnail_manifests()
         super().closeEvent(event)
 
     def _on_scan_failed(self, message: str) -> None:
@@ -759,10 +926,11 @@ class MainWindow(QMainWindow):
         if not self.active_workspace:
             return
         self._watch_service.stop()
+        self._watch_bridge.controller = self.controller
         self._watch_service.start(
             self.active_workspace,
-            on_change=self.controller.handle_file_changed,
-            on_delete=self.controller.handle_file_deleted,
+            on_change=self._watch_bridge.on_change,
+            on_delete=self._watch_bridge.on_delete,
         )
 
     def _set_view_mode(self, mode: str) -> None:
@@ -816,10 +984,65 @@ class MainWindow(QMainWindow):
         """Update thumbnail cache statistics"""
         thumb_service = self.browser_view._thumb_service
         stats = thumb_service.cache_stats
+        disk_text = f"💾 Disk: {stats['disk_mb']} MB"
+        if stats["disk_budget_mb"]:
+            disk_text += f" / {stats['disk_budget_mb']:g} MB"
         self.cache_stats_label.setText(
             f"📷 Cache: {stats['cache_items']} items, {stats['cache_memory_mb']} MB"
+            f" (+{stats['encoded_memory_mb']} MB encoded)  {disk_text}"
+        )
+        self.cache_stats_label.setToolTip(
+            f"Memory hit rate: {stats['memory_hit_rate']:.0%}"
+            f" ({stats['memory_evictions']} evicted)\n"
+            f"Encoded thumbnails in memory: {stats['encoded_items']}"
+            f" (hit rate {stats['encoded_hit_rate']:.0%})\n"
+            f"Disk thumbnails: {stats['disk_items']}\n"
+            f"Disk hit rate: {stats['disk_hit_rate']:.0%}\n"
+            f"Eviction policy: {stats['eviction_policy'].upper()}\n"
+            f"Thumbnail queue: {stats['queue_depth']} queued, {stats['queue_running']} running"
+            f" ({stats['queue_deduped']} merged)\n"
+            f"First paint p95: {stats['first_paint_p95_ms']:g} ms"
         )
     
+    def _start_precompute(self, restart: bool) -> None:
+        """Generate thumbnails for the workspace in the background.
+
+        restart=True starts a new pass (after a scan); restart=False only
+        resumes an unfinished one (at startup).
+        """
+        if self._precomputer is None or self.active_workspace is None:
+            return
+        thumb_service = self.browser_view._thumb_service
+        sizes = [thumb_service.get_thumbnail_size(size) for size in THUMBNAIL_SIZES]
+        self._precomputer.start(sizes, restart)
+        if self._precompute_action.isChecked():
+            self._precomputer.pause()
+
+    def _on_pause_precompute(self, checked: bool) -> None:
+        if self._precomputer is None:
+            return
+        if checked:
+            self._precomputer.pause()
+        else:
+            self._precomputer.resume()
+        if self.precompute_label.isVisible():
+            self._update_precompute_label()
+
+    def _on_precompute_progress(self, done: int, total: int) -> None:
+        self._precompute_progress = (done, total)
+        self._update_precompute_label()
+
+    def _update_precompute_label(self) -> None:
+        done, total = self._precompute_progress
+        text = f"🖼️ Thumbnails: {done}/{total}"
+        if self._precompute_action.isChecked():
+            text += " (paused)"
+        self.precompute_label.setText(text)
+        self.precompute_label.setVisible(True)
+
+    def _on_precompute_finished(self) -> None:
+        self.precompute_label.setVisible(False)
+
     def _on_clean_thumbnail_cache(self) -> None:
         """Clean thumbnail cache"""
         from PySide6.QtWidgets import QMessageBox
@@ -834,6 +1057,27 @@ class MainWindow(QMainWindow):
         )
 
 
+class WatchBridge(QObject):
+    """Indexes watcher events on the watcher thread and reports them to the UI thread."""
+
+    file_changed = Signal(int)
+    file_deleted = Signal(int)
+
+    def __init__(self, controller: AppController) -> None:
+        super().__init__()
+        self.controller = controller
+
+    def on_change(self, path: Path) -> None:
+        file_id = self.controller.handle_file_changed(path)
+        if file_id is not None:
+            self.file_changed.emit(file_id)
+
+    def on_delete(self, path: Path) -> None:
+        file_id = self.controller.handle_file_deleted(path)
+        if file_id is not None:
+            self.file_deleted.emit(file_id)
+
+
 class ScanWorker(QObject):
     progress = Signal(int)
     finished = Signal(int)
@@ -853,3 +1097,33 @@ class ScanWorker(QObject):
             self.failed.emit(str(exc))
             return
         self.finished.emit(count)
+
+
+class TagWorker(QObject):
+    progress = Signal(int, int)
+    finished = Signal(int)
+    failed = Signal(str)
+
+    def __init__(
+        self, controller: AppController, mode: str, file_ids: list[int], tag_ids: list[int]
+    ) -> None:
+        super().__init__()
+        self.controller = controller
+        self.mode = mode
+        self.file_ids = file_ids
+        self.tag_ids = tag_ids
+
+    def run(self) -> None:
+        operations = {
+            "attach": self.controller.attach_tags_bulk,
+            "remove": self.controller.remove_tags_bulk,
+            "replace": self.controller.replace_tags_bulk,
+        }
+        try:
+            count = operations[self.mode](
+                self.file_ids, self.tag_ids, on_progress=self.progress.emit
+            )
+        except Exception as exc:
+            self.failed.emit(str(exc))
+            return
+        self.finished.emit(count)
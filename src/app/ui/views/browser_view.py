@@ -3,33 +3,61 @@ Modern file browser view with grid/list modes and improved visuals.
 """
 from __future__ import annotations
 
+from functools import partial
 import logging
+import os
 from pathlib import Path
+from typing import Callable, Iterable
 
-from PySide6.QtCore import Qt, Signal, QSize, QTimer, QEasingCurve, QPropertyAnimation, QPoint, Property
+from PySide6.QtCore import (
+    Qt, Signal, QSize, QTimer, QEasingCurve, QPropertyAnimation, QPoint, Property, QItemSelectionModel,
+    QModelIndex,
+)
 from PySide6.QtWidgets import (
     QAbstractItemView,
     QListView,
-    QListWidget,
-    QListWidgetItem,
     QSplitter,
     QStackedWidget,
-    QTreeWidget,
-    QTreeWidgetItem,
+    QTreeView,
     QVBoxLayout,
     QWidget,
     QMenu,
     QScrollBar,
 )
-from PySide6.QtGui import QIcon, QPixmap, QFont, QWheelEvent
+from PySide6.QtGui import QColor, QIcon, QImage, QPainter, QPixmap, QFont, QWheelEvent
 
 from ...core.search import SearchResult
 from ...db.models import File
-from ...services.thumbnail_service import ThumbnailService
+from ...services.thumbnail_service import (
+    ThumbnailLoader,
+    ThumbnailService,
+    ThumbnailSource,
+    thumbnail_kind,
+)
 from ...config import load_config
+from .file_list_model import (
+    PAGE_SIZE,
+    FetchPage,
+    FileColumns,
+    FileIdRole,
+    FileItemDelegate,
+    FileListModel,
+)
+from .folder_tree_model import FolderPathRole, FolderTreeModel, ListFolders, folders_from_paths
 
 logger = logging.getLogger(__name__)
 
+# fetch_folder_page(folder, offset, limit)
+FetchFolderPage = Callable[[str, int, int], list[SearchResult]]
+
+# Delay before requesting thumbnails for the visible range after scrolling
+VISIBLE_REQUEST_DELAY_MS = 30
+
+# Icon sizes of the grid and list modes, also used to precompute thumbnails
+GRID_ICON_SIZE = (100, 100)
+LIST_ICON_SIZE = (20, 20)
+THUMBNAIL_SIZES = (GRID_ICON_SIZE, LIST_ICON_SIZE)
+
 
 class SmoothScrollBar(QScrollBar):
     """
@@ -112,7 +140,7 @@ class FileBrowserView(QWidget):
     Features:
     - Smooth list/grid view switching
     - Folder tree navigation
-    - Custom file item rendering
+    - Virtualized file lists (model/view, rows paged in on scroll)
     - Context menu actions
     """
     
@@ -129,57 +157,76 @@ class FileBrowserView(QWidget):
         self.selected_file_id: int | None = None
         self._layout_mode = "all"
         self._view_mode = "list"
-        self._items: list[dict] = []
+        self._items = FileColumns()
         self._root: Path | None = None
-        self._folder_map: dict[str, list[dict]] = {}
+        # Folder layout data sources; without them folders are derived from the rows in memory
+        self._list_folders: ListFolders | None = None
+        self._fetch_folder_page: FetchFolderPage | None = None
+        # folder path -> rows of self._items in that folder (in-memory folder layout only)
+        self._folder_map: dict[str, list[int]] = {}
+        self._folder_tree_stale = True
         self._current_folder: str | None = None
         config = load_config()
-        self._thumb_service = ThumbnailService(config.thumbs_dir)
+        self._thumb_service = ThumbnailService(
+            config.thumbs_dir,
+            store_kind=config.thumb_store,
+            disk_budget_mb=config.thumb_cache_mb,
+            eviction_policy=config.thumb_eviction,
+            max_encoded_cache_mb=config.thumb_encoded_cache_mb,
+            memory_policy=config.thumb_memory_policy,
+            trace_path=config.thumb_trace,
+            render_workers=config.thumb_workers,
+        )
+        # Thumbnails are produced on the service's worker pool and delivered by signal
+        self._thumb_loader = ThumbnailLoader(self._thumb_service, self)
+        self._thumb_loader.thumbnail_ready.connect(self._on_thumbnail_ready)
+        # cache key -> (model, file id) waiting for that thumbnail
+        self._thumb_requests: dict[str, list[tuple[FileListModel, int]]] = {}
+        # Rows painted with a placeholder, requested once they are still visible
+        self._wanted: dict[tuple[FileListModel, int], tuple[QListView, dict]] = {}
+        self._placeholder_icons: dict[tuple[str, int, int], QIcon] = {}
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.timeout.connect(self._request_visible_thumbnails)
         self._build_ui()
 
     def _build_ui(self) -> None:
         """Build the modern browser UI."""
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
+        self._delegate = FileItemDelegate(self)
         
-        # List widget for all files view
-        self.list_widget = QListWidget()
-        self.list_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.list_widget.itemSelectionChanged.connect(self._on_selection_changed)
-        self.list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.list_widget.customContextMenuRequested.connect(self._on_context_menu)
-        self._style_list_widget(self.list_widget)
-        # Replace scrollbar with smooth scrolling version
-        self.list_widget.setVerticalScrollBar(SmoothScrollBar(self.list_widget))
+        # List view for all files view
+        self.list_model = FileListModel(self)
+        self.list_view = self._create_file_view(self.list_model)
+        self.list_view.selectionModel().selectionChanged.connect(self._on_selection_changed)
 
         # Folder view widgets
-        self.folder_list_widget = QListWidget()
-        self.folder_list_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.folder_list_widget.itemSelectionChanged.connect(
+        self.folder_model = FileListModel(self)
+        self.folder_list_view = self._create_file_view(self.folder_model)
+        self.folder_list_view.selectionModel().selectionChanged.connect(
             self._on_folder_list_selection_changed
         )
-        self.folder_list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.folder_list_widget.customContextMenuRequested.connect(self._on_context_menu)
-        self._style_list_widget(self.folder_list_widget)
-        # Replace scrollbar with smooth scrolling version
-        self.folder_list_widget.setVerticalScrollBar(SmoothScrollBar(self.folder_list_widget))
 
-        # Tree widget for folder navigation
-        self.tree_widget = QTreeWidget()
-        self.tree_widget.setHeaderHidden(True)
-        self.tree_widget.itemSelectionChanged.connect(self._on_tree_selection_changed)
+        # Folder tree, populated as folders are expanded
+        self.folder_tree_model = FolderTreeModel(self)
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.folder_tree_model)
+        self.tree_view.setHeaderHidden(True)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.selectionModel().selectionChanged.connect(self._on_tree_selection_changed)
 
         # Folder splitter with tree and file list
         self.folder_splitter = QSplitter(Qt.Horizontal)
-        self.folder_splitter.addWidget(self.tree_widget)
-        self.folder_splitter.addWidget(self.folder_list_widget)
+        self.folder_splitter.addWidget(self.tree_view)
+        self.folder_splitter.addWidget(self.folder_list_view)
         self.folder_splitter.setStretchFactor(1, 1)
         self.folder_splitter.setSizes([200, 400])
         self.folder_splitter.setHandleWidth(4)
 
         # Stacked widget to switch between views
         self.stack = QStackedWidget()
-        self.stack.addWidget(self.list_widget)
+        self.stack.addWidget(self.list_view)
         self.stack.addWidget(self.folder_splitter)
 
         layout.addWidget(self.stack)
@@ -191,78 +238,138 @@ class FileBrowserView(QWidget):
         # 所有控件创建完成后，连接滚动预加载信号
         self._setup_scroll_preload()
 
-    def _style_list_widget(self, widget: QListWidget) -> None:
-        """List widget styling is now handled by application-wide theme."""
-        # Styles are applied via main window's theme system
-        pass
+    def _create_file_view(self, model: FileListModel) -> QListView:
+        """Create a virtualized list view over a file model."""
+        view = QListView()
+        view.setModel(model)
+        view.setItemDelegate(self._delegate)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        # Every row has the same size, so layout never measures individual rows
+        view.setUniformItemSizes(True)
+        view.setContextMenuPolicy(Qt.CustomContextMenu)
+        view.customContextMenuRequested.connect(self._on_context_menu)
+        # Replace scrollbar with smooth scrolling version
+        view.setVerticalScrollBar(SmoothScrollBar(view))
+        model.set_decoration_provider(
+            lambda row, view=view, model=model: self._decoration_for(view, model, row)
+        )
+        return view
 
     def set_files(self, files: list[File], root: Path | None = None) -> None:
         """Set the list of files to display."""
-        items = []
-        for file_row in files:
-            file_id = getattr(file_row, "id", None)
-            if file_id is None:
-                continue
-            items.append(
-                {
-                    "id": int(file_id),
-                    "name": str(file_row.name),
-                    "path": str(file_row.path),
-                    "type": str(file_row.type),
-                }
-            )
-        self._set_items(items, root)
+        self._set_items(FileColumns.from_files(files), root)
 
     def set_search_results(
         self, results: list[SearchResult], root: Path | None = None
     ) -> None:
         """Set search results to display."""
-        items = []
+        self._set_items(FileColumns.from_results(results), root)
+
+    def set_search(
+        self,
+        fetch_page: FetchPage,
+        root: Path | None = None,
+        list_folders: ListFolders | None = None,
+        fetch_folder_page: FetchFolderPage | None = None,
+    ) -> None:
+        """Show a search whose rows are paged in as the user scrolls.
+
+        Args:
+            fetch_page: called as fetch_page(offset, limit) for each page
+            root: workspace root for the folder layout
+            list_folders: child folders of a folder that contain matches; with
+                fetch_folder_page, lets the folder layout load from the database
+                instead of fetching every result
+            fetch_folder_page: called as fetch_folder_page(folder, offset, limit)
+                for the matches directly inside a folder
+        """
+        first_page = fetch_page(0, PAGE_SIZE)
+        columns = FileColumns.from_results(first_page)
+        self._set_items(
+            columns,
+            root,
+            fetch_page,
+            complete=len(first_page) < PAGE_SIZE,
+            list_folders=list_folders,
+            fetch_folder_page=fetch_folder_page,
+        )
+
+    def update_files(self, updated: list[SearchResult], removed: Iterable[int] = ()) -> None:
+        """Patch changed files into the views in place, keyed by file id.
+
+        Args:
+            updated: changed files that still match the current search; rows
+                are rewritten in place, files not shown yet are appended
+            removed: ids of files to drop (deleted or no longer matching)
+        """
+        removed = set(removed)
+        self.list_model.patch(updated, removed)
+        self._patch_folders(updated, removed)
+
+    def refresh(self) -> None:
+        """Re-query the rows loaded so far and patch the differences in place.
+
+        Unlike set_search(), this keeps scroll position, selection and
+        thumbnails; files new to the result set are appended.
+        """
+        results = self.list_model.refresh()
+        if self._list_folders is None:
+            self._patch_folders(results, ())
+            return
+        self.folder_model.refresh()
         for result in results:
-            items.append(
-                {
-                    "id": int(result.file_id),
-                    "name": str(result.name),
-                    "path": str(result.path),
-                    "type": str(result.type),
-                }
-            )
-        self._set_items(items, root)
+            self.folder_tree_model.add_folder(str(Path(result.path).parent))
+
+    def _patch_folders(self, updated: list[SearchResult], removed: set[int]) -> None:
+        if self._list_folders is None:
+            # Folder rows index into self._items; rebuild them on next use
+            self._folder_map = {}
+            self._folder_tree_stale = True
+            if self._layout_mode == "folders":
+                self._render_tree()
+            return
+        inside: list[SearchResult] = []
+        outside = set(removed)
+        for result in updated:
+            folder = str(Path(result.path).parent)
+            if folder == self._current_folder:
+                inside.append(result)
+            else:
+                outside.add(int(result.file_id))
+            self.folder_tree_model.add_folder(folder)
+        self.folder_model.patch(inside, outside)
 
     def _on_selection_changed(self) -> None:
         """Handle selection change in list view."""
-        items = self.list_widget.selectedItems()
-        if not items:
-            self.selected_file_id = None
-            self.selection_changed.emit(0)
-            return
-        file_id = items[0].data(Qt.UserRole)
-        if isinstance(file_id, int):
-            self.selected_file_id = file_id
-            self.file_selected.emit(file_id)
-        self.selection_changed.emit(len(items))
+        self._emit_selection(self.list_view)
 
     def _on_folder_list_selection_changed(self) -> None:
         """Handle selection change in folder list view."""
-        items = self.folder_list_widget.selectedItems()
-        if not items:
+        self._emit_selection(self.folder_list_view)
+
+    def _emit_selection(self, view: QListView) -> None:
+        selection = view.selectionModel()
+        indexes = selection.selectedIndexes()
+        if not indexes:
             self.selected_file_id = None
             self.selection_changed.emit(0)
             return
-        file_id = items[0].data(Qt.UserRole)
+        current = view.currentIndex()
+        index = current if current.isValid() and selection.isSelected(current) else indexes[0]
+        file_id = index.data(FileIdRole)
         if isinstance(file_id, int):
             self.selected_file_id = file_id
             self.file_selected.emit(file_id)
-        self.selection_changed.emit(len(items))
+        self.selection_changed.emit(len(indexes))
 
     def _on_tree_selection_changed(self) -> None:
         """Handle folder tree selection change."""
-        items = self.tree_widget.selectedItems()
-        if not items:
+        indexes = self.tree_view.selectionModel().selectedIndexes()
+        if not indexes:
             self.selected_file_id = None
             self.selection_changed.emit(0)
             return
-        folder_path = items[0].data(0, Qt.UserRole)
+        folder_path = indexes[0].data(FolderPathRole)
         if isinstance(folder_path, str):
             self._current_folder = folder_path
             self.selected_file_id = None
@@ -271,48 +378,41 @@ class FileBrowserView(QWidget):
 
     def selected_file_ids(self) -> list[int]:
         """Get IDs of selected files."""
-        ids: list[int] = []
         if self._layout_mode == "folders":
-            for item in self.folder_list_widget.selectedItems():
-                file_id = item.data(Qt.UserRole)
-                if isinstance(file_id, int):
-                    ids.append(file_id)
-            return ids
-        for item in self.list_widget.selectedItems():
-            file_id = item.data(Qt.UserRole)
-            if isinstance(file_id, int):
-                ids.append(file_id)
-        return ids
+            view, model = self.folder_list_view, self.folder_model
+        else:
+            view, model = self.list_view, self.list_model
+        rows = sorted(index.row() for index in view.selectionModel().selectedIndexes())
+        return [model.file_id(row) for row in rows]
 
     def set_view_mode(self, mode: str) -> None:
         """Set the view mode (list or grid)."""
         self._view_mode = mode
+        self._delegate.grid_mode = mode == "grid"
         if mode == "grid":
             # Grid view settings
-            for widget in [self.list_widget, self.folder_list_widget]:
-                widget.setViewMode(QListView.IconMode)
-                widget.setResizeMode(QListView.Adjust)
-                widget.setIconSize(QSize(100, 100))
-                widget.setGridSize(QSize(140, 160))
-                widget.setSpacing(8)
-                widget.setWordWrap(True)
-                widget.setTextElideMode(Qt.ElideMiddle)
-                widget.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
-                # Align items to the bottom for consistent layout
-                widget.setUniformItemSizes(True)
-                scroll = widget.verticalScrollBar()
-                icon_size = widget.iconSize()
+            for view in [self.list_view, self.folder_list_view]:
+                view.setViewMode(QListView.IconMode)
+                view.setResizeMode(QListView.Adjust)
+                view.setIconSize(QSize(*GRID_ICON_SIZE))
+                view.setGridSize(QSize(140, 160))
+                view.setSpacing(8)
+                view.setWordWrap(True)
+                view.setTextElideMode(Qt.ElideMiddle)
+                view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+                scroll = view.verticalScrollBar()
+                icon_size = view.iconSize()
                 scroll.setSingleStep(max(36, icon_size.height() // 2))
                 scroll.setPageStep(max(240, icon_size.height() * 3))
         else:
             # List view settings
-            for widget in [self.list_widget, self.folder_list_widget]:
-                widget.setViewMode(QListView.ListMode)
-                widget.setIconSize(QSize(20, 20))
-                widget.setGridSize(QSize())
-                widget.setSpacing(2)
-                widget.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
-                scroll = widget.verticalScrollBar()
+            for view in [self.list_view, self.folder_list_view]:
+                view.setViewMode(QListView.ListMode)
+                view.setIconSize(QSize(*LIST_ICON_SIZE))
+                view.setGridSize(QSize())
+                view.setSpacing(2)
+                view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+                scroll = view.verticalScrollBar()
                 scroll.setSingleStep(20)
                 scroll.setPageStep(120)
         self._render()
@@ -323,16 +423,35 @@ class FileBrowserView(QWidget):
         if mode == "folders":
             self.stack.setCurrentWidget(self.folder_splitter)
         else:
-            self.stack.setCurrentWidget(self.list_widget)
+            self.stack.setCurrentWidget(self.list_view)
         self._render()
 
-    def _set_items(self, items: list[dict], root: Path | None) -> None:
-        """Set items and rebuild folder map."""
+    def _set_items(
+        self,
+        items: FileColumns,
+        root: Path | None,
+        fetch_page: FetchPage | None = None,
+        complete: bool = False,
+        list_folders: ListFolders | None = None,
+        fetch_folder_page: FetchFolderPage | None = None,
+    ) -> None:
+        """Set items; the folder tree is rebuilt when the folder layout needs it."""
+        # Results for the previous item set are no longer wanted
+        self._thumb_loader.cancel_pending()
+        self._thumb_requests.clear()
+        self._wanted.clear()
         self._items = items
         self._root = root
-        self._folder_map = self._build_folder_map(items, root)
+        self.list_model.set_columns(items, fetch_page, complete)
+        if list_folders is not None and fetch_folder_page is not None:
+            self._list_folders = list_folders
+            self._fetch_folder_page = fetch_folder_page
+        else:
+            self._list_folders = None
+            self._fetch_folder_page = None
+        self._folder_map = {}
+        self._folder_tree_stale = True
         if root is not None:
-            self._folder_map.setdefault(str(root), [])
             self._current_folder = str(root)
         else:
             self._current_folder = None
@@ -351,196 +470,135 @@ class FileBrowserView(QWidget):
         """Render the list view."""
         if self._layout_mode != "all":
             return
-        self._render_list_widget(self.list_widget, self._items)
+        self._refresh_view(self.list_view)
 
     def _render_tree(self) -> None:
-        """Render the folder tree."""
-        self.tree_widget.clear()
-        if not self._folder_map:
+        """Render the folder tree (rebuilt only when the items changed)."""
+        if not self._folder_tree_stale:
+            self._refresh_view(self.folder_list_view)
             return
-
-        root_item = None
-        if self._root is not None:
-            root_item = QTreeWidgetItem([f"📁 {self._root.name}"])
-            root_item.setData(0, Qt.UserRole, str(self._root))
-            root_item.setData(0, Qt.UserRole + 1, True)
-            root_item.setFont(0, self._bold_font())
-            self.tree_widget.addTopLevelItem(root_item)
-
-        nodes: dict[str, QTreeWidgetItem] = {}
-        if root_item is not None and self._root is not None:
-            nodes[str(self._root)] = root_item
-        folder_role = Qt.UserRole + 1
-
-        for folder_path in sorted(self._folder_map.keys()):
-            folder = Path(folder_path)
-            if self._root is not None:
-                try:
-                    parts = list(folder.relative_to(self._root).parts)
-                    current = root_item
-                    current_path = self._root
-                except ValueError:
-                    parts = list(folder.parts)
-                    current = None
-                    current_path = None
-            else:
-                parts = list(folder.parts)
-                current = None
-                current_path = None
-
-            for part in parts:
-                if current_path is None:
-                    current_path = Path(part)
-                else:
-                    current_path = current_path / part
-                key = str(current_path)
-                node = nodes.get(key)
-                if node is None:
-                    node = QTreeWidgetItem([f"📁 {part}"])
-                    node.setData(0, Qt.UserRole, key)
-                    node.setData(0, folder_role, True)
-                    if current is None:
-                        self.tree_widget.addTopLevelItem(node)
-                    else:
-                        current.addChild(node)
-                    nodes[key] = node
-                current = node
-        
-        self._reorder_tree_items(folder_role)
-        self.tree_widget.expandToDepth(1)
+        self._folder_tree_stale = False
+        root = str(self._root) if self._root is not None else None
+        list_folders = self._list_folders
+        if list_folders is None:
+            # Plain item lists: derive the folders from the rows in memory
+            self.list_model.fetch_all()
+            self._folder_map = self._build_folder_map(self._items)
+            list_folders = folders_from_paths(self._folder_map)
+            if root is None and self._folder_map:
+                root = os.path.commonpath(list(self._folder_map))
+        self.folder_tree_model.set_root(root, list_folders)
+        if root is None:
+            self.folder_model.set_columns(FileColumns())
+            return
+        self.tree_view.expand(self.folder_tree_model.index(0, 0))
         self._select_initial_folder()
 
-    def _bold_font(self):
-        """Get a bold font."""
-        font = QFont()
-        font.setBold(True)
-        return font
-
-    def _reorder_tree_items(self, folder_role: int) -> None:
-        """Reorder tree items alphabetically."""
-        def sort_key(node: QTreeWidgetItem) -> tuple[int, str]:
-            is_folder = bool(node.data(0, folder_role))
-            return (0 if is_folder else 1, node.text(0).lower())
-
-        def reorder_node(node: QTreeWidgetItem) -> None:
-            children: list[QTreeWidgetItem] = []
-            while node.childCount() > 0:
-                child = node.takeChild(0)
-                if child is not None:
-                    children.append(child)
-            children.sort(key=sort_key)
-            for child in children:
-                node.addChild(child)
-                reorder_node(child)
-
-        top_level: list[QTreeWidgetItem] = []
-        while self.tree_widget.topLevelItemCount() > 0:
-            item = self.tree_widget.takeTopLevelItem(0)
-            if item is not None:
-                top_level.append(item)
-        top_level.sort(key=sort_key)
-        for item in top_level:
-            self.tree_widget.addTopLevelItem(item)
-            reorder_node(item)
-
     def _select_initial_folder(self) -> None:
         """Select the initial folder in tree."""
+        index = QModelIndex()
         if self._current_folder is not None:
-            item = self._find_folder_item(self._current_folder)
-            if item is not None:
-                self.tree_widget.setCurrentItem(item)
-                return
-        if self.tree_widget.topLevelItemCount() > 0:
-            self.tree_widget.setCurrentItem(self.tree_widget.topLevelItem(0))
-
-    def _find_folder_item(self, folder_path: str) -> QTreeWidgetItem | None:
-        """Find a folder item by path."""
-        def search(node: QTreeWidgetItem) -> QTreeWidgetItem | None:
-            if node.data(0, Qt.UserRole) == folder_path:
-                return node
-            for index in range(node.childCount()):
-                found = search(node.child(index))
-                if found is not None:
-                    return found
-            return None
-
-        for index in range(self.tree_widget.topLevelItemCount()):
-            found = search(self.tree_widget.topLevelItem(index))
-            if found is not None:
-                return found
-        return None
+            index = self.folder_tree_model.index_for_path(self._current_folder)
+        if not index.isValid():
+            index = self.folder_tree_model.index(0, 0)
+        if index.isValid():
+            self.tree_view.setCurrentIndex(index)
 
     def _render_folder_list(self) -> None:
         """Render files in current folder."""
-        if self._current_folder is None:
-            self.folder_list_widget.clear()
-            return
-        items = self._folder_map.get(self._current_folder, [])
-        self._render_list_widget(self.folder_list_widget, items)
+        folder = self._current_folder
+        if folder is not None and self._fetch_folder_page is not None:
+            fetch_page = partial(self._fetch_folder_page, folder)
+            first_page = fetch_page(0, PAGE_SIZE)
+            self.folder_model.set_columns(
+                FileColumns.from_results(first_page), fetch_page, len(first_page) < PAGE_SIZE
+            )
+        else:
+            rows = self._folder_map.get(folder, []) if folder is not None else []
+            self.folder_model.set_columns(FileColumns.from_items(self._items[row] for row in rows))
+        self._refresh_view(self.folder_list_view)
 
-    def _render_list_widget(self, widget: QListWidget, items: list[dict]) -> None:
-        """Render items in a list widget."""
-        widget.clear()
-        icon_size = widget.iconSize()
-        
-        for item in items:
-            display_name = item["name"]
-            if self._view_mode == "grid" and len(display_name) > 20:
-                display_name = display_name[:17] + "..."
-                
-            list_item = QListWidgetItem(display_name)
-            list_item.setData(Qt.UserRole, item["id"])
-            list_item.setToolTip(item["path"])
-            
-            if self._view_mode == "grid":
-                icon = self._icon_for_item(item)
-                if icon is not None:
-                    list_item.setIcon(icon)
-                # Center text in grid mode
-                list_item.setTextAlignment(Qt.AlignHCenter | Qt.AlignBottom)
-            else:
-                # Add file type icon for list mode
-                file_type = item.get("type", "")
-                icon = self._get_type_icon(file_type)
-                if icon:
-                    list_item.setIcon(icon)
-                    
-            widget.addItem(list_item)
-        
-        # 使用可视区域预加载替代全量预加载
-        if self._view_mode == "grid" and items:
-            self._trigger_preload(widget, items)
+    def _refresh_view(self, view: QListView) -> None:
+        """Repaint a view after its rows or display mode changed.
+
+        Rows are painted on demand by the delegate; grid mode asks for the
+        thumbnails of painted rows and preheats the surrounding range.
+        """
+        view.viewport().update()
+        model = view.model()
+        if self._view_mode == "grid" and isinstance(model, FileListModel) and model.rowCount():
+            self._trigger_preload(view, model.columns)
 
     def _setup_scroll_preload(self) -> None:
         """设置滚动预加载 - 监听滚动信号触发可视区域缩略图加载"""
         # 连接滚动条的 valueChanged 信号
-        self.list_widget.verticalScrollBar().valueChanged.connect(
-            lambda: self._on_scroll_changed(self.list_widget)
+        self.list_view.verticalScrollBar().valueChanged.connect(
+            lambda: self._on_scroll_changed(self.list_view)
         )
-        self.folder_list_widget.verticalScrollBar().valueChanged.connect(
-            lambda: self._on_scroll_changed(self.folder_list_widget)
+        self.folder_list_view.verticalScrollBar().valueChanged.connect(
+            lambda: self._on_scroll_changed(self.folder_list_view)
         )
 
-    def _on_scroll_changed(self, widget: QListWidget) -> None:
+    def _on_scroll_changed(self, view: QListView) -> None:
         """滚动位置变化时触发预加载"""
         if self._view_mode != "grid":
             return
-        
-        # 确定当前显示的数据
-        items: list[dict] = []
-        if widget == self.list_widget:
-            items = self._items
-        elif widget == self.folder_list_widget and self._current_folder:
-            items = self._folder_map.get(self._current_folder, [])
-        
-        if items:
-            self._trigger_preload(widget, items)
+        model = view.model()
+        if isinstance(model, FileListModel) and model.rowCount():
+            self._trigger_preload(view, model.columns)
 
-    def _trigger_preload(self, widget: QListWidget, items: list[dict]) -> None:
+    def _decoration_for(self, view: QListView, model: FileListModel, row: int) -> QIcon | None:
+        """Decoration for a painted row: the cached thumbnail, else a placeholder."""
+        if self._view_mode != "grid":
+            return self._get_type_icon(model.columns.types[row])
+        item = model.item(row)
+        icon = self._icon_for_item(view, item)
+        if icon is not None:
+            return icon
+        # Defer the request so rows only flashed past while scrolling are skipped
+        self._wanted[(model, item["id"])] = (view, item)
+        if not self._visible_timer.isActive():
+            self._visible_timer.start(VISIBLE_REQUEST_DELAY_MS)
+        return self._placeholder_icon(item["type"], view.iconSize())
+
+    def _request_visible_thumbnails(self) -> None:
+        """Queue thumbnails for placeholder rows that are still on screen."""
+        wanted = self._wanted
+        self._wanted = {}
+        if self._view_mode != "grid":
+            return
+        for (model, file_id), (view, item) in wanted.items():
+            index = model.index_for_id(file_id)
+            if not index.isValid() or not view.isVisible():
+                continue
+            if not view.visualRect(index).intersects(view.viewport().rect()):
+                continue
+            icon_size = view.iconSize()
+            cache_key = self._thumb_loader.request(
+                ThumbnailSource.from_item(item),
+                thumbnail_kind(item.get("type")),
+                (icon_size.width(), icon_size.height()),
+            )
+            if cache_key is None:
+                continue
+            targets = self._thumb_requests.setdefault(cache_key, [])
+            if (model, file_id) not in targets:
+                targets.append((model, file_id))
+
+    def _on_thumbnail_ready(self, cache_key: str, image: QImage) -> None:
+        """Put a loaded thumbnail into the memory cache and repaint the waiting rows."""
+        targets = self._thumb_requests.pop(cache_key, [])
+        if image.isNull():
+            return
+        self._thumb_service.cache_pixmap(cache_key, QPixmap.fromImage(image))
+        for model, file_id in targets:
+            model.refresh_decoration(file_id)
+
+    def _trigger_preload(self, view: QListView, items: FileColumns) -> None:
         """触发可视区域缩略图预加载"""
-        icon_size = widget.iconSize()
+        icon_size = view.iconSize()
         self._thumb_service.preheat_visible_thumbnails(
-            widget,
+            view,
             items,
             (icon_size.width(), icon_size.height()),
         )
@@ -559,16 +617,16 @@ class FileBrowserView(QWidget):
 
     def _on_context_menu(self, position) -> None:
         """Show context menu."""
-        widget = self.sender()
-        if not isinstance(widget, QListWidget):
+        view = self.sender()
+        if not isinstance(view, QListView):
             return
-        item = widget.itemAt(position)
-        if item is None:
+        index = view.indexAt(position)
+        if not index.isValid():
             return
-        if not item.isSelected():
-            widget.clearSelection()
-            item.setSelected(True)
-        widget.setCurrentItem(item)
+        if not view.selectionModel().isSelected(index):
+            view.setCurrentIndex(index)
+        else:
+            view.selectionModel().setCurrentIndex(index, QItemSelectionModel.NoUpdate)
         
         menu = QMenu(self)
         # Menu styles are now loaded from QSS file via application-wide stylesheet
@@ -581,7 +639,7 @@ class FileBrowserView(QWidget):
         menu.addSeparator()
         delete_action = menu.addAction("🗑️ Delete")
         
-        action = menu.exec(widget.mapToGlobal(position))
+        action = menu.exec(view.mapToGlobal(position))
         if action == open_file:
             self.open_file_requested.emit()
         elif action == open_folder:
@@ -593,64 +651,49 @@ class FileBrowserView(QWidget):
         elif action == delete_action:
             self.delete_requested.emit()
 
-    def _build_folder_map(self, items: list[dict], root: Path | None) -> dict[str, list[dict]]:
-        """Build a map of folder paths to items."""
-        folder_map: dict[str, list[dict]] = {}
-        for item in items:
-            path = Path(item.get("path", ""))
+    def _build_folder_map(self, items: FileColumns) -> dict[str, list[int]]:
+        """Build a map of folder paths to item rows."""
+        folder_map: dict[str, list[int]] = {}
+        for row, path_text in enumerate(items.paths):
+            path = Path(path_text)
             if not path.parent:
                 continue
-            folder_key = str(path.parent)
-            folder_map.setdefault(folder_key, []).append(item)
+            folder_map.setdefault(str(path.parent), []).append(row)
         return folder_map
 
-    def _icon_for_item(self, item: dict) -> QIcon | None:
-        """Get icon for a file item."""
-        file_type = item.get("type")
-        path = Path(item.get("path", ""))
-        if not path.exists():
-            return None
-        if self._layout_mode == "folders":
-            icon_size = self.folder_list_widget.iconSize()
-        else:
-            icon_size = self.list_widget.iconSize()
-
-        if file_type == "image":
-            pixmap = self._thumb_service.generate_image_thumbnail(
-                path, (icon_size.width(), icon_size.height())
-            )
-        elif file_type == "video":
-            pixmap = self._thumb_service.generate_video_thumbnail(
-                path, (icon_size.width(), icon_size.height())
-            )
-        else:
-            pixmap = self._thumb_service.generate_shell_thumbnail(
-                path, (icon_size.width(), icon_size.height())
-            )
-            if pixmap is None or pixmap.isNull():
-                return None
-
-        if pixmap is None or pixmap.isNull():
+    def _icon_for_item(self, view: QListView, item: dict) -> QIcon | None:
+        """Get the thumbnail icon for a file item if it is already in memory."""
+        icon_size = view.iconSize()
+        pixmap = self._thumb_service.cached_thumbnail(
+            ThumbnailSource.from_item(item),
+            thumbnail_kind(item.get("type")),
+            (icon_size.width(), icon_size.height()),
+        )
+        if pixmap is None:
             return None
-        
-        # Create a fixed-size pixmap with transparent background
+        # The delegate scales and bottom-aligns the pixmap when painting
+        return QIcon(pixmap)
+
+    def _placeholder_icon(self, file_type: str, icon_size: QSize) -> QIcon:
+        """Placeholder shown until the real thumbnail arrives (cached per type and size)."""
+        key = (file_type, icon_size.width(), icon_size.height())
+        icon = self._placeholder_icons.get(key)
+        if icon is not None:
+            return icon
+        glyphs = {"image": "🖼️", "video": "🎬", "audio": "🎵", "doc": "📄"}
         target = QPixmap(icon_size)
         target.fill(Qt.transparent)
-        
-        # Scale the original pixmap to fit within the target while maintaining aspect ratio
-        scaled = pixmap.scaled(
-            icon_size,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation,
-        )
-        
-        # Paint the scaled pixmap at the bottom center of the target
-        from PySide6.QtGui import QPainter
         painter = QPainter(target)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform)
-        x = (target.width() - scaled.width()) // 2
-        y = target.height() - scaled.height()  # Align to bottom
-        painter.drawPixmap(x, y, scaled)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(128, 128, 128, 40))
+        painter.drawRoundedRect(target.rect().adjusted(4, 4, -4, -4), 8, 8)
+        font = QFont()
+        font.setPixelSize(max(12, icon_size.height() // 3))
+        painter.setFont(font)
+        painter.setPen(QColor(128, 128, 128))
+        painter.drawText(target.rect(), Qt.AlignCenter, glyphs.get(file_type, "📄"))
         painter.end()
-        
-        return QIcon(target)
+        icon = QIcon(target)
+        self._placeholder_icons[key] = icon
+        return icon
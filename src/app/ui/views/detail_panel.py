@@ -7,7 +7,7 @@ from pathlib import Path
 from datetime import datetime
 
 from PySide6.QtCore import Qt, QSize, QTimer, Signal
-from PySide6.QtGui import QPixmap, QFont, QColor, QPainter
+from PySide6.QtGui import QImage, QPixmap, QFont, QColor, QPainter
 from PySide6.QtWidgets import (
     QLabel, QSizePolicy, QVBoxLayout, QWidget,
     QHBoxLayout, QFrame, QScrollArea, QGridLayout
@@ -15,41 +15,89 @@ from PySide6.QtWidgets import (
 
 from ...config import load_config
 from ...db.models import File
-from ...services.thumbnail_service import ThumbnailService
+from ...services.thumbnail_service import (
+    ThumbnailLoader,
+    ThumbnailService,
+    ThumbnailSource,
+    thumbnail_kind,
+)
 from ..widgets.tag_chip import TagChip, TagChipContainer
+from .browser_view import THUMBNAIL_SIZES
+
+# Debounce for re-requesting the preview while the panel is being resized
+PREVIEW_RESIZE_DELAY_MS = 50
 
 
 class PreviewWidget(QWidget):
-    """Custom widget to display a centered pixmap."""
+    """Custom widget to display a centered pixmap.
+
+    Video frames set with `setFrames()` are scrubbed by hovering: the
+    horizontal mouse position picks the frame, leaving shows the poster again.
+    """
     
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self._pixmap: QPixmap | None = None
         self._text: str = "No preview"
+        self._frames: list[QPixmap] = []
+        self._frame_index: int | None = None
         self.setMinimumSize(200, 180)
         # Use Expanding policy for adaptive container
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMouseTracking(True)
         
-    def setPixmap(self, pixmap: QPixmap | None) -> None:
+    def setPixmap(self, pixmap: QPixmap | None, keep_frames: bool = False) -> None:
+        """Show `pixmap`; `keep_frames` swaps in a sharper poster without
+        dropping the scrub frames of the same video."""
         self._pixmap = pixmap
-        self.update()
+        if keep_frames:
+            self.update()
+        else:
+            self.setFrames([])
         
+    def pixmap(self) -> QPixmap | None:
+        return self._pixmap
+
     def setText(self, text: str) -> None:
         self._text = text
         self._pixmap = None
+        self.setFrames([])
+
+    def setFrames(self, frames: list[QPixmap]) -> None:
+        """Frames to scrub through on hover (cleared by setPixmap/setText)."""
+        self._frames = frames
+        self._frame_index = None
         self.update()
+
+    def mouseMoveEvent(self, event) -> None:
+        if self._frames:
+            x = min(max(event.position().x(), 0), self.width() - 1)
+            index = int(x * len(self._frames) / max(1, self.width()))
+            if index != self._frame_index:
+                self._frame_index = index
+                self.update()
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event) -> None:
+        if self._frame_index is not None:
+            self._frame_index = None
+            self.update()
+        super().leaveEvent(event)
         
     def paintEvent(self, event) -> None:
         painter = QPainter(self)
         painter.setRenderHint(QPainter.SmoothPixmapTransform)
         
-        if self._pixmap is not None and not self._pixmap.isNull():
+        pixmap = self._pixmap
+        if self._frame_index is not None:
+            pixmap = self._frames[self._frame_index]
+        if pixmap is not None and not pixmap.isNull():
             # Scale image proportionally to maximize display area
             available_width = self.width()
             available_height = self.height()
             
             # Calculate scaled dimensions maintaining aspect ratio
-            scaled = self._pixmap.scaled(
+            scaled = pixmap.scaled(
                 available_width,
                 available_height,
                 Qt.KeepAspectRatio,
@@ -59,6 +107,13 @@ class PreviewWidget(QWidget):
             x = (available_width - scaled.width()) // 2
             y = (available_height - scaled.height()) // 2
             painter.drawPixmap(x, y, scaled)
+            if self._frame_index is not None:
+                # Scrub position indicator
+                step = available_width / len(self._frames)
+                painter.fillRect(
+                    int(self._frame_index * step), available_height - 3,
+                    max(1, int(step)), 3, QColor("#3b82f6"),
+                )
         else:
             # Fill background
             painter.fillRect(self.rect(), QColor("#f8fafc"))
@@ -77,7 +132,9 @@ class DetailPanel(QWidget):
     Modern detail panel with file preview and metadata.
     
     Features:
-    - Large file preview area
+    - Large file preview area, loaded progressively: the grid thumbnail is
+      shown at once, the preview (cached per size bucket) replaces it when
+      the background load finishes
     - Clean metadata display
     - Tag chips for associated tags
     - Modern card-based layout
@@ -89,8 +146,32 @@ class DetailPanel(QWidget):
         super().__init__()
         self.setObjectName("detailPanel")
         config = load_config()
-        self._thumb_service = ThumbnailService(config.thumbs_dir)
+        self._thumb_service = ThumbnailService(
+            config.thumbs_dir,
+            store_kind=config.thumb_store,
+            disk_budget_mb=config.thumb_cache_mb,
+            eviction_policy=config.thumb_eviction,
+            max_encoded_cache_mb=config.thumb_encoded_cache_mb,
+            memory_policy=config.thumb_memory_policy,
+            render_workers=config.thumb_workers,
+            video_sheet_frames=config.video_sheet_frames,
+        )
         self._current_file: File | None = None
+        # Progressive preview: cache key and bucket of the pending/shown preview
+        self._preview_loader = ThumbnailLoader(self._thumb_service, self)
+        self._preview_loader.thumbnail_ready.connect(self._on_preview_ready)
+        self._preview_key: str | None = None
+        self._preview_bucket: int | None = None
+        self._preview_icon = "📄"
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.timeout.connect(self._on_resize_timeout)
+        # Contact sheets for hover scrubbing are generated in the background
+        self._sheet_key: str | None = None
+        self._sheet_loader: ThumbnailLoader | None = None
+        if config.video_sheet_frames >= 2:
+            self._sheet_loader = ThumbnailLoader(self._thumb_service, self)
+            self._sheet_loader.thumbnail_ready.connect(self._on_sheet_ready)
         self._build_ui()
 
     def _build_ui(self) -> None:
@@ -302,6 +383,8 @@ class DetailPanel(QWidget):
         self.preview_widget.setText("No preview")
         self.tags_container.clear()
         self._current_file = None
+        self._sheet_key = None
+        self._cancel_preview()
 
     def _update_display(self, file_row: File, tags: list[str]) -> None:
         """Update display with file information."""
@@ -327,40 +410,90 @@ class DetailPanel(QWidget):
             self.tags_container.add_chip(tag, self._get_tag_color(tag), removable=True)
 
     def _update_preview(self, file_row: File) -> None:
-        """Update the preview image."""
+        """Show the grid thumbnail now and load a larger preview in the background."""
         file_type = str(file_row.type)
         file_path = Path(str(file_row.path))
-        
+        self._sheet_key = None
+        self._cancel_preview()
+        self._preview_icon = {
+            "image": "🖼️",
+            "video": "🎬",
+            "audio": "🎵",
+            "doc": "📄",
+        }.get(file_type, "📄")
+
         if not file_path.exists():
             self.preview_widget.setText("📄")
             return
 
-        # Use widget size for thumbnail generation
+        source = ThumbnailSource(
+            path=file_path,
+            file_id=file_row.id,
+            size=file_row.size,
+            modified_at=file_row.modified_at,
+        )
+        kind = thumbnail_kind(file_type)
         size = (self.preview_widget.width(), self.preview_widget.height())
-        pixmap = None
-
-        try:
-            if file_type == "image":
-                pixmap = self._thumb_service.generate_image_thumbnail(file_path, size)
-            elif file_type == "video":
-                pixmap = self._thumb_service.generate_video_thumbnail(file_path, size)
-            else:
-                pixmap = self._thumb_service.generate_shell_thumbnail(file_path, size)
-        except Exception:
-            pass
-
-        if pixmap is None or pixmap.isNull():
-            # Show file type icon
-            icon_map = {
-                "image": "🖼️",
-                "video": "🎬",
-                "audio": "🎵",
-                "doc": "📄",
-            }
-            icon = icon_map.get(file_type, "📄")
-            self.preview_widget.setText(icon)
+        self._preview_bucket = self._thumb_service.get_thumbnail_size(size).bucket
+
+        preview = self._thumb_service.cached_thumbnail(source, kind, size)
+        if preview is None:
+            # Placeholder: the thumbnail the browser already generated for this file
+            for thumb_size in THUMBNAIL_SIZES:
+                preview = self._thumb_service.stored_thumbnail(source, kind, thumb_size)
+                if preview is not None:
+                    break
+            self._preview_key = self._preview_loader.request(source, kind, size)
+        if preview is not None:
+            self.preview_widget.setPixmap(preview)
         else:
-            self.preview_widget.setPixmap(pixmap)
+            self.preview_widget.setText(self._preview_icon)
+
+        if file_type == "video":
+            self._request_sheet(source, size)
+
+    def _cancel_preview(self) -> None:
+        if self._preview_key is not None:
+            self._preview_loader.cancel(self._preview_key)
+        self._preview_key = None
+        self._preview_bucket = None
+
+    def _on_preview_ready(self, cache_key: str, image: QImage) -> None:
+        if cache_key != self._preview_key:
+            return
+        self._preview_key = None
+        if image.isNull():
+            # Keep the placeholder thumbnail if there is one
+            if self.preview_widget.pixmap() is None:
+                self.preview_widget.setText(self._preview_icon)
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._thumb_service.cache_pixmap(cache_key, pixmap)
+        self.preview_widget.setPixmap(pixmap, keep_frames=True)
+
+    def _request_sheet(self, source: ThumbnailSource, size: tuple[int, int]) -> None:
+        """Load the video's contact sheet for hover scrubbing."""
+        if self._sheet_loader is None:
+            return
+        cached = self._thumb_service.cached_thumbnail(source, "sheet", size)
+        if cached is not None:
+            self._set_sheet(cached)
+            return
+        self._sheet_key = self._sheet_loader.request(source, "sheet", size)
+
+    def _on_sheet_ready(self, cache_key: str, image: QImage) -> None:
+        if cache_key != self._sheet_key or image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self._thumb_service.cache_pixmap(cache_key, pixmap)
+        self._set_sheet(pixmap)
+
+    def _set_sheet(self, sheet: QPixmap) -> None:
+        """Cut the sheet into frames once; scrubbing only swaps pixmaps."""
+        count = self._thumb_service.video_sheet_frames
+        width = sheet.width() // count
+        frames = [sheet.copy(index * width, 0, width, sheet.height()) for index in range(count)]
+        self.preview_widget.setFrames(frames)
 
     def _format_size(self, size_bytes: int) -> str:
         """Format file size in human readable format."""
@@ -421,9 +554,17 @@ class DetailPanel(QWidget):
             self.tag_remove_requested.emit(int(self._current_file.id), tag_name)
 
     def resizeEvent(self, event) -> None:
-        """Handle resize events to update preview size."""
+        """Reload the preview once resizing settles, only if it needs a new bucket."""
         super().resizeEvent(event)
-        # Re-update preview on resize to adjust image size
         if self._current_file is not None:
-            # Use a small delay to avoid too many updates during resize
-            QTimer.singleShot(50, lambda: self._update_preview(self._current_file))
+            self._resize_timer.start(PREVIEW_RESIZE_DELAY_MS)
+
+    def _on_resize_timeout(self) -> None:
+        if self._current_file is None:
+            return
+        size = (self.preview_widget.width(), self.preview_widget.height())
+        bucket = self._thumb_service.get_thumbnail_size(size).bucket
+        if self._preview_bucket is not None and bucket <= self._preview_bucket:
+            # The loaded (or loading) bucket still covers the widget
+            return
+        self._update_preview(self._current_file)
@@ -0,0 +1,380 @@
+"""
+Virtualized file list: columnar result store, list model and item delegate.
+"""
+from __future__ import annotations
+
+from array import array
+import math
+from typing import Callable, Iterable, Sequence
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPersistentModelIndex, QRect, QSize, Qt
+from PySide6.QtGui import QIcon, QPainter
+from PySide6.QtWidgets import QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+from ...core.search import SearchResult
+from ...db.models import File
+
+# Rows fetched per fetchMore() call
+PAGE_SIZE = 500
+
+FileIdRole = Qt.UserRole
+PathRole = Qt.UserRole + 2
+
+FetchPage = Callable[[int, int], list[SearchResult]]
+DecorationProvider = Callable[[int], QIcon | None]
+
+
+class FileColumns(Sequence[dict]):
+    """
+    Compact column-oriented store for file rows.
+
+    Keeps one array/list per field instead of a dict or widget item per row.
+    Indexing returns a plain item dict (the shape the browser and thumbnail
+    service already use), built on demand.
+    """
+
+    __slots__ = ("ids", "names", "paths", "types", "sizes", "mtimes", "_rows")
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.names: list[str] = []
+        self.paths: list[str] = []
+        self.types: list[str] = []
+        self.sizes = array("q")     # -1 when unknown
+        self.mtimes = array("d")    # NaN when unknown
+        self._rows: dict[int, int] = {}
+
+    @classmethod
+    def from_results(cls, results: Iterable[SearchResult]) -> "FileColumns":
+        columns = cls()
+        columns.extend_results(results)
+        return columns
+
+    @classmethod
+    def from_files(cls, files: Iterable[File]) -> "FileColumns":
+        columns = cls()
+        for file_row in files:
+            file_id = getattr(file_row, "id", None)
+            if file_id is None:
+                continue
+            columns.append(
+                int(file_id),
+                str(file_row.name),
+                str(file_row.path),
+                str(file_row.type),
+                file_row.size,
+                file_row.modified_at,
+            )
+        return columns
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict]) -> "FileColumns":
+        columns = cls()
+        for item in items:
+            columns.append(
+                item["id"], item["name"], item["path"], item["type"],
+                item.get("size"), item.get("modified_at"),
+            )
+        return columns
+
+    def append(
+        self,
+        file_id: int,
+        name: str,
+        path: str,
+        file_type: str,
+        size: int | None,
+        modified_at: float | None,
+    ) -> bool:
+        """Append a row; returns False if the file id is already present."""
+        if file_id in self._rows:
+            return False
+        self._rows[file_id] = len(self.ids)
+        self.ids.append(file_id)
+        self.names.append(name)
+        self.paths.append(path)
+        self.types.append(file_type)
+        self.sizes.append(-1 if size is None else int(size))
+        self.mtimes.append(math.nan if modified_at is None else float(modified_at))
+        return True
+
+    def extend_results(self, results: Iterable[SearchResult]) -> int:
+        """Append search results, skipping duplicates; returns rows added."""
+        added = 0
+        for result in results:
+            added += self.append(
+                int(result.file_id),
+                str(result.name),
+                str(result.path),
+                str(result.type),
+                result.size,
+                result.modified_at,
+            )
+        return added
+
+    def set_result(self, row: int, result: SearchResult) -> bool:
+        """Overwrite a row with fresh values; returns True if anything changed."""
+        size = -1 if result.size is None else int(result.size)
+        mtime = math.nan if result.modified_at is None else float(result.modified_at)
+        old_mtime = self.mtimes[row]
+        if (
+            self.names[row] == result.name
+            and self.paths[row] == result.path
+            and self.types[row] == result.type
+            and self.sizes[row] == size
+            and (old_mtime == mtime or (math.isnan(old_mtime) and math.isnan(mtime)))
+        ):
+            return False
+        self.names[row] = str(result.name)
+        self.paths[row] = str(result.path)
+        self.types[row] = str(result.type)
+        self.sizes[row] = size
+        self.mtimes[row] = mtime
+        return True
+
+    def remove_rows(self, first: int, last: int) -> None:
+        """Delete rows first..last (inclusive)."""
+        for file_id in self.ids[first:last + 1]:
+            del self._rows[file_id]
+        for column in (self.ids, self.names, self.paths, self.types, self.sizes, self.mtimes):
+            del column[first:last + 1]
+        for row in range(first, len(self.ids)):
+            self._rows[self.ids[row]] = row
+
+    def row_of(self, file_id: int) -> int | None:
+        return self._rows.get(file_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, row):  # type: ignore[override]
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(len(self)))]
+        size = self.sizes[row]
+        mtime = self.mtimes[row]
+        return {
+            "id": self.ids[row],
+            "name": self.names[row],
+            "path": self.paths[row],
+            "type": self.types[row],
+            "size": None if size < 0 else size,
+            "modified_at": None if math.isnan(mtime) else mtime,
+        }
+
+
+class FileListModel(QAbstractListModel):
+    """
+    List model over a FileColumns store.
+
+    Optionally pages more rows in from a `fetch_page(offset, limit)` callable
+    through Qt's canFetchMore()/fetchMore(), so views only pull rows as the
+    user scrolls. Decorations come from a provider callback and are only
+    requested for rows a view actually paints.
+
+    Changes are applied in place with patch()/refresh(), keyed by file id,
+    so views keep their scroll position, selection and thumbnails.
+    """
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._columns = FileColumns()
+        self._fetch_page: FetchPage | None = None
+        self._exhausted = True
+        self._fetched = 0
+        self._page_size = PAGE_SIZE
+        self._decoration: DecorationProvider | None = None
+
+    # ========== Data source ==========
+
+    @property
+    def columns(self) -> FileColumns:
+        return self._columns
+
+    def set_columns(
+        self, columns: FileColumns, fetch_page: FetchPage | None = None, complete: bool = False
+    ) -> None:
+        """Replace all rows.
+
+        With `fetch_page`, further pages load on demand unless `complete` says
+        the rows are already the whole result; refresh() re-queries either way.
+        """
+        self.beginResetModel()
+        self._columns = columns
+        self._fetch_page = fetch_page
+        self._exhausted = fetch_page is None or complete
+        self._fetched = len(columns)
+        self.endResetModel()
+
+    def set_decoration_provider(self, provider: DecorationProvider | None) -> None:
+        self._decoration = provider
+
+    def fetch_all(self) -> None:
+        """Load every remaining page (for views that need the full result set)."""
+        while self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._fetch_page is not None and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        results = self._fetch_page(self._fetched, self._page_size)
+        self._fetched += len(results)
+        if len(results) < self._page_size:
+            self._exhausted = True
+        # Pages can overlap if the index changed between fetches; keep ids unique
+        fresh: dict[int, SearchResult] = {}
+        for result in results:
+            file_id = int(result.file_id)
+            if self._columns.row_of(file_id) is None:
+                fresh.setdefault(file_id, result)
+        if not fresh:
+            return
+        first = len(self._columns)
+        self.beginInsertRows(QModelIndex(), first, first + len(fresh) - 1)
+        self._columns.extend_results(fresh.values())
+        self.endInsertRows()
+
+    def patch(self, updated: Iterable[SearchResult], removed: Iterable[int] = ()) -> None:
+        """Apply changes by file id.
+
+        Rows in `removed` are deleted; rows in `updated` are rewritten in place
+        if present, otherwise appended at the end.
+        """
+        rows = sorted(
+            {row for row in map(self._columns.row_of, removed) if row is not None}, reverse=True
+        )
+        # Remove contiguous runs from the bottom up so earlier rows keep their numbers
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self._columns.remove_rows(first, last)
+            self.endRemoveRows()
+            # Rows still to be paged in moved up accordingly
+            self._fetched = max(0, self._fetched - (last - first + 1))
+
+        fresh: dict[int, SearchResult] = {}
+        for result in updated:
+            file_id = int(result.file_id)
+            row = self._columns.row_of(file_id)
+            if row is None:
+                fresh.setdefault(file_id, result)
+            elif self._columns.set_result(row, result):
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index)
+        if fresh:
+            first = len(self._columns)
+            self.beginInsertRows(QModelIndex(), first, first + len(fresh) - 1)
+            self._columns.extend_results(fresh.values())
+            self.endInsertRows()
+
+    def refresh(self) -> list[SearchResult]:
+        """Re-query the rows loaded so far and patch the differences; returns the fresh rows."""
+        if self._fetch_page is None:
+            return []
+        limit = max(self._fetched, len(self._columns), self._page_size)
+        results = self._fetch_page(0, limit)
+        current = {int(result.file_id) for result in results}
+        self.patch(results, [file_id for file_id in self._columns.ids if file_id not in current])
+        self._fetched = len(results)
+        self._exhausted = len(results) < limit
+        return results
+
+    # ========== Lookups ==========
+
+    def item(self, row: int) -> dict:
+        return self._columns[row]
+
+    def file_id(self, row: int) -> int:
+        return self._columns.ids[row]
+
+    def index_for_id(self, file_id: int) -> QModelIndex:
+        row = self._columns.row_of(file_id)
+        return QModelIndex() if row is None else self.index(row, 0)
+
+    def refresh_decoration(self, file_id: int) -> None:
+        """Notify views that a row's thumbnail changed."""
+        index = self.index_for_id(file_id)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    # ========== QAbstractListModel ==========
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self._columns.names[row]
+        if role == FileIdRole:
+            return self._columns.ids[row]
+        if role == Qt.ToolTipRole or role == PathRole:
+            return self._columns.paths[row]
+        if role == Qt.DecorationRole and self._decoration is not None:
+            return self._decoration(row)
+        return None
+
+    def flags(self, index: QModelIndex | QPersistentModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemNeverHasChildren
+
+
+class FileItemDelegate(QStyledItemDelegate):
+    """
+    Paints file rows without per-row widget items.
+
+    Grid mode draws the thumbnail bottom-aligned in the icon area and a
+    middle-elided name below it. sizeHint() never touches the decoration, so
+    laying out a large model does not request thumbnails for off-screen rows.
+    """
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.grid_mode = False
+
+    def sizeHint(self, option: QStyleOptionViewItem, index) -> QSize:
+        line_height = option.fontMetrics.height()
+        icon_size = option.decorationSize
+        if self.grid_mode:
+            return QSize(icon_size.width() + 24, icon_size.height() + line_height * 2 + 12)
+        return QSize(option.rect.width(), max(icon_size.height(), line_height) + 8)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index) -> None:
+        if not self.grid_mode:
+            super().paint(painter, option, index)
+            return
+
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        widget = opt.widget
+        style = widget.style() if widget is not None else None
+        painter.save()
+        if style is not None:
+            style.drawPrimitive(QStyle.PE_PanelItemViewItem, opt, painter, widget)
+
+        rect = opt.rect
+        icon_size = opt.decorationSize
+        icon_rect = QRect(
+            rect.x() + (rect.width() - icon_size.width()) // 2,
+            rect.y() + 4,
+            icon_size.width(),
+            icon_size.height(),
+        )
+        if not opt.icon.isNull():
+            opt.icon.paint(painter, icon_rect, Qt.AlignHCenter | Qt.AlignBottom)
+
+        text_rect = QRect(
+            rect.x() + 4, icon_rect.bottom() + 4, rect.width() - 8, rect.bottom() - icon_rect.bottom() - 4
+        )
+        text = opt.fontMetrics.elidedText(opt.text, Qt.ElideMiddle, text_rect.width() * 2)
+        selected = bool(opt.state & QStyle.State_Selected)
+        painter.setPen(opt.palette.highlightedText().color() if selected else opt.palette.text().color())
+        painter.drawText(text_rect, Qt.AlignHCenter | Qt.AlignTop | Qt.TextWrapAnywhere, text)
+        painter.restore()
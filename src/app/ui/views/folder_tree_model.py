@@ -0,0 +1,243 @@
+"""
+Lazily populated folder tree model.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Iterable
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, QPersistentModelIndex, Qt
+from PySide6.QtGui import QFont
+
+from ...core.search import FolderResult
+
+FolderPathRole = Qt.UserRole
+
+ListFolders = Callable[[str], list[FolderResult]]
+
+
+class _FolderNode:
+    __slots__ = ("path", "name", "parent", "row", "children", "has_children")
+
+    def __init__(
+        self, path: str, name: str, parent: "_FolderNode | None", row: int, has_children: bool
+    ) -> None:
+        self.path = path
+        self.name = name
+        self.parent = parent
+        self.row = row
+        # None until the children have been fetched
+        self.children: list[_FolderNode] | None = None
+        self.has_children = has_children
+
+
+class FolderTreeModel(QAbstractItemModel):
+    """
+    Folder tree whose children are loaded on first expansion.
+
+    Child folders come from a `list_folders(parent_path)` callback (a DB query
+    in the app), so only expanded nodes exist in memory. Materialized nodes
+    are kept in a path -> node dict for O(1) lookups.
+    """
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._roots: list[_FolderNode] = []
+        self._nodes: dict[str, _FolderNode] = {}
+        self._list_folders: ListFolders | None = None
+        self._root_font = QFont()
+        self._root_font.setBold(True)
+
+    # ========== Data source ==========
+
+    def set_root(self, root: str | None, list_folders: ListFolders | None) -> None:
+        """Replace the tree with a single root folder; nothing below it is loaded yet."""
+        self.beginResetModel()
+        self._roots = []
+        self._nodes = {}
+        self._list_folders = list_folders
+        if root is not None and list_folders is not None:
+            node = _FolderNode(root, Path(root).name or root, None, 0, True)
+            self._roots.append(node)
+            self._nodes[root] = node
+        self.endResetModel()
+
+    def clear(self) -> None:
+        self.set_root(None, None)
+
+    def index_for_path(self, path: str, fetch: bool = True) -> QModelIndex:
+        """Index of a folder, loading its ancestors first if needed."""
+        node = self._nodes.get(path)
+        if node is None and fetch:
+            node = self._reveal(path)
+        return QModelIndex() if node is None else self.createIndex(node.row, 0, node)
+
+    def _reveal(self, path: str) -> _FolderNode | None:
+        target = Path(path)
+        for root in self._roots:
+            try:
+                parts = target.relative_to(root.path).parts
+            except ValueError:
+                continue
+            node = root
+            current = Path(root.path)
+            for part in parts:
+                if node.children is None:
+                    self.fetchMore(self.createIndex(node.row, 0, node))
+                current = current / part
+                node = self._nodes.get(str(current))
+                if node is None:
+                    return None
+            return node
+        return None
+
+    def add_folder(self, path: str) -> None:
+        """Make a folder that just gained matching files reachable in the tree.
+
+        Only the nearest loaded ancestor is touched: an unloaded one just gets
+        an expand arrow, a loaded one gets the missing child inserted in order.
+        """
+        if path in self._nodes:
+            return
+        target = Path(path)
+        ancestor = target.parent
+        while str(ancestor) not in self._nodes:
+            if ancestor.parent == ancestor:
+                return
+            ancestor = ancestor.parent
+        node = self._nodes[str(ancestor)]
+        index = self.createIndex(node.row, 0, node)
+        if node.children is None:
+            if not node.has_children:
+                node.has_children = True
+                self.dataChanged.emit(index, index)
+            return
+        name = target.relative_to(ancestor).parts[0]
+        child_path = str(ancestor / name)
+        row = 0
+        while row < len(node.children) and node.children[row].name.lower() < name.lower():
+            row += 1
+        child = _FolderNode(child_path, name, node, row, child_path != path)
+        self.beginInsertRows(index, row, row)
+        node.children.insert(row, child)
+        for later in node.children[row + 1:]:
+            later.row += 1
+        self._nodes[child_path] = child
+        self.endInsertRows()
+
+    def _node(self, index: QModelIndex | QPersistentModelIndex) -> _FolderNode | None:
+        return index.internalPointer() if index.isValid() else None
+
+    def _children_of(self, parent: QModelIndex | QPersistentModelIndex) -> list[_FolderNode]:
+        node = self._node(parent)
+        if node is None:
+            return self._roots
+        return node.children or []
+
+    # ========== Lazy loading ==========
+
+    def hasChildren(self, parent=QModelIndex()) -> bool:
+        node = self._node(parent)
+        if node is None:
+            return bool(self._roots)
+        if node.children is None:
+            return node.has_children
+        return bool(node.children)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        node = self._node(parent)
+        return (
+            node is not None
+            and node.children is None
+            and node.has_children
+            and self._list_folders is not None
+        )
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        node = self._node(parent)
+        if node is None or node.children is not None or self._list_folders is None:
+            return
+        folders = self._list_folders(node.path)
+        if not folders:
+            node.children = []
+            node.has_children = False
+            self.dataChanged.emit(parent, parent)
+            return
+        children = [
+            _FolderNode(folder.path, folder.name, node, row, folder.has_children)
+            for row, folder in enumerate(folders)
+        ]
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        for child in children:
+            self._nodes[child.path] = child
+        self.endInsertRows()
+
+    # ========== QAbstractItemModel ==========
+
+    def index(self, row: int, column: int, parent=QModelIndex()) -> QModelIndex:
+        if column != 0:
+            return QModelIndex()
+        siblings = self._children_of(parent)
+        if not 0 <= row < len(siblings):
+            return QModelIndex()
+        return self.createIndex(row, 0, siblings[row])
+
+    def parent(self, index=None):  # type: ignore[override]
+        if index is None:
+            return super().parent()
+        node = self._node(index)
+        if node is None or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.parent.row, 0, node.parent)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.column() > 0:
+            return 0
+        return len(self._children_of(parent))
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 1
+
+    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = Qt.DisplayRole):
+        node = self._node(index)
+        if node is None:
+            return None
+        if role == Qt.DisplayRole:
+            return f"📁 {node.name}"
+        if role == FolderPathRole or role == Qt.ToolTipRole:
+            return node.path
+        if role == Qt.FontRole and node.parent is None:
+            return self._root_font
+        return None
+
+    def flags(self, index: QModelIndex | QPersistentModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+
+def folders_from_paths(folders: Iterable[str]) -> ListFolders:
+    """Child-folder lister over an in-memory set of folder paths."""
+    children: dict[str, dict[str, bool]] = {}
+    for folder in folders:
+        path = Path(folder)
+        nested = False
+        while path.parent != path:
+            siblings = children.setdefault(str(path.parent), {})
+            known = siblings.get(path.name)
+            siblings[path.name] = bool(known) or nested
+            if known is not None and (known or not nested):
+                # The rest of the chain was recorded by an earlier folder
+                break
+            nested = True
+            path = path.parent
+
+    def list_folders(parent: str) -> list[FolderResult]:
+        names = children.get(parent, {})
+        return [
+            FolderResult(path=str(Path(parent) / name), name=name, has_children=nested)
+            for name, nested in sorted(names.items(), key=lambda entry: entry[0].lower())
+        ]
+
+    return list_folders
@@ -112,6 +112,15 @@ class TagPanel(QWidget):
         row3_layout.addWidget(self.clear_filter_button)
         actions_layout.addLayout(row3_layout)
 
+        # Boolean tag expression, takes precedence over the selection when set
+        self.expression_input = QLineEdit()
+        self.expression_input.setObjectName("tagExpressionInput")
+        self.expression_input.setPlaceholderText("(travel OR work) AND NOT draft")
+        self.expression_input.setToolTip(
+            "Tag expression: AND / OR / NOT (or -tag), parentheses, \"quoted names\""
+        )
+        actions_layout.addWidget(self.expression_input)
+
         # Match mode checkbox
         self.match_all_checkbox = QCheckBox("Match all selected tags")
         self.match_all_checkbox.setObjectName("matchAllCheckbox")
@@ -131,17 +140,38 @@ class TagPanel(QWidget):
                 tag_name = item.data(Qt.UserRole + 1) or item.text()
                 item.setHidden(text not in str(tag_name).lower())
 
-    def set_tags(self, tags: list[Tag]) -> None:
-        """Set the list of tags to display."""
+    def set_tags(
+        self,
+        tags: list[Tag],
+        type_counts: dict[int, dict[str, int]] | None = None,
+    ) -> None:
+        """Set the list of tags to display.
+
+        Args:
+            tags: Tags with their maintained ``file_count``.
+            type_counts: Optional per-type usage breakdown keyed by tag id,
+                shown in the item tooltip.
+        """
+        selected = set(self.selected_tag_ids())
         self._tags = tags
         self.list_widget.clear()
+        type_counts = type_counts or {}
 
         for tag in tags:
-            item = QListWidgetItem(f"🏷️ {tag.name}")
+            count = int(getattr(tag, "file_count", 0) or 0)
+            item = QListWidgetItem(f"🏷️ {tag.name}  ({count})")
             item.setData(Qt.UserRole, tag.id)
             item.setData(Qt.UserRole + 1, tag.name)
-            item.setToolTip(f"Tag: {tag.name}")
+            tooltip = f"Tag: {tag.name}\nFiles: {count}"
+            breakdown = type_counts.get(int(tag.id), {})
+            for file_type, type_count in sorted(breakdown.items()):
+                tooltip += f"\n  {file_type.capitalize()}: {type_count}"
+            item.setToolTip(tooltip)
             self.list_widget.addItem(item)
+            if tag.id in selected:
+                item.setSelected(True)
+
+        self._on_search_changed(self.search_input.text())
 
     def selected_tag_ids(self) -> list[int]:
         """Get IDs of selected tags."""
@@ -166,6 +196,10 @@ class TagPanel(QWidget):
             names.append(text)
         return names
 
+    def tag_expression(self) -> str:
+        """Get the boolean tag expression text."""
+        return self.expression_input.text().strip()
+
     def match_all_tags(self) -> bool:
         """Get the match mode."""
         return self.match_all_checkbox.isChecked()
@@ -173,3 +207,7 @@ class TagPanel(QWidget):
     def clear_search(self) -> None:
         """Clear the search input."""
         self.search_input.clear()
+
+    def clear_expression(self) -> None:
+        """Clear the tag expression input."""
+        self.expression_input.clear()
@@ -0,0 +1,272 @@
+"""
+缓存淘汰策略 - 供 LRUCache 使用的抗扫描策略
+
+LRUCache 默认按最近使用淘汰：一次快速滑过大量条目（如滚动 10 万项的网格）
+就会把所有常用条目挤出缓存。这里的策略只维护键的顺序并选出被淘汰的键，值仍由缓存保存：
+
+- `2q`：新条目先进入 FIFO 队列 A1in，被淘汰后只在 A1out 中留下键；
+  在 A1out 中再次出现的键才进入 LRU 主队列 Am。只出现一次的条目不会挤走 Am
+- `tinylfu`：W-TinyLFU。新条目进入 20% 的 LRU 窗口；缓存满时窗口最久未用的条目作为候选，
+  用频率草图与主区的淘汰对象（试用段最久未用者）比较，频率低的一方被淘汰，候选胜出则进入试用段。
+  主区分为试用段与保护段（80%），试用段中再次命中的条目升入保护段
+
+容量按当前驻留条目数的比例计算，缓存以内存上限约束时同样适用。
+新策略继承 `EvictionPolicy` 并登记到 `CACHE_POLICIES`。
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+import zlib
+
+
+K = TypeVar("K", bound=Hashable)
+
+POLICY_LRU = "lru"
+POLICY_2Q = "2q"
+POLICY_TINYLFU = "tinylfu"
+
+# 2Q：A1in 占驻留条目的比例，A1out 保留的键数与驻留条目数之比
+TWO_Q_IN_RATIO = 0.25
+TWO_Q_OUT_RATIO = 0.5
+# W-TinyLFU：窗口占驻留条目的比例，保护段占主区的比例
+# 滚动时同一行在连续几帧中都会绘制，窗口需容纳数屏；1% 的窗口会在重复命中之前就把新行拒之门外
+TINYLFU_WINDOW_RATIO = 0.2
+TINYLFU_PROTECTED_RATIO = 0.8
+# 频率草图：4 行计数器，每个最大 15，累计 SAMPLE_FACTOR * 容量次访问后全部减半（老化）
+SKETCH_MAX_COUNT = 15
+SKETCH_SAMPLE_FACTOR = 10
+
+
+class EvictionPolicy(ABC, Generic[K]):
+    """
+    淘汰策略接口
+
+    由 LRUCache 在持有其状态时调用（ShardedLRUCache 中在分片锁内），实现不需要加锁。
+    `victim()` 选出并从自身结构中移除一个键，只在缓存非空时调用。
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Args:
+            capacity: 预期的最大条目数（用于确定频率草图等辅助结构的大小）
+        """
+        self._capacity = max(1, capacity)
+
+    def on_hit(self, key: K) -> None:
+        """缓存命中，或覆盖写入已驻留的键"""
+
+    def on_miss(self, key: K) -> None:
+        """缓存未命中（随后通常会写入该键）"""
+
+    @abstractmethod
+    def on_insert(self, key: K) -> None:
+        """写入新键"""
+
+    @abstractmethod
+    def on_remove(self, key: K) -> None:
+        """键被主动移除或覆盖"""
+
+    @abstractmethod
+    def victim(self) -> K:
+        """选出下一个被淘汰的键"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空"""
+
+
+class TwoQueuePolicy(EvictionPolicy[K]):
+    """2Q（Johnson & Shasha 简化版）"""
+
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity)
+        self._a1in: OrderedDict[K, None] = OrderedDict()
+        self._a1out: OrderedDict[K, None] = OrderedDict()
+        self._am: OrderedDict[K, None] = OrderedDict()
+
+    def on_hit(self, key: K) -> None:
+        # A1in 中的命中不改变顺序：短时间内的重复访问不代表长期热度
+        if key in self._am:
+            self._am.move_to_end(key)
+
+    def on_insert(self, key: K) -> None:
+        if key in self._a1out:
+            del self._a1out[key]
+            self._am[key] = None
+        else:
+            self._a1in[key] = None
+
+    def on_remove(self, key: K) -> None:
+        if key in self._a1in:
+            del self._a1in[key]
+        else:
+            self._am.pop(key, None)
+
+    def victim(self) -> K:
+        resident = len(self._a1in) + len(self._am)
+        if self._a1in and (len(self._a1in) > resident * TWO_Q_IN_RATIO or not self._am):
+            key, _ = self._a1in.popitem(last=False)
+            self._a1out[key] = None
+            ghost_limit = max(1, int(resident * TWO_Q_OUT_RATIO))
+            while len(self._a1out) > ghost_limit:
+                self._a1out.popitem(last=False)
+            return key
+        key, _ = self._am.popitem(last=False)
+        return key
+
+    def clear(self) -> None:
+        self._a1in.clear()
+        self._a1out.clear()
+        self._am.clear()
+
+
+class FrequencySketch(Generic[K]):
+    """Count-Min 频率草图：4 行计数器，估计值取各行最小值，定期减半使旧的热度衰减
+
+    每行宽度不超过 2^16（各行取 16 位哈希段），容量更大时估计偏高但仍可用于比较。
+    键用 CRC32 哈希而不是内置 `hash()`：后者对 str/bytes 按进程加盐，
+    哪些键在草图中冲突会随每次运行变化，命中率无法复现。
+    """
+
+    def __init__(self, capacity: int) -> None:
+        width = 16
+        while width < capacity and width < 1 << 16:
+            width <<= 1
+        self._mask = width - 1
+        self._width = width
+        self._table = bytearray(width * 4)
+        self._sample_size = SKETCH_SAMPLE_FACTOR * capacity
+        self._additions = 0
+
+    @staticmethod
+    def _stable_hash(key: K) -> int:
+        if isinstance(key, str):
+            data = key.encode("utf-8", "surrogatepass")
+        elif isinstance(key, bytes):
+            data = key
+        else:
+            data = repr(key).encode("utf-8", "surrogatepass")
+        return zlib.crc32(data)
+
+    def _indexes(self, key: K) -> tuple[int, int, int, int]:
+        # 一次乘法打散哈希值，各行取其中不同的位段
+        mixed = (self._stable_hash(key) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        mask = self._mask
+        width = self._width
+        return (
+            mixed & mask,
+            width + ((mixed >> 16) & mask),
+            2 * width + ((mixed >> 32) & mask),
+            3 * width + ((mixed >> 48 | mixed << 16) & mask),
+        )
+
+    def frequency(self, key: K) -> int:
+        table = self._table
+        a, b, c, d = self._indexes(key)
+        return min(table[a], table[b], table[c], table[d])
+
+    def increment(self, key: K) -> None:
+        table = self._table
+        added = False
+        for index in self._indexes(key):
+            if table[index] < SKETCH_MAX_COUNT:
+                table[index] += 1
+                added = True
+        if added:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._table = bytearray(count >> 1 for count in table)
+                self._additions //= 2
+
+    def clear(self) -> None:
+        self._table = bytearray(len(self._table))
+        self._additions = 0
+
+
+class TinyLFUPolicy(EvictionPolicy[K]):
+    """W-TinyLFU：LRU 窗口 + 频率准入 + 分段 LRU 主区"""
+
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity)
+        self._sketch = FrequencySketch[K](self._capacity)
+        self._window: OrderedDict[K, None] = OrderedDict()
+        self._probation: OrderedDict[K, None] = OrderedDict()
+        self._protected: OrderedDict[K, None] = OrderedDict()
+
+    def on_hit(self, key: K) -> None:
+        self._sketch.increment(key)
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._probation:
+            del self._probation[key]
+            self._protected[key] = None
+            main = len(self._probation) + len(self._protected)
+            if len(self._protected) > max(1, int(main * TINYLFU_PROTECTED_RATIO)):
+                demoted, _ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+        else:
+            self._protected.move_to_end(key)
+
+    def on_miss(self, key: K) -> None:
+        self._sketch.increment(key)
+
+    def on_insert(self, key: K) -> None:
+        # 缓存未满时窗口可以超出比例，第一次淘汰时再把多出的条目移入主区
+        self._window[key] = None
+
+    def on_remove(self, key: K) -> None:
+        for segment in (self._window, self._probation, self._protected):
+            if key in segment:
+                del segment[key]
+                return
+
+    def victim(self) -> K:
+        window = self._window
+        probation = self._probation
+        resident = len(window) + len(probation) + len(self._protected)
+        window_limit = max(1, int(resident * TINYLFU_WINDOW_RATIO))
+        while len(window) > window_limit:
+            # 缓存填满前积累在窗口中的条目直接进入主区
+            key, _ = window.popitem(last=False)
+            probation[key] = None
+        main_victim = next(iter(probation or self._protected), None)
+        if len(window) >= window_limit and main_victim is not None:
+            # 窗口已满：其最久未用者与主区淘汰对象比较频率，平局淘汰候选
+            candidate = next(iter(window))
+            if self._sketch.frequency(candidate) > self._sketch.frequency(main_victim):
+                del window[candidate]
+                probation[candidate] = None
+                self.on_remove(main_victim)
+                return main_victim
+            del window[candidate]
+            return candidate
+        for segment in (probation, self._protected, window):
+            if segment:
+                key, _ = segment.popitem(last=False)
+                return key
+        raise KeyError("victim() called on an empty cache")
+
+    def clear(self) -> None:
+        self._sketch.clear()
+        self._window.clear()
+        self._probation.clear()
+        self._protected.clear()
+
+
+# 策略名 -> 实现；"lru" 由 LRUCache 内置的 OrderedDict 实现，不需要策略对象
+CACHE_POLICIES: dict[str, type[EvictionPolicy] | None] = {
+    POLICY_LRU: None,
+    POLICY_2Q: TwoQueuePolicy,
+    POLICY_TINYLFU: TinyLFUPolicy,
+}
+
+
+def create_cache_policy(name: str, capacity: int) -> EvictionPolicy | None:
+    """按名称创建淘汰策略，未知名称抛出 ValueError；"lru" 返回 None"""
+    try:
+        policy_class = CACHE_POLICIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown cache policy: {name}") from None
+    return policy_class(capacity) if policy_class is not None else None
@@ -1,17 +1,47 @@
 """
 LRU缓存实现 - 用于内存管理优化
 
-提供固定容量的LRU缓存，支持内存占用估算和回调函数
+提供固定容量的LRU缓存，支持内存占用估算和回调函数；
+`ShardedLRUCache` 按键哈希分片、每片一把锁，供多线程共享使用
 """
 from __future__ import annotations
 
 from collections import OrderedDict
-from typing import Callable, Generic, TypeVar
+from dataclasses import dataclass
+import threading
+from typing import Callable, Generic, Iterator, TypeVar
+
+from .cache_policy import POLICY_LRU, create_cache_policy
 
 
 K = TypeVar("K")
 V = TypeVar("V")
 
+# ShardedLRUCache 默认分片数
+DEFAULT_SHARDS = 8
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """缓存命中统计"""
+
+    hits: int = 0
+    misses: int = 0
+    # 因容量或内存限制被淘汰（含超过内存上限而未缓存）的条目数，不含主动移除
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __add__(self, other: CacheStats) -> CacheStats:
+        return CacheStats(
+            self.hits + other.hits,
+            self.misses + other.misses,
+            self.evictions + other.evictions,
+        )
+
 
 class LRUCache(Generic[K, V]):
     """
@@ -21,7 +51,9 @@ class LRUCache(Generic[K, V]):
     - 固定容量，超出时自动淘汰最久未使用的项
     - 支持计算每个值的大小
     - 支持淘汰回调函数
-    - 线程安全（在单线程Qt环境中使用）
+    - 统计命中/未命中/淘汰次数
+    - 可替换淘汰策略（见 cache_policy：`2q`、`tinylfu` 抗扫描），默认 LRU
+    - 非线程安全，只在单个线程（Qt UI 线程）中使用；多线程共享时使用 ShardedLRUCache
     
     示例：
         cache = LRUCache[str, QPixmap](max_size=100, max_memory_mb=256)
@@ -35,6 +67,7 @@ class LRUCache(Generic[K, V]):
         max_memory_mb: float | None = None,
         size_callback: Callable[[V], int] | None = None,
         eviction_callback: Callable[[K, V], None] | None = None,
+        policy: str = POLICY_LRU,
     ) -> None:
         """
         初始化LRU缓存
@@ -44,15 +77,22 @@ class LRUCache(Generic[K, V]):
             max_memory_mb: 最大内存占用(MB)，None表示不限制
             size_callback: 计算值大小的回调函数，返回字节数
             eviction_callback: 淘汰条目时的回调函数
+            policy: 淘汰策略名称（"lru" / "2q" / "tinylfu"）
         """
         self._max_size = max_size
         self._max_memory = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
         self._size_callback = size_callback
         self._eviction_callback = eviction_callback
+        # None 表示内置 LRU：顺序由 OrderedDict 维护
+        self._policy = create_cache_policy(policy, max_size)
         
         self._cache: OrderedDict[K, V] = OrderedDict()
         self._size_map: dict[K, int] = {}
         self._current_memory = 0
+        
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
     
     def get(self, key: K) -> V | None:
         """
@@ -60,12 +100,20 @@ class LRUCache(Generic[K, V]):
         
         获取成功会将该项移到最近使用位置
         """
-        if key not in self._cache:
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self._misses += 1
+            if self._policy is not None:
+                self._policy.on_miss(key)
             return None
         
-        # 移到末尾（最近使用）
-        value = self._cache.pop(key)
-        self._cache[key] = value
+        if self._policy is None:
+            # 移到末尾（最近使用），不重建节点
+            self._cache.move_to_end(key)
+        else:
+            self._policy.on_hit(key)
+        self._hits += 1
         return value
     
     def put(self, key: K, value: V, size_bytes: int | None = None) -> None:
@@ -77,10 +125,6 @@ class LRUCache(Generic[K, V]):
             value: 缓存值
             size_bytes: 值的大小（字节），如果提供则直接使用，否则通过size_callback计算
         """
-        # 如果键已存在，先移除旧的
-        if key in self._cache:
-            self._remove(key)
-        
         # 计算大小
         if size_bytes is not None:
             item_size = size_bytes
@@ -89,22 +133,46 @@ class LRUCache(Generic[K, V]):
         else:
             item_size = 0
         
-        # 检查单个体积是否超过限制
-        if self._max_memory and item_size > self._max_memory:
-            # 单个项就超过限制，不缓存
+        # 检查单个体积是否超过限制（容量为 0 时缓存关闭）
+        if self._max_size <= 0 or (self._max_memory and item_size > self._max_memory):
+            # 单个项就超过限制，不缓存，旧值也一并移除
+            self._remove(key)
+            self._evictions += 1
             if self._eviction_callback:
                 self._eviction_callback(key, value)
             return
         
+        if key in self._cache:
+            self._update(key, value, item_size)
+            return
+        
         # 淘汰旧项直到满足容量和内存限制
         while self._needs_eviction(1, item_size):
             self._evict_lru()
         
         # 添加新项
         self._cache[key] = value
+        if self._policy is not None:
+            self._policy.on_insert(key)
         self._size_map[key] = item_size
         self._current_memory += item_size
     
+    def _update(self, key: K, value: V, item_size: int) -> None:
+        """覆盖已驻留的键：视为一次命中，保留它在淘汰策略中的位置（如 2Q 的 Am）"""
+        old_value = self._cache[key]
+        self._cache[key] = value
+        self._current_memory += item_size - self._size_map[key]
+        self._size_map[key] = item_size
+        if self._policy is None:
+            self._cache.move_to_end(key)
+        else:
+            self._policy.on_hit(key)
+        if self._eviction_callback:
+            self._eviction_callback(key, old_value)
+        # 新值更大时可能超出内存上限
+        while self._needs_eviction(0, 0):
+            self._evict_lru()
+    
     def _needs_eviction(self, new_count: int, new_memory: int) -> bool:
         """检查是否需要淘汰旧项"""
         # 检查数量限制
@@ -118,12 +186,17 @@ class LRUCache(Generic[K, V]):
         return False
     
     def _evict_lru(self) -> None:
-        """淘汰最久未使用的项"""
+        """淘汰最久未使用的项（或由淘汰策略选出的项）"""
         if not self._cache:
             return
         
-        # 获取最旧的项（OrderedDict的第一个）
-        key, value = self._cache.popitem(last=False)
+        if self._policy is None:
+            # 获取最旧的项（OrderedDict的第一个）
+            key, value = self._cache.popitem(last=False)
+        else:
+            key = self._policy.victim()
+            value = self._cache.pop(key)
+        self._evictions += 1
         self._remove_internal(key, value)
     
     def _remove(self, key: K) -> V | None:
@@ -132,6 +205,8 @@ class LRUCache(Generic[K, V]):
             return None
         
         value = self._cache.pop(key)
+        if self._policy is not None:
+            self._policy.on_remove(key)
         self._remove_internal(key, value)
         return value
     
@@ -158,6 +233,8 @@ class LRUCache(Generic[K, V]):
         self._cache.clear()
         self._size_map.clear()
         self._current_memory = 0
+        if self._policy is not None:
+            self._policy.clear()
     
     def contains(self, key: K) -> bool:
         """检查是否包含指定键（不改变访问顺序）"""
@@ -176,6 +253,11 @@ class LRUCache(Generic[K, V]):
         """返回缓存项数量"""
         return len(self._cache)
     
+    @property
+    def stats(self) -> CacheStats:
+        """返回命中统计"""
+        return CacheStats(self._hits, self._misses, self._evictions)
+    
     @property
     def memory_usage(self) -> int:
         """返回当前内存占用（字节）"""
@@ -197,3 +279,180 @@ class LRUCache(Generic[K, V]):
     def items(self):
         """返回所有键值对的视图"""
         return self._cache.items()
+
+
+class _Shard(Generic[K, V]):
+    """ShardedLRUCache 的一个分片：独立的 LRUCache 与锁
+
+    淘汰回调先记入 `evicted`，由调用方在释放锁之后执行，
+    回调中再访问缓存不会死锁，也不会在持锁期间执行用户代码。
+    """
+
+    __slots__ = ("lock", "cache", "evicted")
+
+    def __init__(
+        self,
+        max_size: int,
+        max_memory_mb: float | None,
+        size_callback: Callable[[V], int] | None,
+        policy: str,
+    ) -> None:
+        self.lock = threading.Lock()
+        self.evicted: list[tuple[K, V]] = []
+        self.cache = LRUCache[K, V](
+            max_size=max_size,
+            max_memory_mb=max_memory_mb,
+            size_callback=size_callback,
+            eviction_callback=self._record,
+            policy=policy,
+        )
+
+    def _record(self, key: K, value: V) -> None:
+        self.evicted.append((key, value))
+
+    def drain(self) -> list[tuple[K, V]]:
+        """取出待执行回调的条目（持锁调用）"""
+        if not self.evicted:
+            return []
+        evicted, self.evicted = self.evicted, []
+        return evicted
+
+
+class ShardedLRUCache(Generic[K, V]):
+    """
+    线程安全的分片 LRU 缓存
+    
+    按 `hash(key)` 把键分到 N 个分片，每个分片是独立的 LRUCache 并持有一把锁，
+    不同分片上的读写互不阻塞。条目数与内存上限平均分配到各分片，
+    因此淘汰是分片内的 LRU（近似全局 LRU），分布不均时总容量略低于上限。
+    
+    接口与 LRUCache 相同；`keys()/values()/items()` 返回快照列表而不是视图。
+    """
+    
+    def __init__(
+        self,
+        max_size: int = 1000,
+        max_memory_mb: float | None = None,
+        size_callback: Callable[[V], int] | None = None,
+        eviction_callback: Callable[[K, V], None] | None = None,
+        shards: int = DEFAULT_SHARDS,
+        policy: str = POLICY_LRU,
+    ) -> None:
+        """
+        初始化分片缓存
+        
+        Args:
+            max_size: 最大条目数（所有分片合计）
+            max_memory_mb: 最大内存占用(MB)，None表示不限制
+            size_callback: 计算值大小的回调函数，返回字节数
+            eviction_callback: 淘汰条目时的回调函数（在锁外调用）
+            shards: 分片数，不超过 max_size
+            policy: 淘汰策略名称，每个分片各自维护
+        """
+        count = max(1, min(shards, max_size))
+        shard_size = -(-max_size // count)
+        shard_memory = max_memory_mb / count if max_memory_mb else None
+        self._shards: list[_Shard[K, V]] = [
+            _Shard(shard_size, shard_memory, size_callback, policy) for _ in range(count)
+        ]
+        self._eviction_callback = eviction_callback
+    
+    def _shard(self, key: K) -> _Shard[K, V]:
+        return self._shards[hash(key) % len(self._shards)]
+    
+    def _notify(self, evicted: list[tuple[K, V]]) -> None:
+        if self._eviction_callback:
+            for key, value in evicted:
+                self._eviction_callback(key, value)
+    
+    def get(self, key: K) -> V | None:
+        """获取缓存值，如果不存在返回None"""
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.cache.get(key)
+    
+    def put(self, key: K, value: V, size_bytes: int | None = None) -> None:
+        """添加或更新缓存项（参数同 LRUCache.put）"""
+        shard = self._shard(key)
+        with shard.lock:
+            shard.cache.put(key, value, size_bytes)
+            evicted = shard.drain()
+        self._notify(evicted)
+    
+    def remove(self, key: K) -> V | None:
+        """移除指定项并返回值"""
+        shard = self._shard(key)
+        with shard.lock:
+            value = shard.cache.remove(key)
+            evicted = shard.drain()
+        self._notify(evicted)
+        return value
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        for shard in self._shards:
+            with shard.lock:
+                shard.cache.clear()
+                evicted = shard.drain()
+            self._notify(evicted)
+    
+    def contains(self, key: K) -> bool:
+        """检查是否包含指定键（不改变访问顺序）"""
+        shard = self._shard(key)
+        with shard.lock:
+            return key in shard.cache
+    
+    def __contains__(self, key: K) -> bool:
+        """支持in操作符"""
+        return self.contains(key)
+    
+    def __len__(self) -> int:
+        """返回缓存项数量"""
+        return sum(len(shard.cache) for shard in self._shards)
+    
+    @property
+    def size(self) -> int:
+        """返回缓存项数量"""
+        return len(self)
+    
+    @property
+    def shard_count(self) -> int:
+        """返回分片数"""
+        return len(self._shards)
+    
+    @property
+    def stats(self) -> CacheStats:
+        """返回所有分片合计的命中统计"""
+        total = CacheStats()
+        for shard in self._shards:
+            with shard.lock:
+                total += shard.cache.stats
+        return total
+    
+    @property
+    def memory_usage(self) -> int:
+        """返回当前内存占用（字节）"""
+        return sum(shard.cache.memory_usage for shard in self._shards)
+    
+    @property
+    def memory_usage_mb(self) -> float:
+        """返回当前内存占用（MB）"""
+        return self.memory_usage / (1024 * 1024)
+    
+    def _snapshot(self) -> Iterator[tuple[K, V]]:
+        for shard in self._shards:
+            with shard.lock:
+                items = list(shard.cache.items())
+            yield from items
+    
+    def keys(self) -> list[K]:
+        """返回所有键的快照"""
+        return [key for key, _ in self._snapshot()]
+    
+    def values(self) -> list[V]:
+        """返回所有值的快照"""
+        return [value for _, value in self._snapshot()]
+    
+    def items(self) -> list[tuple[K, V]]:
+        """返回所有键值对的快照"""
+        return list(self._snapshot())
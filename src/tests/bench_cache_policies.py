@@ -0,0 +1,111 @@
+"""
+内存缓存淘汰策略基准：回放缩略图访问轨迹，比较 lru / 2q / tinylfu 的命中率
+
+轨迹为每行一个缓存键的文本文件，设置 MYTAGS_THUMB_TRACE=<文件> 后运行应用即可记录
+（网格绘制时每次查询内存缓存写入一行）。未指定轨迹时生成合成的滚动轨迹：
+在几个常用区域内来回慢速浏览，期间穿插快速滑过整个网格（只绘制经过的部分行）。
+
+回放方式与应用相同：先查询，未命中时写入。
+
+用法（在 src 目录下）：
+    python tests/bench_cache_policies.py                          # 合成轨迹
+    python tests/bench_cache_policies.py --trace ~/thumb-trace.txt --capacity 500,2000
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.cache_policy import CACHE_POLICIES  # noqa: E402
+from app.utils.lru_cache import LRUCache  # noqa: E402
+
+
+def synthetic_trace(
+    items: int = 100_000,
+    viewport: int = 60,
+    hot_regions: int = 4,
+    region_size: int = 600,
+    sessions: int = 40,
+    passes: int = 3,
+    seed: int = 1,
+) -> list[int]:
+    """合成滚动轨迹：在常用区域内慢速滚动，每轮之后快速滑过网格的一大段"""
+    rng = random.Random(seed)
+    starts = [rng.randrange(items - region_size) for _ in range(hot_regions)]
+    trace: list[int] = []
+
+    def show(first: int) -> None:
+        trace.extend(range(max(0, first), min(items, first + viewport)))
+
+    for _ in range(sessions):
+        start = rng.choice(starts)
+        # 慢速浏览：每次滚动约 1/4 屏，来回 passes 趟
+        for _ in range(passes):
+            for first in range(start, start + region_size, viewport // 4):
+                show(first)
+            for first in range(start + region_size, start, -viewport // 4):
+                show(first)
+        # 快速滑动：每帧跨过数屏，只绘制帧内可见的行
+        origin = rng.randrange(items)
+        target = rng.randrange(items)
+        step = viewport * rng.randint(3, 8) * (1 if target > origin else -1)
+        for first in range(origin, target, step):
+            show(first)
+    return trace
+
+
+def load_trace(path: Path) -> list[str]:
+    with path.open(encoding="utf-8") as handle:
+        return [line.rstrip("\n") for line in handle if line.strip()]
+
+
+def replay(trace: list, policy: str, capacity: int) -> tuple[float, float]:
+    """返回 (命中率, 每次访问微秒数)"""
+    cache = LRUCache(max_size=capacity, policy=policy)
+    start = time.perf_counter()
+    for key in trace:
+        if cache.get(key) is None:
+            cache.put(key, True)
+    elapsed = time.perf_counter() - start
+    return cache.stats.hit_rate, elapsed / len(trace) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", type=Path, action="append", help="轨迹文件（可重复，默认合成轨迹）")
+    parser.add_argument("--capacity", default="250,500,1000,2000", help="逗号分隔的缓存条目数")
+    parser.add_argument("--policies", default=",".join(CACHE_POLICIES), help="逗号分隔的策略")
+    parser.add_argument("--items", type=int, default=100_000, help="合成轨迹的网格项目数")
+    parser.add_argument("--passes", type=int, default=3, help="合成轨迹每次在常用区域内来回的趟数")
+    args = parser.parse_args()
+    policies = args.policies.split(",")
+
+    if args.trace:
+        traces = {path.name: load_trace(path) for path in args.trace}
+    else:
+        traces = {"synthetic": synthetic_trace(items=args.items, passes=args.passes)}
+
+    for name, trace in traces.items():
+        if not trace:
+            print(f"{name}: empty trace, skipped")
+            continue
+        print(f"{name}: {len(trace)} accesses, {len(set(trace))} distinct keys")
+        print(f"{'capacity':<10}" + "".join(f"{policy:>10}" for policy in policies) + f"{'us/op':>24}")
+        for capacity in (int(value) for value in args.capacity.split(",")):
+            results = [replay(trace, policy, capacity) for policy in policies]
+            costs = "/".join(f"{cost:.2f}" for _, cost in results)
+            print(
+                f"{capacity:<10}"
+                + "".join(f"{hit_rate:>10.1%}" for hit_rate, _ in results)
+                + f"{costs:>24}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+内存缓存并发基准：LRUCache（外加一把全局锁）与 ShardedLRUCache 的吞吐
+
+N 个线程按 Zipf 分布访问键（少量热点、长尾冷门，接近滚动浏览），
+未命中时写入；每个值模拟一张缩略图的字节数。报告总吞吐与命中率。
+纯 Python 操作受 GIL 串行化，分片主要减少锁竞争与持锁时的线程切换，
+多核吞吐的差异在回调或值构造会释放 GIL 时更明显。
+
+用法（在 src 目录下）：
+    python tests/bench_lru_cache.py
+    python tests/bench_lru_cache.py --threads 1,4,16 --ops 200000 --shards 16
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.lru_cache import LRUCache, ShardedLRUCache  # noqa: E402
+
+# 模拟的缩略图大小（256x256 ARGB32）
+ITEM_BYTES = 256 * 256 * 4
+
+
+class LockedLRUCache:
+    """现有 LRUCache 加一把全局锁：多线程共享时最直接的做法"""
+
+    def __init__(self, **kwargs) -> None:
+        self._cache = LRUCache(**kwargs)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def put(self, key, value, size_bytes=None) -> None:
+        with self._lock:
+            self._cache.put(key, value, size_bytes)
+
+    @property
+    def stats(self):
+        return self._cache.stats
+
+
+def _zipf_keys(count: int, universe: int, seed: int) -> list[int]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(universe)]
+    return rng.choices(range(universe), weights=weights, k=count)
+
+
+def _measure(cache, threads: int, keys: list[int]) -> float:
+    """返回吞吐（次/秒）"""
+    chunks = [keys[index::threads] for index in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(chunk: list[int]) -> None:
+        barrier.wait()
+        for key in chunk:
+            if cache.get(key) is None:
+                cache.put(key, key, ITEM_BYTES)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return len(keys) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,2,4,8", help="逗号分隔的线程数")
+    parser.add_argument("--ops", type=int, default=400_000, help="每轮访问次数")
+    parser.add_argument("--keys", type=int, default=20_000, help="键空间大小")
+    parser.add_argument("--memory-mb", type=float, default=256, help="缓存内存上限（MB）")
+    parser.add_argument("--shards", type=int, default=8, help="ShardedLRUCache 分片数")
+    args = parser.parse_args()
+
+    keys = _zipf_keys(args.ops, args.keys, seed=1)
+    options = {"max_size": args.keys, "max_memory_mb": args.memory_mb}
+    print(
+        f"{args.ops} ops over {args.keys} keys (zipf), "
+        f"{args.memory_mb:g} MB = {int(args.memory_mb * 1024 * 1024 // ITEM_BYTES)} items"
+    )
+    print(f"{'threads':<9}{'locked ops/s':>14}{'hit':>7}{'sharded ops/s':>15}{'hit':>7}{'ratio':>8}")
+    for threads in (int(value) for value in args.threads.split(",")):
+        locked = LockedLRUCache(**options)
+        sharded = ShardedLRUCache(shards=args.shards, **options)
+        locked_rate = _measure(locked, threads, keys)
+        sharded_rate = _measure(sharded, threads, keys)
+        print(
+            f"{threads:<9}"
+            f"{locked_rate:>14,.0f}{locked.stats.hit_rate:>7.1%}"
+            f"{sharded_rate:>15,.0f}{sharded.stats.hit_rate:>7.1%}"
+            f"{sharded_rate / locked_rate:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+缩略图解码基准：比较全尺寸解码、draft() 降分辨率解码与内嵌 EXIF 缩略图
+
+每种模式在独立子进程中运行，分别报告吞吐（张/秒）与峰值 RSS。
+
+用法（在 src 目录下）：
+    python tests/bench_thumbnail_decode.py                    # 生成 8 张 24MP 测试照片
+    python tests/bench_thumbnail_decode.py --corpus ~/Photos  # 使用已有照片目录
+    python tests/bench_thumbnail_decode.py --megapixels 50 --size 512
+"""
+from __future__ import annotations
+
+import argparse
+from io import BytesIO
+import json
+from pathlib import Path
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image  # noqa: E402
+
+from app.services.thumbnail_codec import decode_thumbnail  # noqa: E402
+
+MODES = ("full", "draft", "exif")
+PHOTO_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff"}
+
+
+def _decode(mode: str, path: Path, size: tuple[int, int]) -> Image.Image:
+    if mode == "full":
+        # 旧实现的最坏情况：先解码全部像素再缩放
+        with Image.open(path) as image:
+            image.load()
+            image.thumbnail(size, reducing_gap=None)
+            return image.copy()
+    return decode_thumbnail(path, size, use_exif_thumbnail=mode == "exif")
+
+
+def _peak_rss_mb() -> float | None:
+    # Linux 的 ru_maxrss 会跨 exec 继承父进程的峰值，VmHWM 只统计本进程
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 计，macOS 以字节计
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_worker(mode: str, paths: list[Path], size: tuple[int, int], rounds: int) -> dict:
+    start = time.perf_counter()
+    count = 0
+    for _ in range(rounds):
+        for path in paths:
+            thumb = _decode(mode, path, size)
+            thumb.save(BytesIO(), "WEBP", quality=80)
+            count += 1
+    elapsed = time.perf_counter() - start
+    return {"mode": mode, "count": count, "seconds": elapsed, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _exif_with_thumbnail(thumbnail: Image.Image) -> bytes:
+    """APP1 数据：IFD1 指向内嵌 JPEG 缩略图（与相机输出的结构相同）"""
+    buffer = BytesIO()
+    thumbnail.save(buffer, "JPEG", quality=85)
+    data = buffer.getvalue()
+    ifd0 = struct.pack("<H", 0) + struct.pack("<L", 14)
+    ifd1 = (
+        struct.pack("<H", 2)
+        + struct.pack("<HHLL", 0x0201, 4, 1, 44)
+        + struct.pack("<HHLL", 0x0202, 4, 1, len(data))
+        + struct.pack("<L", 0)
+    )
+    return b"Exif\x00\x00" + b"II*\x00" + struct.pack("<L", 8) + ifd0 + ifd1 + data
+
+
+def generate_corpus(directory: Path, count: int, megapixels: float) -> list[Path]:
+    """生成带内嵌 EXIF 缩略图的 4:3 测试照片（也供其他基准使用）"""
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    paths = []
+    for index in range(count):
+        red = Image.linear_gradient("L").resize((width, height))
+        green = Image.radial_gradient("L").resize((width, height))
+        blue = Image.effect_noise((width // 8, height // 8), 40 + index).resize((width, height))
+        image = Image.merge("RGB", (red, green, blue))
+        thumbnail = image.resize((160, 120))
+        path = directory / f"photo{index:02}.jpg"
+        image.save(path, "JPEG", quality=90, exif=_exif_with_thumbnail(thumbnail))
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="照片目录（默认生成测试照片）")
+    parser.add_argument("--count", type=int, default=8, help="生成的测试照片数量")
+    parser.add_argument("--megapixels", type=float, default=24.0, help="生成的测试照片像素数（百万）")
+    parser.add_argument("--size", type=int, default=256, help="缩略图边长（物理像素）")
+    parser.add_argument("--rounds", type=int, default=1, help="每种模式重复遍历语料的次数")
+    parser.add_argument("--modes", default=",".join(MODES), help="逗号分隔：full,draft,exif")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--paths", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = (args.size, args.size)
+
+    if args.worker:
+        paths = [Path(path) for path in json.loads(args.paths)]
+        print(json.dumps(_run_worker(args.worker, paths, size, args.rounds)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.corpus:
+            paths = sorted(
+                path for path in args.corpus.rglob("*") if path.suffix.lower() in PHOTO_SUFFIXES
+            )
+        else:
+            print(f"Generating {args.count} photos of {args.megapixels:g} MP...")
+            paths = generate_corpus(Path(temp_dir), args.count, args.megapixels)
+        if not paths:
+            sys.exit("No photos found")
+
+        print(f"{len(paths)} photos, thumbnail {args.size}px, {args.rounds} round(s)")
+        print(f"{'mode':<8}{'thumbs/s':>10}{'ms/thumb':>10}{'peak RSS MB':>13}")
+        for mode in args.modes.split(","):
+            output = subprocess.run(
+                [
+                    sys.executable, __file__,
+                    "--worker", mode,
+                    "--paths", json.dumps([str(path) for path in paths]),
+                    "--size", str(args.size),
+                    "--rounds", str(args.rounds),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            rate = result["count"] / result["seconds"]
+            rss = result["peak_rss_mb"]
+            print(
+                f"{mode:<8}{rate:>10.1f}{1000 / rate:>10.1f}"
+                f"{(f'{rss:.0f}' if rss is not None else 'n/a'):>13}"
+            )
+
+
+if __name__ == "__main__":
+    main()
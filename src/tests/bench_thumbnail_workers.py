@@ -0,0 +1,98 @@
+"""
+缩略图生成并发基准：线程后端与进程后端在不同并发数下的吞吐
+
+两种后端都由 N 个线程提交任务（对应 QThreadPool 工作线程）：
+- threads：线程内直接解码与编码，受 GIL 限制
+- processes：线程把任务交给 N 个工作进程，只取回编码后的字节
+
+用法（在 src 目录下）：
+    python tests/bench_thumbnail_workers.py                     # 生成 32 张 12MP 测试照片
+    python tests/bench_thumbnail_workers.py --corpus ~/Photos --workers 1,4,16
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.thumbnail_worker import (  # noqa: E402
+    ProcessThumbnailRenderer,
+    ThumbnailRenderer,
+)
+from bench_thumbnail_decode import PHOTO_SUFFIXES, generate_corpus  # noqa: E402
+
+
+def _default_workers() -> str:
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return ",".join(str(count) for count in counts)
+
+
+def _measure(renderer: ThumbnailRenderer, threads: int, paths: list[Path], size: tuple[int, int]) -> float:
+    """返回吞吐（张/秒）"""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        # 预热：启动工作进程并完成导入，不计入耗时
+        list(executor.map(lambda path: renderer.render("image", path, size), paths[:threads]))
+        start = time.perf_counter()
+        results = list(executor.map(lambda path: renderer.render("image", path, size), paths))
+        elapsed = time.perf_counter() - start
+    failed = results.count(None)
+    if failed:
+        print(f"  warning: {failed} thumbnail(s) failed")
+    return len(paths) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="照片目录（默认生成测试照片）")
+    parser.add_argument("--count", type=int, default=32, help="生成的测试照片数量")
+    parser.add_argument("--megapixels", type=float, default=12.0, help="生成的测试照片像素数（百万）")
+    parser.add_argument("--size", type=int, default=256, help="缩略图边长（物理像素）")
+    parser.add_argument("--workers", default=_default_workers(), help="逗号分隔的并发数（默认 1 到 CPU 核数）")
+    args = parser.parse_args()
+    size = (args.size, args.size)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.corpus:
+            paths = sorted(
+                path for path in args.corpus.rglob("*") if path.suffix.lower() in PHOTO_SUFFIXES
+            )
+        else:
+            print(f"Generating {args.count} photos of {args.megapixels:g} MP...")
+            paths = generate_corpus(Path(temp_dir), args.count, args.megapixels)
+        if not paths:
+            sys.exit("No photos found")
+
+        print(f"{len(paths)} photos, thumbnail {args.size}px, {os.cpu_count()} CPU(s)")
+        print(f"{'workers':<9}{'threads/s':>11}{'speedup':>9}{'processes/s':>13}{'speedup':>9}")
+        baseline: dict[str, float] = {}
+        for workers in (int(value) for value in args.workers.split(",")):
+            rates = {}
+            for name, renderer in (
+                ("threads", ThumbnailRenderer()),
+                ("processes", ProcessThumbnailRenderer(workers)),
+            ):
+                try:
+                    rates[name] = _measure(renderer, workers, paths, size)
+                finally:
+                    renderer.close()
+                baseline.setdefault(name, rates[name])
+            print(
+                f"{workers:<9}"
+                f"{rates['threads']:>11.1f}{rates['threads'] / baseline['threads']:>8.2f}x"
+                f"{rates['processes']:>13.1f}{rates['processes'] / baseline['processes']:>8.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
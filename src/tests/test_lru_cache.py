@@ -0,0 +1,164 @@
+import random
+import threading
+
+import pytest
+
+from app.utils.cache_policy import EvictionPolicy
+from app.utils.lru_cache import LRUCache, ShardedLRUCache
+
+
+def test_lru_order_and_stats():
+    evicted = []
+    cache = LRUCache[str, int](max_size=2, eviction_callback=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert evicted == ["b"]
+    assert cache.get("b") is None
+    assert list(cache.keys()) == ["a", "c"]
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 1, 1)
+    assert stats.hit_rate == 0.5
+
+
+def test_sharded_cache_limits_and_snapshot():
+    cache = ShardedLRUCache[int, bytes](
+        max_size=64, max_memory_mb=1, size_callback=len, shards=4
+    )
+    for key in range(200):
+        cache.put(key, b"x" * 1024)
+    assert cache.shard_count == 4
+    # 整数键均匀分布到各分片
+    assert len(cache) == 64
+    assert cache.memory_usage == 1024 * len(cache)
+    assert sorted(cache.keys()) == sorted(key for key, _ in cache.items())
+    assert cache.get(199) == b"x" * 1024
+    # 超过单个分片内存上限的项不缓存
+    cache.put("big", b"x" * (512 * 1024))
+    assert "big" not in cache
+    assert cache.stats.evictions == 200 - 64 + 1
+    cache.clear()
+    assert len(cache) == 0 and cache.memory_usage == 0
+
+
+def test_sharded_cache_concurrent_stress():
+    removed = []
+    cache = ShardedLRUCache[int, int](
+        max_size=256,
+        size_callback=lambda value: 8,
+        eviction_callback=lambda key, value: removed.append(key),
+        shards=8,
+    )
+    threads = 8
+    rounds = 5000
+    counts = [[0, 0] for _ in range(threads)]  # puts, gets
+    start = threading.Barrier(threads)
+
+    def worker(index: int) -> None:
+        rng = random.Random(index)
+        start.wait()
+        for _ in range(rounds):
+            key = rng.randrange(1024)
+            operation = rng.random()
+            if operation < 0.5:
+                value = cache.get(key)
+                assert value is None or value == key
+                counts[index][1] += 1
+            elif operation < 0.9:
+                cache.put(key, key)
+                counts[index][0] += 1
+            else:
+                cache.remove(key)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    puts = sum(count[0] for count in counts)
+    gets = sum(count[1] for count in counts)
+    stats = cache.stats
+    # 每次写入的条目最终要么仍在缓存中，要么经过一次回调（覆盖、淘汰或移除）
+    assert puts == len(removed) + len(cache)
+    assert stats.hits + stats.misses == gets
+    assert len(cache) <= 256
+    assert cache.memory_usage == 8 * len(cache)
+    assert len(set(cache.keys())) == len(cache)
+
+
+@pytest.mark.parametrize("policy", ["lru", "2q", "tinylfu"])
+def test_policies_keep_limits(policy):
+    removed = []
+    cache = LRUCache[int, int](
+        max_size=50, eviction_callback=lambda key, value: removed.append(key), policy=policy
+    )
+    rng = random.Random(7)
+    puts = 0
+    for _ in range(5000):
+        key = rng.randrange(400)
+        if cache.get(key) is None:
+            cache.put(key, key)
+            puts += 1
+        elif rng.random() < 0.1:
+            cache.remove(key)
+    assert len(cache) <= 50
+    assert puts == len(removed) + len(cache)
+    assert all(cache.get(key) == key for key in list(cache.keys()))
+
+
+def test_scan_resistant_policies_keep_hot_items():
+    def survivors(policy: str) -> int:
+        cache = LRUCache[str, int](max_size=100, policy=policy)
+        hot = [f"hot{index}" for index in range(40)]
+
+        def access(keys) -> None:
+            for key in keys:
+                if cache.get(key) is None:
+                    cache.put(key, 0)
+
+        # 常用区域与其他区域交替浏览
+        for round_ in range(4):
+            access(hot)
+            access(f"other{round_}-{index}" for index in range(80))
+        # 一次快速滑过：大量只出现一次的键
+        access(f"scan{index}" for index in range(1000))
+        return sum(key in cache for key in hot)
+
+    assert survivors("lru") == 0
+    assert survivors("2q") == 40
+    assert survivors("tinylfu") == 40
+    with pytest.raises(ValueError):
+        LRUCache(policy="fifo")
+
+
+@pytest.mark.parametrize("policy", ["2q", "tinylfu"])
+def test_reput_keeps_hot_item(policy):
+    cache = LRUCache[str, int](max_size=20, policy=policy)
+    # 离开后再次访问，使 hot 进入主区（2Q 的 Am / W-TinyLFU 的保护段）
+    cache.put("hot", 0)
+    for _ in range(3):
+        cache.get("hot")
+    for index in range(20):
+        if cache.get(f"fill{index}") is None:
+            cache.put(f"fill{index}", 0)
+    if cache.get("hot") is None:
+        cache.put("hot", 0)
+    cache.get("hot")
+    # 重新写入（如重新加载后再放入缓存）不应降级为新条目
+    cache.put("hot", 1)
+    for index in range(200):
+        key = f"scan{index}"
+        if cache.get(key) is None:
+            cache.put(key, 0)
+    assert cache.get("hot") == 1
+
+
+def test_incomplete_policy_fails_when_built():
+    class OnlyInsert(EvictionPolicy[str]):
+        def on_insert(self, key: str) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        OnlyInsert(10)
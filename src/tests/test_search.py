@@ -1,2 +1,183 @@
+from pathlib import Path
+
+from app.config import AppConfig
+from app.core.search import SearchQuery
+from app.db.session import init_db
+from app.ui.controllers import AppController
+
+
 def test_search_placeholder():
     assert True
+
+
+def _make_controller(tmp_path: Path) -> AppController:
+    db_path = tmp_path / "data" / "test.db"
+    init_db(db_path)
+    return AppController(
+        AppConfig(
+            data_dir=tmp_path / "data",
+            db_path=db_path,
+            thumbs_dir=tmp_path / "thumbs",
+            default_workspace=tmp_path / "ws",
+        )
+    )
+
+
+def test_search_cache_invalidated_by_writes(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (workspace / "a.jpg").write_bytes(b"a")
+    controller = _make_controller(tmp_path)
+    controller.scan_workspace(workspace)
+
+    query = SearchQuery(root=str(workspace), types=("image",))
+    first = controller.search(query)
+    assert [r.name for r in first] == ["a.jpg"]
+    assert controller.search(query) == first
+
+    (workspace / "b.jpg").write_bytes(b"b")
+    controller.handle_file_changed(workspace / "b.jpg")
+    names = sorted(r.name for r in controller.search(query))
+    assert names == ["a.jpg", "b.jpg"]
+
+
+def test_search_pages_with_offset(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for index in range(7):
+        (workspace / f"f{index}.jpg").write_bytes(b"x")
+    controller = _make_controller(tmp_path)
+    controller.scan_workspace(workspace)
+
+    query = SearchQuery(root=str(workspace), sort_by="name")
+    pages = [controller.search(query, limit=3, offset=offset) for offset in (0, 3, 6)]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    names = [r.name for page in pages for r in page]
+    assert names == [r.name for r in controller.search(query)]
+
+
+def test_file_list_model_fetches_pages(tmp_path):
+    from app.ui.views.file_list_model import FileColumns, FileListModel
+
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for index in range(5):
+        (workspace / f"f{index}.jpg").write_bytes(b"x")
+    controller = _make_controller(tmp_path)
+    controller.scan_workspace(workspace)
+    query = SearchQuery(root=str(workspace), sort_by="name")
+
+    model = FileListModel()
+    model._page_size = 2
+    fetch = lambda offset, limit: controller.search(query, limit=limit, offset=offset)
+    model.set_columns(FileColumns.from_results(fetch(0, 2)), fetch)
+    assert model.rowCount() == 2
+    model.fetchMore()
+    assert model.rowCount() == 4
+    model.fetch_all()
+    assert not model.canFetchMore()
+    assert [model.item(row)["name"] for row in range(model.rowCount())] == [
+        f"f{index}.jpg" for index in range(5)
+    ]
+    assert model.index_for_id(model.file_id(3)).row() == 3
+
+
+def test_folder_queries_and_lazy_tree(tmp_path):
+    from app.ui.views.folder_tree_model import FolderTreeModel
+
+    workspace = tmp_path / "ws"
+    for folder in ("a/x", "b", "c"):
+        (workspace / folder).mkdir(parents=True)
+    (workspace / "top.jpg").write_bytes(b"x")
+    (workspace / "a" / "x" / "deep.jpg").write_bytes(b"x")
+    (workspace / "b" / "one.jpg").write_bytes(b"x")
+    (workspace / "b" / "two.txt").write_bytes(b"x")
+    controller = _make_controller(tmp_path)
+    controller.scan_workspace(workspace)
+
+    query = SearchQuery(root=str(workspace))
+    folders = controller.list_child_folders(query, str(workspace))
+    assert [(f.name, f.has_children) for f in folders] == [("a", True), ("b", False)]
+    images = SearchQuery(root=str(workspace), types=("image",), folder=str(workspace / "b"))
+    assert [r.name for r in controller.search(images)] == ["one.jpg"]
+    direct = SearchQuery(root=str(workspace), folder=str(workspace))
+    assert [r.name for r in controller.search(direct)] == ["top.jpg"]
+
+    calls: list[str] = []
+
+    def list_folders(parent):
+        calls.append(parent)
+        return controller.list_child_folders(query, parent)
+
+    model = FolderTreeModel()
+    model.set_root(str(workspace), list_folders)
+    assert calls == [] and model.hasChildren(model.index(0, 0))
+    deep = model.index_for_path(str(workspace / "a" / "x"))
+    assert deep.isValid() and deep.parent().parent() == model.index(0, 0)
+    assert calls == [str(workspace), str(workspace / "a")]
+    assert model.rowCount(model.index(0, 0)) == 2
+
+
+def test_file_list_model_patch_by_id(tmp_path):
+    from app.core.search import SearchResult
+    from app.ui.views.file_list_model import FileColumns, FileListModel
+
+    def result(file_id, name, size=1):
+        return SearchResult(file_id, f"/ws/{name}", name, "image", size, 1.0)
+
+    model = FileListModel()
+    model.set_columns(FileColumns.from_results(result(i, f"f{i}") for i in range(6)))
+    changed: list[int] = []
+    model.dataChanged.connect(lambda top, bottom, roles=(): changed.append(top.row()))
+
+    model.patch([result(4, "f4", size=2), result(9, "f9")], removed=[1, 2, 5])
+    assert [model.item(row)["name"] for row in range(model.rowCount())] == ["f0", "f3", "f4", "f9"]
+    assert model.item(2)["size"] == 2 and changed == [2]
+    assert model.index_for_id(9).row() == 3
+    assert not model.index_for_id(1).isValid()
+
+
+def test_watch_handlers_return_file_ids(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    controller = _make_controller(tmp_path)
+    path = workspace / "a.jpg"
+    path.write_bytes(b"a")
+
+    file_id = controller.handle_file_changed(path)
+    assert file_id is not None
+    assert [r.file_id for r in controller.match_files(SearchQuery(), [file_id])] == [file_id]
+    assert controller.handle_file_deleted(path) == file_id
+    assert controller.match_files(SearchQuery(), [file_id]) == []
+
+
+def test_new_query_clears_detail_panel(tmp_path):
+    import os
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    from app.ui.main_window import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (workspace / "a.jpg").write_bytes(b"a")
+    window = MainWindow(_make_controller(tmp_path).config)
+    # 窗口打开工作空间自己的数据库
+    controller = window.controller
+    controller.scan_workspace(workspace)
+    app.processEvents()
+
+    shown = controller.search(SearchQuery(root=str(workspace)))[0]
+    window.detail_panel.set_file(controller.get_file(shown.file_id))
+    window.selection_label.setText("1 items selected")
+    window.search_input.setText("a")
+    window._on_search()
+    assert window.detail_panel._current_file is None
+    assert window.selection_label.text() == "0 items selected"
+    # 同一查询只刷新，保留当前选择
+    window.detail_panel.set_file(controller.get_file(shown.file_id))
+    window._on_search()
+    assert window.detail_panel._current_file is not None
+    window.close()
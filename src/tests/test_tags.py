@@ -1,2 +1,269 @@
+from app.core.tag_index import TagBitmapIndex, bitmap_from_ids, ids_from_bitmap
+from app.core.search import SearchQuery
+from app.core.tag_manager import TagSpec
+from app.db.repo import Repo
+from app.db.session import get_session, get_tag_index, init_db
+
+
 def test_tag_placeholder():
     assert True
+
+
+def test_bitmap_roundtrip():
+    ids = [0, 3, 7, 8, 1000, 123457]
+    assert ids_from_bitmap(bitmap_from_ids(ids)) == ids
+    assert ids_from_bitmap(0) == []
+
+
+def test_tag_index_set_operations():
+    index = TagBitmapIndex.from_pairs([(1, 10), (2, 10), (3, 10), (2, 20), (3, 30)])
+    assert index.file_ids(index.match_all([10, 20])) == [2]
+    assert index.file_ids(index.match_any([20, 30])) == [2, 3]
+    assert index.file_ids(index.exclude(index.bitmap(10), [20])) == [1, 3]
+    index.remove_files([2])
+    assert index.file_ids(index.bitmap(10)) == [1, 3]
+    index.replace([1], [30])
+    assert index.file_ids(index.bitmap(30)) == [1, 3]
+    assert index.count(10) == 1
+
+
+def test_tag_index_persistence(tmp_path):
+    index = TagBitmapIndex.from_pairs([(5, 1), (9, 1), (9, 2)])
+    path = tmp_path / "tags.tagidx"
+    assert index.save(path, (3, 23, 4))
+    assert TagBitmapIndex.load(path, (3, 23, 5)) is None
+    loaded = TagBitmapIndex.load(path, (3, 23, 4))
+    assert loaded is not None
+    assert loaded.file_ids(loaded.match_all([1, 2])) == [9]
+
+
+def test_repo_tag_search_tracks_commits(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (workspace / name).write_bytes(b"x")
+    init_db(tmp_path / "tags.db")
+    session = get_session()
+    try:
+        from app.services.scan_service import ScanService
+
+        ScanService(session).scan_workspace(workspace)
+        repo = Repo(session)
+        ids = {str(f.name): int(f.id) for f in repo.list_files()}
+        travel, work = repo.bulk_create_tags([TagSpec("travel"), TagSpec("work")])
+        session.flush()
+        get_tag_index()
+        repo.attach_tags_to_files([ids["a.jpg"], ids["b.jpg"]], [travel.id])
+        repo.attach_tags_to_files([ids["b.jpg"]], [work.id])
+        session.commit()
+
+        def names(query: SearchQuery) -> list[str]:
+            return sorted(r.name for r in repo.search(query))
+
+        assert names(SearchQuery(tags=("travel", "work"), match_all_tags=True)) == ["b.jpg"]
+        assert names(SearchQuery(tags=("travel", "work"))) == ["a.jpg", "b.jpg"]
+
+        repo.delete_files([ids["b.jpg"]])
+        session.rollback()
+        assert names(SearchQuery(tags=("work",))) == ["b.jpg"]
+        repo.delete_files([ids["b.jpg"]])
+        session.commit()
+        assert names(SearchQuery(tags=("travel",))) == ["a.jpg"]
+    finally:
+        session.close()
+
+
+def test_parse_tag_expression():
+    from app.core.tag_expr import (
+        TagAnd,
+        TagExpressionError,
+        TagNot,
+        TagOr,
+        TagTerm,
+        parse_tag_expression,
+    )
+
+    expr = parse_tag_expression('(travel OR work) AND NOT draft "my pics"')
+    assert expr == TagAnd(
+        (
+            TagOr((TagTerm("travel"), TagTerm("work"))),
+            TagNot(TagTerm("draft")),
+            TagTerm("my pics"),
+        )
+    )
+    assert parse_tag_expression("a -b") == TagAnd((TagTerm("a"), TagNot(TagTerm("b"))))
+    for bad in ("", "(a", "a OR", '"a', "a )"):
+        try:
+            parse_tag_expression(bad)
+        except TagExpressionError:
+            continue
+        raise AssertionError(f"expected syntax error for {bad!r}")
+
+
+def test_evaluate_tag_expression():
+    from app.core.tag_expr import evaluate_tag_expression, parse_tag_expression
+
+    bitmaps = {
+        "travel": bitmap_from_ids([1, 2, 3]),
+        "work": bitmap_from_ids([3, 4]),
+        "draft": bitmap_from_ids([2, 4]),
+    }
+
+    def run(text):
+        bitmap, negated = evaluate_tag_expression(parse_tag_expression(text), bitmaps)
+        return ids_from_bitmap(bitmap), negated
+
+    assert run("(travel OR work) AND NOT draft") == ([1, 3], False)
+    assert run("NOT draft") == ([2, 4], True)
+    assert run("NOT draft OR work") == ([2], True)
+    assert run("travel AND missing") == ([], False)
+
+
+def test_repo_tag_expression_search(tmp_path):
+    from app.core.tag_expr import parse_tag_expression
+
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg", "d.jpg"):
+        (workspace / name).write_bytes(b"x")
+    init_db(tmp_path / "expr.db")
+    session = get_session()
+    try:
+        from app.services.scan_service import ScanService
+
+        ScanService(session).scan_workspace(workspace)
+        repo = Repo(session)
+        ids = {str(f.name): int(f.id) for f in repo.list_files()}
+        travel, work, draft = repo.bulk_create_tags(
+            [TagSpec("travel"), TagSpec("work"), TagSpec("draft")]
+        )
+        session.flush()
+        repo.attach_tags_to_files([ids["a.jpg"], ids["b.jpg"]], [travel.id])
+        repo.attach_tags_to_files([ids["c.jpg"]], [work.id])
+        repo.attach_tags_to_files([ids["b.jpg"], ids["c.jpg"]], [draft.id])
+        session.commit()
+
+        for text, expected in (
+            ("(travel OR work) AND NOT draft", ["a.jpg"]),
+            ("NOT draft", ["a.jpg", "d.jpg"]),
+            ("work OR -travel", ["c.jpg", "d.jpg"]),
+        ):
+            expr = parse_tag_expression(text)
+            for use_index in (True, False):
+                query = SearchQuery(tag_expr=expr, use_tag_index=use_index)
+                assert sorted(r.name for r in repo.search(query)) == expected
+    finally:
+        session.close()
+
+
+def test_tag_counts_maintained_by_triggers(tmp_path):
+    from app.core.indexer import FileMeta
+
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for name in ("a.jpg", "b.mp4", "c.jpg"):
+        (workspace / name).write_bytes(b"x")
+    init_db(tmp_path / "counts.db")
+    session = get_session()
+    try:
+        from app.services.scan_service import ScanService
+
+        ScanService(session).scan_workspace(workspace)
+        repo = Repo(session)
+        files = {str(f.name): f for f in repo.list_files()}
+        ids = {name: int(f.id) for name, f in files.items()}
+        (travel,) = repo.bulk_create_tags([TagSpec("travel")])
+        session.flush()
+        repo.attach_tags_to_files(list(ids.values()), [travel.id])
+        session.commit()
+
+        def counts():
+            tag = repo.get_tag_by_name("travel")
+            session.refresh(tag)
+            return tag.file_count, repo.tag_type_counts().get(int(tag.id), {})
+
+        assert counts() == (3, {"image": 2, "video": 1})
+
+        repo.remove_tags_from_file(files["a.jpg"], [travel])
+        session.commit()
+        assert counts() == (2, {"image": 1, "video": 1})
+
+        c_path = workspace / "c.jpg"
+        repo.update_file_meta(
+            files["c.jpg"],
+            FileMeta(c_path, "c.jpg", "jpg", 1, "video", None, None),
+        )
+        session.commit()
+        assert counts() == (2, {"video": 2})
+
+        repo.delete_files([ids["b.mp4"]])
+        session.commit()
+        assert counts() == (1, {"video": 1})
+    finally:
+        session.close()
+
+
+def test_bulk_tagging(tmp_path):
+    from app.config import AppConfig
+    from app.ui.controllers import AppController
+
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for index in range(25):
+        (workspace / f"f{index}.jpg").write_bytes(b"x")
+    init_db(tmp_path / "bulk.db")
+    controller = AppController(
+        AppConfig(tmp_path, tmp_path / "bulk.db", tmp_path / "thumbs", workspace)
+    )
+    controller.scan_workspace(workspace)
+    file_ids = [r.file_id for r in controller.search(SearchQuery())]
+    controller.create_tag("a")
+    controller.create_tag("b")
+    tag_ids = {t.name: t.id for t in controller.list_tags()}
+
+    index = get_tag_index()
+    progress = []
+    controller.attach_tags_bulk(
+        file_ids + [99999], [tag_ids["a"]], on_progress=lambda done, total: progress.append(done)
+    )
+    assert progress[-1] == len(file_ids) + 1
+    counts = {t.name: t.file_count for t in controller.list_tags()}
+    assert counts == {"a": 25, "b": 0}
+    # 不存在的文件 ID 不在位图索引中留下标记
+    assert index.file_ids(index.bitmap(tag_ids["a"])) == sorted(file_ids)
+
+    controller.replace_tags_bulk(file_ids[:10], [tag_ids["b"]])
+    controller.remove_tags_bulk(file_ids[20:], [tag_ids["a"]])
+    counts = {t.name: t.file_count for t in controller.list_tags()}
+    assert counts == {"a": 10, "b": 10}
+    assert len(controller.search(SearchQuery(tags=("a",)))) == 10
+    assert [t.name for t in controller.tags_for_file(file_ids[0])] == ["b"]
+
+
+def test_tag_index_stamp_detects_swapped_tags(tmp_path):
+    from app.db.session import _tag_index_stamp
+    from app.services.scan_service import ScanService
+
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for name in ("a.jpg", "b.jpg"):
+        (workspace / name).write_bytes(b"x")
+    init_db(tmp_path / "stamp.db")
+    session = get_session()
+    try:
+        ScanService(session).scan_workspace(workspace)
+        repo = Repo(session)
+        a, b = sorted(int(f.id) for f in repo.list_files())
+        first, second = repo.bulk_create_tags([TagSpec("first"), TagSpec("second")])
+        session.flush()
+        repo.attach_tags_to_files([a], [first.id])
+        repo.attach_tags_to_files([b], [second.id])
+        session.commit()
+        before = _tag_index_stamp(session.connection())
+        # 交换两个文件的标签：行数与 ID 和都不变
+        repo.replace_tags_for_files([a], [second.id])
+        repo.replace_tags_for_files([b], [first.id])
+        session.commit()
+        assert _tag_index_stamp(session.connection()) != before
+    finally:
+        session.close()
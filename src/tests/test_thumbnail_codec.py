@@ -0,0 +1,240 @@
+from io import BytesIO
+import os
+import struct
+import sys
+import threading
+import time
+
+from PIL import Image, JpegImagePlugin
+
+from app.services import thumbnail_codec, thumbnail_worker
+from app.services.thumbnail_codec import decode_thumbnail
+from app.services.thumbnail_service import ThumbnailService, ThumbnailSize, ThumbnailSource
+from app.services.thumbnail_worker import (
+    ProcessThumbnailRenderer,
+    close_thumbnail_renderers,
+    render_image,
+    render_video,
+    render_video_sheet,
+)
+
+
+def _exif_with_thumbnail(thumbnail: Image.Image, orientation: int = 1) -> bytes:
+    """APP1 数据：IFD0 记录方向，IFD1 指向内嵌 JPEG 缩略图"""
+    buffer = BytesIO()
+    thumbnail.save(buffer, "JPEG")
+    data = buffer.getvalue()
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHLHH", 0x0112, 3, 1, orientation, 0) + struct.pack("<L", 26)
+    ifd1 = (
+        struct.pack("<H", 2)
+        + struct.pack("<HHLL", 0x0201, 4, 1, 56)
+        + struct.pack("<HHLL", 0x0202, 4, 1, len(data))
+        + struct.pack("<L", 0)
+    )
+    return b"Exif\x00\x00" + b"II*\x00" + struct.pack("<L", 8) + ifd0 + ifd1 + data
+
+
+def _photo(tmp_path, size, thumbnail_size=None, orientation=1):
+    path = tmp_path / "photo.jpg"
+    image = Image.new("RGB", size, (200, 40, 40))
+    thumbnail = Image.new("RGB", thumbnail_size or (8, 8), (40, 200, 40))
+    image.save(path, "JPEG", exif=_exif_with_thumbnail(thumbnail, orientation))
+    return path
+
+
+def test_decode_uses_large_enough_exif_thumbnail(tmp_path):
+    path = _photo(tmp_path, (1600, 1200), thumbnail_size=(160, 120))
+    thumb = decode_thumbnail(path, (128, 128))
+    assert thumb.size == (128, 96)
+    assert thumb.getpixel((64, 48))[1] > 150  # 来自内嵌缩略图
+
+    # 内嵌缩略图不够大时解码原图
+    thumb = decode_thumbnail(path, (256, 256))
+    assert thumb.size == (256, 192)
+    assert thumb.getpixel((128, 96))[0] > 150
+
+
+def test_decode_drafts_jpeg_and_applies_orientation(tmp_path, monkeypatch):
+    path = _photo(tmp_path, (2000, 1000), orientation=6)
+    drafted = []
+    original = JpegImagePlugin.JpegImageFile.draft
+
+    def draft(self, mode, size):
+        drafted.append(size)
+        return original(self, mode, size)
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", draft)
+    thumb = decode_thumbnail(path, (100, 200))
+    # 旋转 90° 后为竖图；draft 按旋转前的方向请求
+    assert thumb.size == (100, 200)
+    gap = thumbnail_codec.REDUCING_GAP
+    assert drafted[0] == (int(200 * gap), int(100 * gap))
+
+
+def test_process_renderer_returns_encoded_thumbnail(tmp_path):
+    path = _photo(tmp_path, (800, 600))
+    service = ThumbnailService(tmp_path / "thumbs", render_workers=2)
+    try:
+        size = ThumbnailSize((64, 64))
+        source = ThumbnailSource(path)
+        assert service._ensure_disk_image(source, size)
+        data = service._store.read(service._cache_key(source, "image", size))
+        # 工作进程与线程内生成的结果一致
+        # 按尺寸档位生成：64px 请求落在 128 档
+        assert data == render_image(str(path), (128, 128))
+        with Image.open(BytesIO(data)) as thumb:
+            assert thumb.size == (128, 96)
+        assert service._renderer.render("image", tmp_path / "missing.jpg", (64, 64)) is None
+    finally:
+        close_thumbnail_renderers()
+
+
+# 模拟 ffmpeg：-ss 1 时没有输出（短视频），名字含 corrupt 时卡住，否则向 stdout 写一帧 PPM
+FAKE_FFMPEG = """\
+import sys, time
+args = sys.argv[1:]
+with open(sys.argv[0] + ".log", "a") as log:
+    log.write(" ".join(args) + "\\n")
+if "corrupt" in args[args.index("-i") + 1]:
+    time.sleep(30)
+if args[args.index("-ss") + 1] != "0":
+    sys.exit(1)
+sys.stdout.buffer.write(b"P6 4 2 255\\n" + bytes([0, 0, 255]) * 8)
+"""
+
+
+# 模拟 ffmpeg：只有 -i 时输出时长，否则输出 2x2 帧横向拼接的 PPM
+FAKE_FFMPEG_SHEET = """\
+import sys
+args = sys.argv[1:]
+with open(sys.argv[0] + ".log", "a") as log:
+    log.write(" ".join(args) + "\\n")
+if "pipe:1" not in args:
+    sys.stderr.write("  Duration: 00:00:10.00, start: 0.000000, bitrate: 1 kb/s\\n")
+    sys.exit(1)
+frames = args.count("-i")
+sys.stdout.buffer.write(f"P6 {2 * frames} 2 255\\n".encode() + bytes([255, 0, 0]) * (4 * frames))
+"""
+
+
+def _fake_ffmpeg(tmp_path, source):
+    script = tmp_path / "ffmpeg.py"
+    script.write_text(source)
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(f"#!/bin/sh\nexec {sys.executable} {script} \"$@\"\n")
+    ffmpeg.chmod(0o755)
+    (tmp_path / "clip.mp4").write_bytes(b"x")
+    return ffmpeg
+
+
+def test_render_video_pipes_frame_and_times_out(tmp_path, monkeypatch):
+    ffmpeg = _fake_ffmpeg(tmp_path, FAKE_FFMPEG)
+
+    data = render_video(str(tmp_path / "clip.mp4"), (64, 64), str(ffmpeg))
+    with Image.open(BytesIO(data)) as thumb:
+        assert thumb.size == (4, 2)
+        assert thumb.convert("RGB").getpixel((0, 0))[2] > 200
+    calls = (tmp_path / "ffmpeg.py.log").read_text().splitlines()
+    # 先在 1s 处抓帧，没有输出时回退到第一帧；帧经管道输出，不写临时文件
+    assert [call.split("-ss ")[1].split()[0] for call in calls] == ["1", "0"]
+    assert calls[-1].endswith("-f image2pipe -c:v ppm pipe:1")
+
+    monkeypatch.setattr(thumbnail_worker, "FFMPEG_TIMEOUT", 0.5)
+    (tmp_path / "corrupt.mp4").write_bytes(b"x")
+    assert render_video(str(tmp_path / "corrupt.mp4"), (64, 64), str(ffmpeg)) is None
+    assert len((tmp_path / "ffmpeg.py.log").read_text().splitlines()) == 3
+
+
+def test_video_sheet_seeks_evenly_in_one_call(tmp_path, monkeypatch):
+    ffmpeg = _fake_ffmpeg(tmp_path, FAKE_FFMPEG_SHEET)
+    data = render_video_sheet(str(tmp_path / "clip.mp4"), (64, 64), str(ffmpeg), 4)
+    with Image.open(BytesIO(data)) as sheet:
+        assert sheet.size == (8, 2)
+    probe, extract = (tmp_path / "ffmpeg.py.log").read_text().splitlines()
+    assert "pipe:1" not in probe
+    seeks = extract.split("-ss ")[1:]
+    assert [seek.split()[0] for seek in seeks] == ["1.250", "3.750", "6.250", "8.750"]
+    assert "hstack=inputs=4" in extract
+
+    service = ThumbnailService(tmp_path / "thumbs", video_sheet_frames=4)
+    monkeypatch.setattr(service, "_ffmpeg_bin", lambda: str(ffmpeg))
+    source = ThumbnailSource(tmp_path / "clip.mp4")
+    image = service.load_thumbnail_image(source, "sheet", ThumbnailSize((64, 64)))
+    assert image is not None and image.width() == 8
+    # 帧数参与缓存键
+    assert service._cache_key(source, "sheet", ThumbnailSize((64, 64))).startswith("sheet4:")
+
+
+def test_size_buckets_share_keys_and_downscale_from_larger(tmp_path, monkeypatch):
+    path = _photo(tmp_path, (1600, 1200))
+    service = ThumbnailService(tmp_path / "thumbs")
+    source = ThumbnailSource(path, 1, 100, 1.0)
+    # 不同逻辑尺寸与 DPR 落在同一档位时共用缓存键
+    assert ThumbnailSize((100, 100)).size_key == ThumbnailSize((20, 20)).size_key == "b128"
+    assert ThumbnailSize((200, 150), 2.0).bucket == 512
+    assert ThumbnailSize((4000, 10)).bucket == 1024
+
+    assert service._ensure_disk_image(source, ThumbnailSize((500, 400)))
+    # 更小的档位由已缓存的 512 档缩小生成，不再解码源文件
+    monkeypatch.setattr(service._renderer, "render", lambda *args, **kwargs: None)
+    small = ThumbnailSize((100, 100))
+    assert service._ensure_disk_image(source, small)
+    data = service._store.read(service._cache_key(source, "image", small))
+    with Image.open(BytesIO(data)) as thumb:
+        assert thumb.size == (128, 96)
+    # 更大的档位没有可用的来源
+    assert not service._ensure_disk_image(source, ThumbnailSize((1000, 1000)))
+
+
+def test_process_renderer_terminates_hung_worker(tmp_path, monkeypatch):
+    ffmpeg = _fake_ffmpeg(tmp_path, FAKE_FFMPEG)
+    (tmp_path / "corrupt.mp4").write_bytes(b"x")
+    renderer = ProcessThumbnailRenderer(1)
+    monkeypatch.setattr(thumbnail_worker, "RENDER_TIMEOUT", 2.0)
+    try:
+        terminated = []
+        terminate = thumbnail_worker._terminate
+
+        def record_terminate(pid):
+            terminated.append(pid)
+            terminate(pid)
+
+        monkeypatch.setattr(thumbnail_worker, "_terminate", record_terminate)
+        # 卡住的任务超时后终止工作进程并重建进程池
+        assert renderer.render("video", tmp_path / "corrupt.mp4", (64, 64), str(ffmpeg)) is None
+        assert len(terminated) == 1
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                os.kill(terminated[0], 0)
+            except ProcessLookupError:
+                break
+            time.sleep(0.05)
+        else:
+            raise AssertionError("hung worker is still running")
+        assert renderer._executor is None
+        assert renderer.render("video", tmp_path / "clip.mp4", (64, 64), str(ffmpeg)) is not None
+    finally:
+        renderer.close()
+
+
+def test_process_renderer_timeout_excludes_queueing(tmp_path, monkeypatch):
+    slow = FAKE_FFMPEG.replace("import sys, time\n", "import sys, time\ntime.sleep(0.5)\n")
+    ffmpeg = _fake_ffmpeg(tmp_path, slow)
+    renderer = ProcessThumbnailRenderer(1)
+    monkeypatch.setattr(thumbnail_worker, "RENDER_TIMEOUT", 3.0)
+    results = []
+
+    def render():
+        results.append(renderer.render("video", tmp_path / "clip.mp4", (64, 64), str(ffmpeg)))
+
+    try:
+        # 四个任务排队等待同一个工作进程，总耗时超过超时时间，但每个任务本身不超时
+        threads = [threading.Thread(target=render) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 4 and all(results)
+    finally:
+        renderer.close()
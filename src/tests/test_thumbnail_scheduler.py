@@ -0,0 +1,112 @@
+from app.services.thumbnail_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_PRELOAD,
+    PRIORITY_VISIBLE,
+    ThumbnailScheduler,
+)
+
+
+class _ManualPool:
+    """只记录工作者，由测试手动执行（模拟单线程池）"""
+
+    def __init__(self) -> None:
+        self.workers = []
+
+    def maxThreadCount(self) -> int:
+        return 1
+
+    def start(self, runnable, priority: int = 0) -> None:
+        self.workers.append(runnable)
+
+    def drain(self) -> None:
+        while self.workers:
+            self.workers.pop(0).run()
+
+
+class _FakeService:
+    def __init__(self) -> None:
+        self.generated: list[str] = []
+
+    def ensure_thumbnail(self, source, kind, size) -> bool:
+        self.generated.append(source)
+        return True
+
+    def load_thumbnail_image(self, source, kind, size):
+        self.generated.append(source)
+        return source
+
+    def read_thumbnail_image(self, cache_key):
+        return cache_key
+
+
+def test_scheduler_orders_and_dedupes_jobs():
+    pool = _ManualPool()
+    service = _FakeService()
+    scheduler = ThumbnailScheduler(service, pool)
+    delivered = []
+    listener = lambda key, image: delivered.append((key, image))  # noqa: E731
+
+    scheduler.submit("bg", "bg", "image", None, PRIORITY_BACKGROUND, pinned=True)
+    scheduler.replace_preload([(f"p{i}", f"p{i}", "image", None) for i in range(3)])
+    scheduler.submit("v", "v", "image", None, PRIORITY_VISIBLE, listener=listener)
+    # 重复请求合并，并把预加载任务提升为可视项
+    scheduler.submit("v", "v", "image", None, PRIORITY_VISIBLE, listener=listener)
+    scheduler.submit("p2", "p2", "image", None, PRIORITY_VISIBLE, listener=listener)
+    # 新的预加载范围：p0 离开范围被取消，p1 重新排位到 p3 之后
+    scheduler.replace_preload([("p3", "p3", "image", None), ("p1", "p1", "image", None)])
+    assert len(pool.workers) == 1
+    assert scheduler.stats["queued"] == 5
+    assert scheduler.busy
+
+    pool.drain()
+    assert service.generated == ["v", "p2", "p3", "p1", "bg"]
+    assert delivered == [("v", "v"), ("v", "v"), ("p2", "p2")]
+    stats = scheduler.stats
+    assert stats["queued"] == stats["running"] == 0
+    assert stats["deduped"] == 2
+    assert stats["cancelled"] == 1
+    assert stats["completed"] == 5
+    assert not scheduler.busy
+
+
+def test_scheduler_cancels_per_listener():
+    pool = _ManualPool()
+    service = _FakeService()
+    scheduler = ThumbnailScheduler(service, pool)
+    first, second = [], []
+    on_first = lambda key, image: first.append(key)  # noqa: E731
+    on_second = lambda key, image: second.append(key)  # noqa: E731
+
+    scheduler.submit("a", "a", "image", None, listener=on_first)
+    scheduler.submit("a", "a", "image", None, listener=on_second)
+    job = scheduler.submit("b", "b", "image", None, listener=on_first)
+    # 还有其他接收方时任务保留
+    assert not scheduler.cancel("a", on_first)
+    assert scheduler.cancel("b", on_first)
+    assert job.state == "cancelled"
+    # 等待结果的任务不随接收方取消
+    pinned = scheduler.submit("c", "c", "image", None, PRIORITY_PRELOAD, pinned=True)
+    assert not scheduler.cancel("c", on_first)
+
+    pool.drain()
+    assert service.generated == ["a", "c"]
+    assert first == [] and second == ["a"]
+    assert pinned.wait(0)
+
+
+def test_scheduler_releases_background_jobs():
+    pool = _ManualPool()
+    service = _FakeService()
+    scheduler = ThumbnailScheduler(service, pool)
+    on_visible = lambda key, image: None  # noqa: E731
+
+    dropped = scheduler.submit("a", "a", "image", None, PRIORITY_BACKGROUND, pinned=True)
+    scheduler.submit("b", "b", "image", None, PRIORITY_BACKGROUND, pinned=True)
+    scheduler.submit("b", "b", "image", None, PRIORITY_VISIBLE, listener=on_visible)
+    # 放弃等待：无人需要的排队任务丢弃，界面已合并的任务保留
+    assert scheduler.release("a")
+    assert dropped.done and not dropped.wait(0)
+    assert not scheduler.release("b")
+
+    pool.drain()
+    assert service.generated == ["b"]
@@ -0,0 +1,287 @@
+from pathlib import Path
+import os
+import threading
+import time
+
+from PIL import Image
+
+from app.db.repo import Repo
+from app.db.session import current_db_key, get_session, init_db
+from app.services.scan_service import ScanService
+from app.services.thumbnail_manifest import ThumbnailManifest
+from app.services.thumbnail_precompute import CURSOR_DONE, ThumbnailPrecomputer
+from app.services.thumbnail_service import ThumbnailService, ThumbnailSize, ThumbnailSource
+from app.services.thumbnail_store import FileThumbnailStore, PackedThumbnailStore
+
+
+def test_file_store_roundtrip(tmp_path):
+    store = FileThumbnailStore(tmp_path, ".webp")
+    assert store.read("k") is None
+    assert store.write("k", b"data")
+    assert store.contains("k")
+    assert store.read("k") == b"data"
+    assert store.path_for("k").suffix == ".webp"
+
+
+def test_pack_store_roundtrip_and_reopen(tmp_path):
+    store = PackedThumbnailStore(tmp_path)
+    for index in range(20):
+        assert store.write(f"key{index}", bytes([index]) * (index + 1))
+    assert store.read("key7") == bytes([7]) * 8
+    assert not store.contains("missing")
+    store.close()
+
+    reopened = PackedThumbnailStore(tmp_path)
+    assert reopened.read("key19") == bytes([19]) * 20
+    assert reopened.stats().entries == 20
+    reopened.close()
+
+
+def test_pack_store_rolls_and_compacts(tmp_path):
+    store = PackedThumbnailStore(tmp_path, pack_max_bytes=64)
+    for index in range(8):
+        store.write(f"key{index}", b"x" * 30)
+    assert store.stats().packs > 1
+
+    # 覆盖与删除只产生失效字节
+    store.write("key0", b"y" * 30)
+    store.remove(["key1", "key2", "key3"])
+    before = store.stats()
+    assert before.dead_bytes == 4 * 30
+
+    reclaimed = store.compact()
+    after = store.stats()
+    assert reclaimed > 0
+    assert after.entries == 5
+    assert store.read("key0") == b"y" * 30
+    assert store.read("key7") == b"x" * 30
+    assert store.read("key1") is None
+    pack_files = list((tmp_path / "packs").glob("pack-*.bin"))
+    assert len(pack_files) == after.packs
+    store.close()
+
+
+def test_pack_compaction_copies_without_lock(tmp_path):
+    store = PackedThumbnailStore(tmp_path, pack_max_bytes=64)
+    store.write("keep", b"k" * 20)
+    store.write("moved", b"m" * 20)
+    store.write("dead", b"d" * 20)
+    store.remove(["dead"])
+    copy_entries = store._copy_entries
+
+    def copy_while_others_run(pack_id, target_id, rows):
+        moves = copy_entries(pack_id, target_id, rows)
+        # 复制期间其他线程的读写不被阻塞
+        worker = threading.Thread(
+            target=lambda: (store.read("keep"), store.write("moved", b"n" * 20))
+        )
+        worker.start()
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+        return moves
+
+    store._copy_entries = copy_while_others_run
+    assert store.compact(dead_ratio=0.2) > 0
+    assert store.read("keep") == b"k" * 20
+    # 复制期间被覆盖的条目保留新数据
+    assert store.read("moved") == b"n" * 20
+    assert store.stats().entries == 2
+    store.close()
+
+
+def test_stores_purge_untracked(tmp_path):
+    file_store = FileThumbnailStore(tmp_path / "files", ".jpg")
+    pack_store = PackedThumbnailStore(tmp_path / "packs")
+    for store in (file_store, pack_store):
+        store.write("kept", b"1")
+        store.write("legacy", b"2")
+        # 快照之后写入的条目可能尚未登记到清单，保留
+        assert store.purge_untracked({"kept"}, time.time() - 60) == 0
+        assert store.purge_untracked({"kept"}, time.time() + 1) == 1
+        assert store.read("kept") == b"1"
+        assert store.read("legacy") is None
+    pack_store.close()
+
+
+def test_manifest_eviction_queries(tmp_path):
+    manifest = ThumbnailManifest(tmp_path)
+    manifest.record("a", "db", 1, 100)
+    manifest.record("b", "db", 2, 100)
+    manifest.record("c", None, None, 100)
+    manifest._db().execute("UPDATE thumbnails SET last_access = 0 WHERE key = 'a'")
+    assert manifest.expired_keys(max_age_days=30) == ["a"]
+
+    manifest.touch("a")
+    assert manifest.flush_access() == 1
+    assert manifest.expired_keys(max_age_days=30) == []
+    # a 刚被访问，预算超出时先淘汰 b
+    manifest._db().execute("UPDATE thumbnails SET last_access = 1 WHERE key = 'b'")
+    assert manifest.over_budget_keys(250) == ["b"]
+    assert sorted(manifest.file_ids("db")) == [1, 2]
+    assert manifest.keys_for_files("db", [2]) == ["b"]
+    manifest.delete(["b"])
+    assert manifest.totals() == (2, 200)
+    manifest.close()
+
+
+def test_cleanup_removes_orphan_thumbnails(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for name in ("a.jpg", "b.jpg"):
+        (workspace / name).write_bytes(b"x")
+    init_db(tmp_path / "thumbs.db")
+    session = get_session()
+    try:
+        ScanService(session).scan_workspace(workspace)
+        session.commit()
+        files = {str(f.name): f for f in Repo(session).list_files()}
+        service = ThumbnailService(tmp_path / "thumbs")
+        size = ThumbnailSize((64, 64))
+        keys = {}
+        for name, file_row in files.items():
+            source = ThumbnailSource(
+                Path(str(file_row.path)), int(file_row.id), file_row.size, file_row.modified_at
+            )
+            keys[name] = service._cache_key(source, "image", size)
+            with Image.new("RGB", (32, 32)) as image:
+                assert service._save_thumbnail(image, keys[name], (64, 64), source)
+        # 清单建立前的旧缓存
+        service._store.write("legacy", b"old")
+        old = time.time() - 3600
+        os.utime(service._store.path_for("legacy"), (old, old))
+
+        Repo(session).delete_files([int(files["b.jpg"].id)])
+        session.commit()
+        assert service.cleanup_old_cache_files() == 2
+        assert service._store.contains(keys["a.jpg"])
+        assert not service._store.contains(keys["b.jpg"])
+        assert not service._store.contains("legacy")
+        assert service._manifest.totals()[0] == 1
+    finally:
+        session.close()
+
+
+def test_manifest_lfu_eviction_and_totals(tmp_path):
+    manifest = ThumbnailManifest(tmp_path)
+    for key in ("hot", "warm", "cold"):
+        manifest.record(key, None, None, 100)
+    for _ in range(4):
+        manifest.touch("hot")
+    manifest.touch("warm")
+    manifest.flush_access()
+    assert manifest.totals() == (3, 300)
+
+    # LRU 淘汰最久未访问的 cold；LFU 同样先淘汰命中最少的 cold，然后是 warm
+    assert manifest.over_budget_keys(200, "lru") == ["cold"]
+    assert manifest.over_budget_keys(100, "lfu") == ["cold", "warm"]
+    # LFU 淘汰后命中次数减半
+    assert manifest._db().execute("SELECT hits FROM thumbnails WHERE key = 'hot'").fetchone()[0] == 2
+
+    manifest.delete(["cold"])
+    manifest.record("hot", None, None, 50)
+    assert manifest.totals() == (2, 150)
+    manifest.close()
+
+
+def test_cleanup_enforces_disk_budget(tmp_path):
+    service = ThumbnailService(tmp_path / "thumbs")
+    service._cleanup_lock.acquire()  # 禁止写入时自动触发后台清理
+    for index in range(8):
+        source = ThumbnailSource(tmp_path / f"{index}.jpg")
+        with Image.effect_noise((64, 64), 64).convert("RGB") as image:
+            assert service._save_thumbnail(image, f"k{index}", (64, 64), source)
+    _, written = service._manifest.totals()
+    service.disk_budget_mb = written / 2 / 1024 / 1024
+    service._manifest.touch("k0")
+
+    assert service.cleanup_old_cache_files() > 0
+    _, total = service._manifest.totals()
+    assert total <= written / 2
+    assert service._store.contains("k0")
+    assert not service._store.contains("k1")
+    assert service.cache_stats["disk_mb"] == round(total / 1024 / 1024, 2)
+
+
+def test_schedule_cleanup_starts_one_task(tmp_path):
+    service = ThumbnailService(tmp_path / "thumbs")
+    started = []
+
+    class _Pool:
+        def start(self, task, priority=0):
+            started.append(task)
+
+    service._thread_pool = _Pool()
+    threads = [threading.Thread(target=service._schedule_cleanup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(started) == 1
+    # 任务结束后释放，可以再次提交
+    started[0].run()
+    service._schedule_cleanup()
+    assert len(started) == 2
+
+def test_precompute_resumes_from_cursor(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        Image.new("RGB", (80, 60), (200, 40, 40)).save(workspace / name)
+    (workspace / "notes.txt").write_text("x")
+    init_db(tmp_path / "precompute.db")
+    session = get_session()
+    try:
+        ScanService(session).scan_workspace(workspace)
+        session.commit()
+        files = sorted(Repo(session).list_files(), key=lambda row: row.id)
+    finally:
+        session.close()
+
+    service = ThumbnailService(tmp_path / "thumbs")
+    size = ThumbnailSize((32, 32))
+    images = [row for row in files if row.type == "image"]
+
+    def cached(row):
+        source = ThumbnailSource(Path(str(row.path)), int(row.id), row.size, row.modified_at)
+        return service._store.contains(service._cache_key(source, "image", size))
+
+    def run(restart):
+        precomputer = ThumbnailPrecomputer(service, cpu_budget=1.0)
+        precomputer.start([size], restart=restart)
+        precomputer._thread.join()
+
+    cursor_name = f"precompute:{current_db_key()}"
+    # 上次退出时处理到第一张图片
+    service._manifest.set_meta(cursor_name, str(images[0].id))
+    run(restart=False)
+    assert [cached(row) for row in images] == [False, True, True]
+    assert service._manifest.get_meta(cursor_name) == CURSOR_DONE
+
+    # 已完成的一轮不会在启动时重跑；扫描后重新开始一轮，补齐缺少的缩略图
+    run(restart=False)
+    assert not cached(images[0])
+    run(restart=True)
+    assert all(cached(row) for row in images)
+
+
+def test_encoded_cache_serves_without_disk(tmp_path):
+    service = ThumbnailService(tmp_path / "thumbs", max_encoded_cache_mb=1)
+    source = ThumbnailSource(tmp_path / "a.jpg", 1, 100, 1.0)
+    size = ThumbnailSize((32, 32))
+    key = service._cache_key(source, "image", size)
+    with Image.new("RGB", (32, 32), (0, 120, 200)) as image:
+        assert service._save_thumbnail(image, key, (32, 32), source)
+
+    first = service.load_thumbnail_image(source, "image", size)
+    assert first is not None and not first.isNull()
+    assert key in service._encoded_cache
+    # 第二次由编码字节缓存解码，不再读盘
+    service._store.remove([key])
+    second = service.load_thumbnail_image(source, "image", size)
+    assert second is not None and second.size() == first.size()
+    assert service._disk_hits == 1
+    assert service.cache_stats["encoded_hit_rate"] == 0.5
+
+    disabled = ThumbnailService(tmp_path / "thumbs", max_encoded_cache_mb=0)
+    disabled._encoded_cache.put(key, b"data")
+    assert len(disabled._encoded_cache) == 0
@@ -0,0 +1,56 @@
+import os
+
+from app.services.thumbnail_service import ThumbnailService, ViewportRange
+
+
+def test_preload_order_follows_center_and_direction():
+    viewport = ViewportRange(10, 19, 100, columns=5, direction=1)
+    order = viewport.preload_order(viewport.with_buffer(5))
+    # 两行可视项：中间两列优先，然后是滚动方向（向下）的缓冲区
+    assert order[:2] == [12, 17]
+    assert sorted(order[:10]) == list(range(10, 20))
+    assert order[10:15] == [20, 21, 22, 23, 24]
+    assert order[15:] == [9, 8, 7, 6, 5]
+
+    upward = ViewportRange(10, 19, 100, columns=5, direction=-1)
+    assert upward.preload_order(upward.with_buffer(5))[10:12] == [9, 8]
+    still = ViewportRange(10, 19, 100, columns=5)
+    assert still.preload_order(still.with_buffer(5))[10:14] == [20, 9, 21, 8]
+
+
+def test_viewport_range_uses_view_layout(tmp_path):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QSize, QStringListModel
+    from PySide6.QtWidgets import QApplication, QListView
+
+    app = QApplication.instance() or QApplication([])
+    view = QListView()
+    view.setViewMode(QListView.IconMode)
+    view.setGridSize(QSize(140, 160))
+    view.setSpacing(8)
+    view.setUniformItemSizes(True)
+    view.setModel(QStringListModel([f"file {index}" for index in range(500)]))
+    view.resize(800, 600)
+    view.show()
+    app.processEvents()
+    view.verticalScrollBar().setValue(1000)
+    app.processEvents()
+
+    service = ThumbnailService(tmp_path / "thumbs")
+    viewport = service.calculate_viewport_range(view)
+    area = view.viewport().rect()
+    model = view.model()
+
+    def shown(row: int) -> bool:
+        return view.visualRect(model.index(row, 0)).intersects(area)
+
+    assert viewport.columns == area.width() // 140
+    assert viewport.direction == 0
+    assert shown(viewport.first_visible) and shown(viewport.last_visible)
+    assert not shown(viewport.first_visible - 1)
+    assert not shown(viewport.last_visible + 1)
+
+    view.verticalScrollBar().setValue(0)
+    app.processEvents()
+    assert service.calculate_viewport_range(view).direction == -1
+    view.close()